@@ -0,0 +1,68 @@
+"""Composite and unique indexes for hot queries
+
+Databases whose tables already exist (created by ``create_all`` on
+startup, as the app used to do everywhere) get the indexes here; on a new
+database the tables do not exist yet and 0002_create_missing_tables
+creates them with these indexes. Each index is skipped if it is already
+present.
+
+Revision ID: 0001_hot_query_indexes
+Revises:
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_hot_query_indexes"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+INDEXES = [
+    ("ix_parking_history_user_status_start", "parking_history", ["user_id", "status", "start_time"], False),
+    ("ix_parking_history_user_start", "parking_history", ["user_id", "start_time"], False),
+    ("uq_favorite_zones_user_zone", "favorite_zones", ["user_id", "zone_code"], True),
+    ("ix_favorite_zones_user_order", "favorite_zones", ["user_id", "display_order"], False),
+    ("ix_payments_user_created", "payments", ["user_id", "created_at"], False),
+    ("uq_payments_stripe_payment_intent_id", "payments", ["stripe_payment_intent_id"], True),
+]
+
+
+def _existing_indexes(inspector, table):
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+
+def _check_unique(bind, table, columns):
+    cols = ", ".join(columns)
+    duplicate = bind.execute(
+        sa.text(
+            f"SELECT {cols} FROM {table} WHERE {' AND '.join(f'{c} IS NOT NULL' for c in columns)} "
+            f"GROUP BY {cols} HAVING COUNT(*) > 1 LIMIT 1"
+        )
+    ).first()
+    if duplicate is not None:
+        raise RuntimeError(
+            f"Cannot add unique index on {table}({cols}): duplicate rows exist, e.g. {tuple(duplicate)}. "
+            "Remove the duplicates and re-run the migration."
+        )
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+    tables = set(inspector.get_table_names())
+    for name, table, columns, unique in INDEXES:
+        if table not in tables or name in _existing_indexes(inspector, table):
+            continue
+        if unique:
+            _check_unique(bind, table, columns)
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade() -> None:
+    inspector = sa.inspect(op.get_bind())
+    tables = set(inspector.get_table_names())
+    for name, table, _, _ in reversed(INDEXES):
+        if table in tables and name in _existing_indexes(inspector, table):
+            op.drop_index(name, table_name=table)
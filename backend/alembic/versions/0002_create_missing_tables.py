@@ -0,0 +1,256 @@
+"""Create missing tables and backfill payment rollups
+
+The app no longer creates tables on startup outside APP_ENV=local (see
+DB_CREATE_TABLES_ON_STARTUP), so this migration does it instead: every
+table below that the database does not have yet is created with its
+indexes, and the monthly payment totals are backfilled once. Existing
+tables are left untouched.
+
+Revision ID: 0002_create_missing_tables
+Revises: 0001_hot_query_indexes
+Create Date: 2026-10-19
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0002_create_missing_tables"
+down_revision = "0001_hot_query_indexes"
+branch_labels = None
+depends_on = None
+
+# SQLite only auto-increments INTEGER PRIMARY KEY columns
+BigIntegerId = sa.BigInteger().with_variant(sa.Integer(), "sqlite")
+
+
+def _timestamps():
+    return [
+        sa.Column("created_at", sa.DateTime(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(), nullable=False),
+    ]
+
+
+def _users():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("username", sa.String(), nullable=False),
+        sa.Column("hashed_password", sa.String(), nullable=False),
+        sa.Column("full_name", sa.String(), nullable=True),
+        sa.Column("is_active", sa.Boolean(), nullable=True),
+        sa.Column("is_superuser", sa.Boolean(), nullable=True),
+        sa.Column("preferred_zones", sa.Text(), nullable=True),
+        sa.Column("notification_enabled", sa.Boolean(), nullable=True),
+        sa.Column("max_parking_duration", sa.Integer(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_users_id", "users", ["id"])
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_username", "users", ["username"], unique=True)
+
+
+def _parking_history():
+    op.create_table(
+        "parking_history",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("zone_code", sa.String(), nullable=False),
+        sa.Column("zone_description", sa.String(), nullable=True),
+        sa.Column("latitude", sa.Float(), nullable=True),
+        sa.Column("longitude", sa.Float(), nullable=True),
+        sa.Column("start_time", sa.DateTime(), nullable=False),
+        sa.Column("end_time", sa.DateTime(), nullable=True),
+        sa.Column("duration_minutes", sa.Integer(), nullable=True),
+        sa.Column("amount_paid", sa.Float(), nullable=True),
+        sa.Column("payment_method", sa.String(), nullable=True),
+        sa.Column("payment_id", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_parking_history_id", "parking_history", ["id"])
+    op.create_index("ix_parking_history_user_status_start", "parking_history", ["user_id", "status", "start_time"])
+    op.create_index("ix_parking_history_user_start", "parking_history", ["user_id", "start_time"])
+
+
+def _favorite_zones():
+    op.create_table(
+        "favorite_zones",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("zone_code", sa.String(), nullable=False),
+        sa.Column("zone_description", sa.String(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.Column("display_order", sa.Integer(), nullable=True),
+        sa.Column("times_used", sa.Integer(), nullable=True),
+        sa.Column("last_used", sa.DateTime(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_favorite_zones_id", "favorite_zones", ["id"])
+    op.create_index("uq_favorite_zones_user_zone", "favorite_zones", ["user_id", "zone_code"], unique=True)
+    op.create_index("ix_favorite_zones_user_order", "favorite_zones", ["user_id", "display_order"])
+
+
+def _payments():
+    op.create_table(
+        "payments",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("parking_history_id", sa.Integer(), sa.ForeignKey("parking_history.id"), nullable=True),
+        sa.Column("amount", sa.Float(), nullable=False),
+        sa.Column("currency", sa.String(), nullable=True),
+        sa.Column("payment_method", sa.String(), nullable=False),
+        sa.Column("stripe_payment_intent_id", sa.String(), nullable=True),
+        sa.Column("stripe_charge_id", sa.String(), nullable=True),
+        sa.Column("paypal_transaction_id", sa.String(), nullable=True),
+        sa.Column("status", sa.String(), nullable=True),
+        sa.Column("description", sa.Text(), nullable=True),
+        sa.Column("payment_metadata", sa.Text(), nullable=True),
+        *_timestamps(),
+    )
+    op.create_index("ix_payments_id", "payments", ["id"])
+    op.create_index("ix_payments_user_created", "payments", ["user_id", "created_at"])
+    op.create_index("uq_payments_stripe_payment_intent_id", "payments", ["stripe_payment_intent_id"], unique=True)
+
+
+def _payment_monthly_totals():
+    op.create_table(
+        "payment_monthly_totals",
+        sa.Column("user_id", sa.Integer(), sa.ForeignKey("users.id"), primary_key=True),
+        sa.Column("month", sa.String(7), primary_key=True),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("transaction_count", sa.Integer(), nullable=False),
+    )
+
+
+def _stripe_webhook_events():
+    op.create_table(
+        "stripe_webhook_events",
+        sa.Column("id", sa.String(), primary_key=True),
+        sa.Column("type", sa.String(), nullable=False),
+        sa.Column("payment_intent_id", sa.String(), nullable=True),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("last_error", sa.Text(), nullable=True),
+        sa.Column("stripe_created", sa.Integer(), nullable=True),
+        sa.Column("received_at", sa.DateTime(), nullable=False),
+        sa.Column("processed_at", sa.DateTime(), nullable=True),
+    )
+    op.create_index("ix_stripe_webhook_events_status_received", "stripe_webhook_events", ["status", "received_at"])
+
+
+def _zone_snapshots():
+    op.create_table(
+        "zone_snapshots",
+        sa.Column("bounds_key", sa.String(), primary_key=True),
+        sa.Column("data", sa.JSON(), nullable=False),
+        sa.Column("fetched_at", sa.DateTime(), nullable=False),
+    )
+    op.create_index("ix_zone_snapshots_bounds_key", "zone_snapshots", ["bounds_key"])
+
+
+def _search_events():
+    op.create_table(
+        "search_events",
+        sa.Column("id", BigIntegerId, primary_key=True, autoincrement=True),
+        sa.Column("event_type", sa.String(), nullable=False),
+        sa.Column("zone_code", sa.String(), nullable=False),
+        sa.Column("zone_name", sa.String(), nullable=True),
+        sa.Column("occurred_at", sa.DateTime(), nullable=False),
+        sa.Column("client_ip", sa.String(), nullable=True),
+        sa.Column("user_agent", sa.String(), nullable=True),
+        sa.Column("session_id", sa.String(), nullable=True),
+    )
+    op.create_index("ix_search_events_occurred_at", "search_events", ["occurred_at"])
+
+
+def _zone_popularity():
+    op.create_table(
+        "zone_popularity",
+        sa.Column("zone_code", sa.String(), primary_key=True),
+        sa.Column("search_count", sa.BigInteger(), nullable=False),
+        sa.Column("directions_requested", sa.BigInteger(), nullable=False),
+        sa.Column("last_accessed", sa.DateTime(), nullable=True),
+    )
+
+
+def _daily_stats():
+    op.create_table(
+        "daily_stats",
+        sa.Column("date", sa.Date(), primary_key=True),
+        sa.Column("total_searches", sa.BigInteger(), nullable=False),
+        sa.Column("total_directions", sa.BigInteger(), nullable=False),
+        sa.Column("unique_users", sa.Integer(), nullable=False),
+        sa.Column("unique_users_sketch", sa.LargeBinary(), nullable=True),
+    )
+
+
+def _user_sessions():
+    op.create_table(
+        "user_sessions",
+        sa.Column("session_id", sa.String(), primary_key=True),
+        sa.Column("first_seen", sa.DateTime(), nullable=False),
+        sa.Column("last_seen", sa.DateTime(), nullable=False),
+        sa.Column("total_searches", sa.Integer(), nullable=False),
+    )
+
+
+def _analytics_rollups():
+    op.create_table(
+        "analytics_rollups",
+        sa.Column("id", BigIntegerId, primary_key=True, autoincrement=True),
+        sa.Column("granularity", sa.String(), nullable=False),
+        sa.Column("bucket_start", sa.DateTime(), nullable=False),
+        sa.Column("zone_code", sa.String(), nullable=False),
+        sa.Column("searches", sa.BigInteger(), nullable=False),
+        sa.Column("directions", sa.BigInteger(), nullable=False),
+        sa.UniqueConstraint("granularity", "bucket_start", "zone_code", name="uq_analytics_rollup_bucket"),
+    )
+
+
+# In dependency order (foreign keys first)
+TABLES = [
+    ("users", _users),
+    ("parking_history", _parking_history),
+    ("favorite_zones", _favorite_zones),
+    ("payments", _payments),
+    ("payment_monthly_totals", _payment_monthly_totals),
+    ("stripe_webhook_events", _stripe_webhook_events),
+    ("zone_snapshots", _zone_snapshots),
+    ("search_events", _search_events),
+    ("zone_popularity", _zone_popularity),
+    ("daily_stats", _daily_stats),
+    ("user_sessions", _user_sessions),
+    ("analytics_rollups", _analytics_rollups),
+]
+
+
+def _backfill_monthly_totals(bind) -> None:
+    """Fill payment_monthly_totals from completed payments if it is still empty"""
+    if bind.execute(sa.text("SELECT 1 FROM payment_monthly_totals LIMIT 1")).first() is not None:
+        return
+    if bind.dialect.name == "postgresql":
+        month = "to_char(created_at, 'YYYY-MM')"
+    else:
+        month = "strftime('%Y-%m', created_at)"
+    bind.execute(sa.text(
+        "INSERT INTO payment_monthly_totals (user_id, month, total_amount, transaction_count) "
+        f"SELECT user_id, {month}, SUM(amount), COUNT(id) FROM payments "
+        f"WHERE status = 'completed' GROUP BY user_id, {month}"
+    ))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    existing = set(sa.inspect(bind).get_table_names())
+    for name, create in TABLES:
+        if name not in existing:
+            create()
+    _backfill_monthly_totals(bind)
+
+
+def downgrade() -> None:
+    # Dropping tables would drop user data; downgrading leaves the schema as is
+    pass
@@ -3,12 +3,16 @@ from datetime import datetime, timedelta
 from typing import Optional
 from types import SimpleNamespace
 from jose import JWTError, jwt
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from .config import settings
 from ..models.user import User
-from .database import get_db
+from .database import get_async_db
+from .principal_cache import decode_token, get_principal, principal_from_user, store_principal
+from .read_your_writes import track_request_user
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="auth/token")
 
@@ -38,7 +42,7 @@ def verify_token(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     try:
-        payload = jwt.decode(token, settings.secret_key_validated, algorithms=[settings.ALGORITHM])
+        payload = decode_token(token)
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
@@ -46,7 +50,7 @@ def verify_token(token: str = Depends(oauth2_scheme)):
     except JWTError:
         raise credentials_exception
 
-def get_current_user(token_data: dict = Depends(verify_token), db: Session = Depends(get_db)):
+async def get_current_user(token_data: dict = Depends(verify_token), db: AsyncSession = Depends(get_async_db)):
     if token_data.get("guest") is True:
         now = datetime.utcnow()
         return SimpleNamespace(
@@ -64,11 +68,18 @@ def get_current_user(token_data: dict = Depends(verify_token), db: Session = Dep
             is_guest=True,
         )
 
+    # Cached principal snapshot (read-only); handlers that modify the user must load it from db
     email = token_data.get("sub")
-    user = db.query(User).filter(User.email == email).first()
-    if user is None:
-        raise HTTPException(status_code=404, detail="User not found")
-    return user
+    principal = await get_principal(email)
+    if principal is None:
+        user = (await db.execute(select(User).where(User.email == email))).scalar_one_or_none()
+        if user is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        principal = principal_from_user(user)
+        await store_principal(principal)
+    # Route this request's reads to the primary if the user wrote within the replica lag window
+    await track_request_user(principal.id)
+    return principal
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
     if getattr(current_user, "is_guest", False):
@@ -76,3 +87,8 @@ def get_current_active_user(current_user: User = Depends(get_current_user)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
+
+def get_current_superuser(current_user: User = Depends(get_current_active_user)):
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return current_user
@@ -11,6 +11,9 @@ from dotenv import load_dotenv
 env_path = Path(__file__).parent.parent.parent / ".env"
 load_dotenv(dotenv_path=env_path, override=False)
 
+# Values SQLite accepts for PRAGMA synchronous
+SQLITE_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
 
 class Settings:
     """Application settings with environment variable support"""
@@ -34,9 +37,51 @@ class Settings:
     RATE_LIMIT_MINUTE: str = os.getenv("RATE_LIMIT_MINUTE", "60/minute")
 
     # Proxy / Upstream Protection
+    # A breaker per command and viewport size opens once the window has THRESHOLD failures making up
+    # at least FAILURE_RATE of its calls; calls slower than SLOW_CALL_SECONDS count as failures
+    # (keep it below UPSTREAM_ATTEMPT_TIMEOUT_SECONDS, itself no longer than UPSTREAM_DEADLINE_SECONDS).
+    # Open breakers let one probe through after the cooldown, which doubles (up to the max) per failed probe.
     PROXY_CIRCUIT_THRESHOLD: int = int(os.getenv("PROXY_CIRCUIT_THRESHOLD", "10"))
     PROXY_CIRCUIT_WINDOW_SECONDS: int = int(os.getenv("PROXY_CIRCUIT_WINDOW_SECONDS", "30"))
     PROXY_CIRCUIT_COOLDOWN_SECONDS: int = int(os.getenv("PROXY_CIRCUIT_COOLDOWN_SECONDS", "30"))
+    PROXY_CIRCUIT_MAX_COOLDOWN_SECONDS: int = int(os.getenv("PROXY_CIRCUIT_MAX_COOLDOWN_SECONDS", "300"))
+    PROXY_CIRCUIT_FAILURE_RATE: float = float(os.getenv("PROXY_CIRCUIT_FAILURE_RATE", "0.5"))
+    PROXY_CIRCUIT_SLOW_CALL_SECONDS: float = float(os.getenv("PROXY_CIRCUIT_SLOW_CALL_SECONDS", "3"))
+    # Total upstream time per request, retries included (clients may send X-Request-Timeout-Ms up to the max);
+    # past it the last stored snapshot is served
+    UPSTREAM_DEADLINE_SECONDS: float = float(os.getenv("UPSTREAM_DEADLINE_SECONDS", "8"))
+    UPSTREAM_DEADLINE_MAX_SECONDS: float = float(os.getenv("UPSTREAM_DEADLINE_MAX_SECONDS", "20"))
+    # Timeout of a single upstream attempt (less if the deadline is closer); a full-length timeout is a failure
+    UPSTREAM_ATTEMPT_TIMEOUT_SECONDS: float = float(os.getenv("UPSTREAM_ATTEMPT_TIMEOUT_SECONDS", "4"))
+    # Retries (process-wide) may not exceed RATIO x first attempts over the last 10s, plus MIN_PER_SECOND
+    UPSTREAM_RETRY_BUDGET_RATIO: float = float(os.getenv("UPSTREAM_RETRY_BUDGET_RATIO", "0.2"))
+    UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND: float = float(os.getenv("UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND", "1"))
+    # Hedging: a call still running after the observed PERCENTILE latency gets a second identical request;
+    # hedges are capped at BUDGET_RATIO of calls and skipped while the breaker is degraded
+    UPSTREAM_HEDGE_ENABLED: bool = os.getenv("UPSTREAM_HEDGE_ENABLED", "false").lower() == "true"
+    UPSTREAM_HEDGE_PERCENTILE: float = float(os.getenv("UPSTREAM_HEDGE_PERCENTILE", "0.95"))
+    UPSTREAM_HEDGE_BUDGET_RATIO: float = float(os.getenv("UPSTREAM_HEDGE_BUDGET_RATIO", "0.1"))
+    UPSTREAM_HEDGE_MAX_WORKERS: int = int(os.getenv("UPSTREAM_HEDGE_MAX_WORKERS", "16"))
+
+    # Analytics Configuration (in-memory limits)
+    ANALYTICS_RECENT_EVENTS: int = int(os.getenv("ANALYTICS_RECENT_EVENTS", "500"))
+    ANALYTICS_MAX_ZONES: int = int(os.getenv("ANALYTICS_MAX_ZONES", "2000"))
+    ANALYTICS_TOP_K: int = int(os.getenv("ANALYTICS_TOP_K", "100"))
+    # Cross-worker aggregation (uses REDIS_URL when set)
+    ANALYTICS_FLUSH_SECONDS: float = float(os.getenv("ANALYTICS_FLUSH_SECONDS", "5"))
+    # Favorite-zone usage taps are buffered and written in one batch per interval
+    FAVORITE_USAGE_FLUSH_SECONDS: float = float(os.getenv("FAVORITE_USAGE_FLUSH_SECONDS", "10"))
+    ANALYTICS_VIEW_TTL_SECONDS: int = int(os.getenv("ANALYTICS_VIEW_TTL_SECONDS", "5"))
+    # Durable storage: raw events plus minute/hour/day rollups in the database
+    ANALYTICS_PERSIST: bool = os.getenv("ANALYTICS_PERSIST", "true").lower() == "true"
+    ANALYTICS_EVENT_BUFFER: int = int(os.getenv("ANALYTICS_EVENT_BUFFER", "5000"))
+    ANALYTICS_EVENT_RETENTION_DAYS: int = int(os.getenv("ANALYTICS_EVENT_RETENTION_DAYS", "30"))
+    ANALYTICS_MINUTE_RETENTION_DAYS: int = int(os.getenv("ANALYTICS_MINUTE_RETENTION_DAYS", "2"))
+    # Tracking ingest queue: above the shed threshold only SAMPLE_RATE of events are kept
+    ANALYTICS_INGEST_QUEUE_SIZE: int = int(os.getenv("ANALYTICS_INGEST_QUEUE_SIZE", "10000"))
+    ANALYTICS_INGEST_BATCH_SIZE: int = int(os.getenv("ANALYTICS_INGEST_BATCH_SIZE", "500"))
+    ANALYTICS_INGEST_SHED_THRESHOLD: float = float(os.getenv("ANALYTICS_INGEST_SHED_THRESHOLD", "0.8"))
+    ANALYTICS_INGEST_SAMPLE_RATE: float = float(os.getenv("ANALYTICS_INGEST_SAMPLE_RATE", "0.1"))
 
     # Logging Configuration
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
@@ -87,7 +132,40 @@ class Settings:
         "DATABASE_URL",
         DATABASE_URL_LOCAL if APP_ENV == "local" else (DATABASE_URL_PROD or DATABASE_URL_LOCAL),
     )
+    # Optional read replicas (comma-separated URLs); read-only endpoints spread queries across them
+    DATABASE_REPLICA_URLS: str = os.getenv("DATABASE_REPLICA_URLS", "")
+    # After a user's own write, their reads stay on the primary for this long (replica lag)
+    DB_READ_YOUR_WRITES_SECONDS: int = int(os.getenv("DB_READ_YOUR_WRITES_SECONDS", "5"))
+    # Local SQLite: WAL journal, pooled per-thread connections, and how long writers wait on a lock
+    SQLITE_WAL: bool = os.getenv("SQLITE_WAL", "true").lower() == "true"
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL").upper()
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_POOL_SIZE: int = int(os.getenv("SQLITE_POOL_SIZE", "5"))
+    SQLITE_MAX_OVERFLOW: int = int(os.getenv("SQLITE_MAX_OVERFLOW", "10"))
+    # Pool for the async engine used by request handlers (asyncpg / aiosqlite)
+    DB_ASYNC_POOL_SIZE: int = int(os.getenv("DB_ASYNC_POOL_SIZE", "10"))
+    DB_ASYNC_MAX_OVERFLOW: int = int(os.getenv("DB_ASYNC_MAX_OVERFLOW", "10"))
+    # Create missing tables when the app starts; elsewhere run `alembic upgrade head` before starting
+    DB_CREATE_TABLES_ON_STARTUP: bool = os.getenv(
+        "DB_CREATE_TABLES_ON_STARTUP", "true" if APP_ENV == "local" else "false"
+    ).lower() == "true"
+
+    # Optional feature routers; a disabled feature's modules (and workers) are never loaded
+    ENABLE_AUTH: bool = os.getenv("ENABLE_AUTH", "true").lower() == "true"  # auth, parking history, favorites
+    ENABLE_PAYMENTS: bool = os.getenv("ENABLE_PAYMENTS", "true").lower() == "true"  # requires ENABLE_AUTH
+    ENABLE_ANALYTICS: bool = os.getenv("ENABLE_ANALYTICS", "true").lower() == "true"
+    # Bulk parking history import: rows per insert/commit and per-request cap
+    PARKING_IMPORT_BATCH_SIZE: int = int(os.getenv("PARKING_IMPORT_BATCH_SIZE", "1000"))
+    PARKING_IMPORT_MAX_ROWS: int = int(os.getenv("PARKING_IMPORT_MAX_ROWS", "500000"))
     SECRET_KEY: str = os.getenv("SECRET_KEY", "")
+    # Authenticated-principal cache (per worker, plus Redis when REDIS_URL is set)
+    AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "30"))
+    AUTH_CACHE_SHARED_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_SHARED_TTL_SECONDS", "300"))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+    # bcrypt runs in a process pool; concurrency defaults to the worker count
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+    PASSWORD_HASH_MAX_CONCURRENCY: int = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", "0"))
+    PASSWORD_HASH_MAX_PENDING: int = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "100"))
 
     @property
     def secret_key_validated(self) -> str:
@@ -107,6 +185,41 @@ class Settings:
     STRIPE_PUBLIC_KEY: str = os.getenv("STRIPE_PUBLIC_KEY", "")
     STRIPE_SECRET_KEY: str = os.getenv("STRIPE_SECRET_KEY", "")
     STRIPE_WEBHOOK_SECRET: str = os.getenv("STRIPE_WEBHOOK_SECRET", "")
+    # Outbound Stripe calls run on a bounded thread pool with SDK timeouts/retries
+    STRIPE_MAX_CONCURRENCY: int = int(os.getenv("STRIPE_MAX_CONCURRENCY", "8"))
+    STRIPE_MAX_PENDING: int = int(os.getenv("STRIPE_MAX_PENDING", "32"))
+    STRIPE_TIMEOUT_SECONDS: float = float(os.getenv("STRIPE_TIMEOUT_SECONDS", "10"))
+    STRIPE_MAX_NETWORK_RETRIES: int = int(os.getenv("STRIPE_MAX_NETWORK_RETRIES", "2"))
+    STRIPE_API_BASE: str = os.getenv("STRIPE_API_BASE", "")  # e.g. http://localhost:12111 for stripe-mock
+    # Webhook events are recorded by id and applied by a background worker
+    STRIPE_WEBHOOK_BATCH_SIZE: int = int(os.getenv("STRIPE_WEBHOOK_BATCH_SIZE", "100"))
+    STRIPE_WEBHOOK_POLL_SECONDS: float = float(os.getenv("STRIPE_WEBHOOK_POLL_SECONDS", "5"))
+    STRIPE_WEBHOOK_MAX_ATTEMPTS: int = int(os.getenv("STRIPE_WEBHOOK_MAX_ATTEMPTS", "5"))
+    STRIPE_WEBHOOK_RETENTION_DAYS: int = int(os.getenv("STRIPE_WEBHOOK_RETENTION_DAYS", "30"))
+
+    def validate(self) -> None:
+        """Reject settings that would silently disable a feature or cannot be used as given"""
+        if self.SQLITE_SYNCHRONOUS not in SQLITE_SYNCHRONOUS_MODES:
+            raise ValueError(
+                f"SQLITE_SYNCHRONOUS must be one of {', '.join(SQLITE_SYNCHRONOUS_MODES)} "
+                f"(got {self.SQLITE_SYNCHRONOUS!r})"
+            )
+        if not (
+            self.PROXY_CIRCUIT_SLOW_CALL_SECONDS
+            < self.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS
+            <= self.UPSTREAM_DEADLINE_SECONDS
+        ):
+            raise ValueError(
+                "Upstream timeouts must satisfy PROXY_CIRCUIT_SLOW_CALL_SECONDS < "
+                "UPSTREAM_ATTEMPT_TIMEOUT_SECONDS <= UPSTREAM_DEADLINE_SECONDS "
+                f"(got {self.PROXY_CIRCUIT_SLOW_CALL_SECONDS}, {self.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS}, "
+                f"{self.UPSTREAM_DEADLINE_SECONDS})"
+            )
+
+    @property
+    def database_replica_urls_list(self) -> list:
+        """Parse read replica URLs from environment variable"""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
 
     @property
     def cors_origins_list(self) -> list:
@@ -120,7 +233,9 @@ class Settings:
 @lru_cache()
 def get_settings() -> Settings:
     """Get cached application settings"""
-    return Settings()
+    settings = Settings()
+    settings.validate()
+    return settings
 
 
 # Global settings instance
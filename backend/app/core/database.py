@@ -1,7 +1,13 @@
+import itertools
 import os
-from sqlalchemy import create_engine
+from contextvars import ContextVar
+from typing import List
+from sqlalchemy import Select, create_engine, event
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from sqlalchemy.pool import StaticPool
 
 # Import settings to ensure .env is loaded
@@ -10,53 +16,212 @@ from app.core.config import settings
 # Get database URL from settings (which loads from .env)
 DATABASE_URL = settings.DATABASE_URL
 
-# Handle Render's postgres:// vs postgresql:// URL format
-if DATABASE_URL and DATABASE_URL.startswith("postgres://"):
-    DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
-
-# Create engine
-if DATABASE_URL:
-    # Production database (Render Postgres)
+def _normalize_url(url: str) -> str:
+    # Handle Render's postgres:// vs postgresql:// URL format
+    if url.startswith("postgres://"):
+        url = url.replace("postgres://", "postgresql://", 1)
     # Render Postgres requires explicit SSL parameters
-    connect_args = {}
-    if "render.com" in DATABASE_URL:
+    if "render.com" in url and "sslmode" not in url:
         # Ensure sslmode is in URL if not already present
-        if "sslmode" not in DATABASE_URL:
-            separator = "&" if "?" in DATABASE_URL else "?"
-            DATABASE_URL = f"{DATABASE_URL}{separator}sslmode=require"
+        separator = "&" if "?" in url else "?"
+        url = f"{url}{separator}sslmode=require"
+    return url
+
+def _is_memory_sqlite(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+
+def _enable_sqlite_pragmas(sync_engine) -> None:
+    """WAL lets readers run alongside the writer; busy_timeout makes writers wait instead of failing"""
+    @event.listens_for(sync_engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        if settings.SQLITE_WAL:
+            cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.close()
+
+def _sqlite_engine(url: str):
+    if _is_memory_sqlite(make_url(url)):
+        # An in-memory database only exists on its one connection
+        return create_engine(url, connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    # A real pool: each thread checks out its own connection, as with Postgres
+    sqlite_engine = create_engine(
+        url,
+        pool_size=settings.SQLITE_POOL_SIZE,
+        max_overflow=settings.SQLITE_MAX_OVERFLOW,
+        connect_args={"check_same_thread": False, "timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000},
+    )
+    _enable_sqlite_pragmas(sqlite_engine)
+    return sqlite_engine
+
+def _sync_engine(url: str):
+    if url.startswith("sqlite"):
+        return _sqlite_engine(url)
+    connect_args = {}
+    if "render.com" in url:
         # Also pass as connect_args for psycopg2
         connect_args = {
             "sslmode": "require",
             "connect_timeout": 10,
         }
-    
-    engine = create_engine(
-        DATABASE_URL,
+
+    return create_engine(
+        url,
         pool_pre_ping=True,  # Verify connections before use
         pool_recycle=300,    # Recycle connections after 5 minutes (prevents stale connections)
         pool_size=5,         # Maintain 5 connections in the pool
         max_overflow=10,     # Allow up to 10 overflow connections
         connect_args=connect_args,
     )
+
+# Create engine
+if DATABASE_URL:
+    # Production database (Render Postgres)
+    DATABASE_URL = _normalize_url(DATABASE_URL)
+    engine = _sync_engine(DATABASE_URL)
 else:
     # Fallback to SQLite for local development
     SQLITE_DATABASE_URL = "sqlite:///./parking_zones.db"
-    engine = create_engine(
-        SQLITE_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
+    engine = _sqlite_engine(SQLITE_DATABASE_URL)
+
+# Set per request (see app.core.read_your_writes) when the user wrote recently and must read from the primary
+read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+# Left in Session.info by the read_your_writes commit hook; the commit's caller then sets read_from_primary
+RECENT_WRITE_KEY = "recent_write"
+
+
+class WriteSession(Session):
+    """Session whose commit keeps the rest of the request's reads on the primary after a write"""
+
+    def commit(self) -> None:
+        super().commit()
+        if self.info.pop(RECENT_WRITE_KEY, False):
+            read_from_primary.set(True)
+
+
+class WriteAsyncSession(AsyncSession):
+    """Async counterpart of WriteSession.
+
+    The commit hooks run inside a greenlet, so a context variable set there is
+    not guaranteed to reach the request; it is set here, after the await.
+    """
+
+    async def commit(self) -> None:
+        await super().commit()
+        if self.sync_session.info.pop(RECENT_WRITE_KEY, False):
+            read_from_primary.set(True)
+
 
 # Create session factory
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=WriteSession)
+
+# Async engine for request handlers (asyncpg for Postgres, aiosqlite locally)
+def _async_engine(raw_url: str):
+    url = make_url(raw_url)
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes SSL/timeout as connect args rather than libpq URL parameters
+        sslmode = url.query.get("sslmode")
+        url = url.difference_update_query(["sslmode", "connect_timeout"]).set(drivername="postgresql+asyncpg")
+        async_connect_args = {"timeout": 10}
+        if sslmode:
+            async_connect_args["ssl"] = sslmode
+        return create_async_engine(
+            url,
+            pool_pre_ping=True,
+            pool_recycle=300,
+            pool_size=settings.DB_ASYNC_POOL_SIZE,
+            max_overflow=settings.DB_ASYNC_MAX_OVERFLOW,
+            connect_args=async_connect_args,
+        )
+    url = url.set(drivername="sqlite+aiosqlite")
+    if _is_memory_sqlite(url):
+        return create_async_engine(url, poolclass=StaticPool)
+    # aiosqlite's default NullPool already gives every session its own connection
+    sqlite_engine = create_async_engine(url, connect_args={"timeout": settings.SQLITE_BUSY_TIMEOUT_MS / 1000})
+    _enable_sqlite_pragmas(sqlite_engine.sync_engine)
+    return sqlite_engine
+
+async_engine = _async_engine(DATABASE_URL or SQLITE_DATABASE_URL)
+# expire_on_commit=False: attributes stay readable after commit without another (awaited) load
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=WriteAsyncSession, expire_on_commit=False, autoflush=False)
+
+# Read replicas (DATABASE_REPLICA_URLS); read sessions spread SELECTs across them
+replica_engines = [_sync_engine(_normalize_url(url)) for url in settings.database_replica_urls_list]
+async_replica_engines = [_async_engine(_normalize_url(url)) for url in settings.database_replica_urls_list]
+_replica_round_robin = itertools.count()
+PINNED_KEY = "pinned_to_primary"
+REPLICA_KEY = "replica"
+
+
+class ReadSession(Session):
+    """Session for read-mostly handlers: SELECTs go to a replica, everything else to the primary.
+
+    A session sticks to one replica, and to the primary once it has written
+    or when ``read_from_primary`` is set for the request.
+    """
+
+    def _primary(self):
+        return engine
+
+    def _replicas(self) -> List:
+        return replica_engines
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or (clause is not None and not isinstance(clause, Select)):
+            # Writes (and raw SQL) go to the primary, as does everything after them in this session
+            self.info[PINNED_KEY] = True
+        replicas = self._replicas()
+        if not replicas or self.info.get(PINNED_KEY) or read_from_primary.get():
+            return self._primary()
+        if REPLICA_KEY not in self.info:
+            self.info[REPLICA_KEY] = next(_replica_round_robin) % len(replicas)
+        return replicas[self.info[REPLICA_KEY]]
+
+
+class AsyncReadSession(ReadSession):
+    """Sync side of the async read sessions (routes to the async engines' sync facades)"""
+
+    def _primary(self):
+        return async_engine.sync_engine
+
+    def _replicas(self) -> List:
+        return [replica.sync_engine for replica in async_replica_engines]
+
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, class_=ReadSession)
+AsyncReadSessionLocal = async_sessionmaker(
+    class_=AsyncSession, sync_session_class=AsyncReadSession, expire_on_commit=False, autoflush=False
+)
 
 # Base class for models
 Base = declarative_base()
 
+def upsert_insert(db, model):
+    """Dialect-specific INSERT supporting ON CONFLICT (Postgres and SQLite)"""
+    if db.get_bind().dialect.name == "postgresql":  # works for Session and AsyncSession
+        return postgresql.insert(model)
+    return sqlite.insert(model)
+
 # Dependency for FastAPI
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+# Read-mostly variant: SELECTs go to a replica when DATABASE_REPLICA_URLS is set
+def get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+# Async dependency for FastAPI (used by the async routers)
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+# Read-mostly variant: queries go to a replica unless the user wrote recently
+async def get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
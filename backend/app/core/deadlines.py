@@ -0,0 +1,60 @@
+import math
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from app.core.config import settings
+
+DEADLINE_HEADER = "x-request-timeout-ms"
+
+# Monotonic time by which the current request must be answered
+request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def deadline_from_header(value: Optional[str]) -> float:
+    """Deadline for a request arriving now; a client-sent budget (ms) is capped at UPSTREAM_DEADLINE_MAX_SECONDS
+
+    Budgets that are not finite numbers ("nan", "inf") are ignored like
+    malformed ones, since NaN would slip through the clamping.
+    """
+    seconds = settings.UPSTREAM_DEADLINE_SECONDS
+    if value:
+        try:
+            budget_ms = float(value)
+        except ValueError:
+            budget_ms = None
+        if budget_ms is not None and math.isfinite(budget_ms):
+            seconds = min(max(budget_ms / 1000, 0.0), settings.UPSTREAM_DEADLINE_MAX_SECONDS)
+    return time.monotonic() + seconds
+
+
+def current_deadline() -> float:
+    """The request's deadline, or a default one from now outside a request (e.g. background jobs)"""
+    deadline = request_deadline.get()
+    return deadline if deadline is not None else time.monotonic() + settings.UPSTREAM_DEADLINE_SECONDS
+
+
+class DeadlineMiddleware:
+    """Starts each HTTP request's deadline clock on arrival.
+
+    Plain ASGI (not BaseHTTPMiddleware) so the context variable reaches the
+    endpoint, and from there any work it hands to threads with copy_context.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        header = None
+        for name, value in scope.get("headers", ()):
+            if name == DEADLINE_HEADER.encode():
+                header = value.decode("latin-1")
+                break
+        token = request_deadline.set(deadline_from_header(header))
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
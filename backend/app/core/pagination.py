@@ -0,0 +1,58 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, Response
+from sqlalchemy import Select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    raw = json.dumps([sort_value.isoformat(), row_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(token: str) -> Tuple[datetime, int]:
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+        return datetime.fromisoformat(sort_value), int(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def keyset_page(
+    db: AsyncSession,
+    query: Select,
+    sort_column,
+    id_column,
+    limit: int,
+    response: Response,
+    cursor: Optional[str] = None,
+    skip: int = 0,
+) -> List:
+    """Newest-first page of the ``query`` entities keyed on (sort_column, id_column).
+
+    With a ``cursor`` the page starts right after the row it encodes, so any
+    page costs an index seek; without one the legacy ``skip`` offset is used.
+    The next page's cursor is returned in the ``X-Next-Cursor`` header.
+    """
+    if limit <= 0:
+        return []
+    if cursor:
+        query = query.where(tuple_(sort_column, id_column) < decode_cursor(cursor))
+    query = query.order_by(sort_column.desc(), id_column.desc())
+    if skip and not cursor:
+        query = query.offset(skip)
+
+    rows = (await db.execute(query.limit(limit + 1))).scalars().all()
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(
+            getattr(last, sort_column.key), getattr(last, id_column.key)
+        )
+    return rows
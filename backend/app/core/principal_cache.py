@@ -0,0 +1,171 @@
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from jose import jwt
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.core.shared import SimpleCache
+from app.models.user import User
+
+PRINCIPAL_FIELDS = (
+    "id",
+    "email",
+    "username",
+    "full_name",
+    "is_active",
+    "is_superuser",
+    "created_at",
+    "updated_at",
+    "preferred_zones",
+    "notification_enabled",
+    "max_parking_duration",
+)
+DATETIME_FIELDS = ("created_at", "updated_at")
+REDIS_KEY_PREFIX = "revamp:principal:"
+STALE_PRINCIPALS_KEY = "stale_principals"
+
+# token -> decoded claims, and email -> principal snapshot
+_tokens = SimpleCache(max_entries=settings.AUTH_CACHE_MAX_ENTRIES)
+_principals = SimpleCache(max_entries=settings.AUTH_CACHE_MAX_ENTRIES)
+
+_redis: Optional[aioredis.Redis] = None
+_redis_sync: Optional[redis.Redis] = None
+# Shared invalidations run after the commit hook returns: as tasks on the event loop for async
+# sessions, or on this thread for sync sessions (worker threads, background flushers)
+_invalidation_executor: Optional[ThreadPoolExecutor] = None
+_invalidation_tasks: Set[asyncio.Task] = set()
+if settings.REDIS_URL:
+    _redis = aioredis.Redis.from_url(settings.REDIS_URL, socket_timeout=1)
+    _redis_sync = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1)
+    _invalidation_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="principal-invalidate")
+
+
+def decode_token(token: str) -> Dict[str, Any]:
+    """``jwt.decode`` with the result cached until the token expires (raises JWTError)"""
+    payload = _tokens.get(token)
+    if payload is not None:
+        return payload
+    payload = jwt.decode(token, settings.secret_key_validated, algorithms=[settings.ALGORITHM])
+    ttl = settings.AUTH_CACHE_TTL_SECONDS
+    if "exp" in payload:
+        ttl = min(ttl, int(payload["exp"] - time.time()))
+    if ttl > 0:
+        _tokens.set(token, payload, ttl_seconds=ttl)
+    return payload
+
+
+def principal_from_user(user: User) -> SimpleNamespace:
+    """Detached, read-only snapshot of the fields request handlers use"""
+    return SimpleNamespace(**{field: getattr(user, field) for field in PRINCIPAL_FIELDS}, is_guest=False)
+
+
+def _dump(principal: SimpleNamespace) -> str:
+    data = {field: getattr(principal, field) for field in PRINCIPAL_FIELDS}
+    for field in DATETIME_FIELDS:
+        data[field] = data[field].isoformat() if data[field] else None
+    return json.dumps(data)
+
+
+def _load(raw: bytes) -> SimpleNamespace:
+    data = json.loads(raw)
+    for field in DATETIME_FIELDS:
+        data[field] = datetime.fromisoformat(data[field]) if data[field] else None
+    return SimpleNamespace(**data, is_guest=False)
+
+
+async def get_principal(email: str) -> Optional[SimpleNamespace]:
+    principal = _principals.get(email)
+    if principal is not None or _redis is None:
+        return principal
+    try:
+        raw = await _redis.get(REDIS_KEY_PREFIX + email)
+    except redis.RedisError as exc:
+        logger.warning("Shared principal cache unavailable: %s", exc)
+        return None
+    if raw is None:
+        return None
+    principal = _load(raw)
+    _principals.set(email, principal, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS)
+    return principal
+
+
+async def store_principal(principal: SimpleNamespace) -> None:
+    _principals.set(principal.email, principal, ttl_seconds=settings.AUTH_CACHE_TTL_SECONDS)
+    if _redis is None:
+        return
+    try:
+        await _redis.set(
+            REDIS_KEY_PREFIX + principal.email, _dump(principal), ex=settings.AUTH_CACHE_SHARED_TTL_SECONDS
+        )
+    except redis.RedisError as exc:
+        logger.warning("Shared principal cache unavailable: %s", exc)
+
+
+async def _invalidate_shared(emails: List[str]) -> None:
+    try:
+        await _redis.delete(*(REDIS_KEY_PREFIX + email for email in emails))
+    except redis.RedisError as exc:
+        logger.warning("Failed to invalidate shared principals %s: %s", emails, exc)
+
+
+def _invalidate_shared_sync(emails: List[str]) -> None:
+    try:
+        _redis_sync.delete(*(REDIS_KEY_PREFIX + email for email in emails))
+    except redis.RedisError as exc:
+        logger.warning("Failed to invalidate shared principals %s: %s", emails, exc)
+
+
+def invalidate_principals(emails: Iterable[str]) -> None:
+    """Drop cached principals here now and in Redis in the background.
+
+    Safe to call from Session hooks: nothing here blocks on Redis. Other
+    workers' local copies expire within the TTL.
+    """
+    emails = [email for email in emails if email]
+    for email in emails:
+        _principals.delete(email)
+    if _redis is None or not emails:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _invalidation_executor.submit(_invalidate_shared_sync, emails)
+        return
+    task = loop.create_task(_invalidate_shared(emails))
+    _invalidation_tasks.add(task)
+    task.add_done_callback(_invalidation_tasks.discard)
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _mark_principal_stale(mapper, connection, target) -> None:
+    session = Session.object_session(target)
+    if session is None:
+        invalidate_principals([target.email])
+        return
+    stale = session.info.setdefault(STALE_PRINCIPALS_KEY, set())
+    stale.add(target.email)
+    # An email change leaves the old snapshot behind under the previous key
+    stale.update(inspect(target).attrs.email.history.deleted or ())
+
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_after_commit(session: Session) -> None:
+    stale = session.info.pop(STALE_PRINCIPALS_KEY, None)
+    if stale:
+        invalidate_principals(stale)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(STALE_PRINCIPALS_KEY, None)
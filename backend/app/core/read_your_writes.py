@@ -0,0 +1,108 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from typing import Optional, Set
+
+import redis
+import redis.asyncio as aioredis
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import RECENT_WRITE_KEY, read_from_primary, replica_engines
+from app.core.logging import logger
+from app.core.shared import SimpleCache
+
+REDIS_KEY_PREFIX = "revamp:recent_write:"
+WROTE_KEY = "wrote_for_user"
+
+# The authenticated user of the current request, so commits can be attributed to them
+request_user_id: ContextVar[Optional[int]] = ContextVar("request_user_id", default=None)
+
+_recent_writers = SimpleCache(max_entries=settings.AUTH_CACHE_MAX_ENTRIES)
+_redis: Optional[aioredis.Redis] = None
+_redis_sync: Optional[redis.Redis] = None
+# Sharing a write runs after the commit hook returns, as with principal invalidation
+_share_executor: Optional[ThreadPoolExecutor] = None
+_share_tasks: Set[asyncio.Task] = set()
+if replica_engines and settings.REDIS_URL:
+    _redis = aioredis.Redis.from_url(settings.REDIS_URL, socket_timeout=1)
+    _redis_sync = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=1)
+    _share_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recent-write-share")
+
+
+async def _share_recent_write(user_id: int, ttl: int) -> None:
+    try:
+        await _redis.set(f"{REDIS_KEY_PREFIX}{user_id}", 1, ex=ttl)
+    except redis.RedisError as exc:
+        logger.warning("Failed to share recent write for user %s: %s", user_id, exc)
+
+
+def _share_recent_write_sync(user_id: int, ttl: int) -> None:
+    try:
+        _redis_sync.set(f"{REDIS_KEY_PREFIX}{user_id}", 1, ex=ttl)
+    except redis.RedisError as exc:
+        logger.warning("Failed to share recent write for user %s: %s", user_id, exc)
+
+
+def mark_recent_write(user_id: int) -> None:
+    """Keep ``user_id``'s later requests on the primary for DB_READ_YOUR_WRITES_SECONDS.
+
+    Never blocks on Redis, so it is safe to call from Session hooks. The
+    current request is switched over by the session's commit (see
+    WriteAsyncSession).
+    """
+    ttl = settings.DB_READ_YOUR_WRITES_SECONDS
+    _recent_writers.set(str(user_id), True, ttl_seconds=ttl)
+    if _redis is None:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        _share_executor.submit(_share_recent_write_sync, user_id, ttl)
+        return
+    task = loop.create_task(_share_recent_write(user_id, ttl))
+    _share_tasks.add(task)
+    task.add_done_callback(_share_tasks.discard)
+
+
+async def track_request_user(user_id: int) -> None:
+    """Attribute this request's commits to ``user_id`` and route its reads for read-your-writes"""
+    request_user_id.set(user_id)
+    if not replica_engines:
+        return
+    recent = _recent_writers.get(str(user_id)) is not None
+    if not recent and _redis is not None:
+        # The write may have been served by another worker
+        try:
+            recent = bool(await _redis.exists(f"{REDIS_KEY_PREFIX}{user_id}"))
+        except redis.RedisError as exc:
+            logger.warning("Recent-write lookup unavailable, reading from primary: %s", exc)
+            recent = True
+    read_from_primary.set(recent)
+
+
+@event.listens_for(Session, "after_flush")
+def _note_flush(session: Session, flush_context) -> None:
+    session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _note_bulk_write(orm_execute_state) -> None:
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info[WROTE_KEY] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _mark_after_commit(session: Session) -> None:
+    wrote = session.info.pop(WROTE_KEY, False)
+    user_id = request_user_id.get()
+    if wrote and user_id and replica_engines:
+        mark_recent_write(user_id)
+        session.info[RECENT_WRITE_KEY] = True
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_after_rollback(session: Session) -> None:
+    session.info.pop(WROTE_KEY, None)
+    session.info.pop(RECENT_WRITE_KEY, None)
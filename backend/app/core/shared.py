@@ -1,7 +1,8 @@
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 import time
 from functools import lru_cache
 
+from fastapi import Depends, HTTPException
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from app.core.config import settings
@@ -36,12 +37,30 @@ def safe_rate_limit(limit_string: str):
             return func
 
         return no_op_decorator
+
+
+def _auth_disabled():
+    raise HTTPException(status_code=403, detail="This endpoint requires ENABLE_AUTH")
+
+
+def auth_dependencies(superuser: bool = False) -> List[Any]:
+    """Route dependencies requiring a signed-in user (or superuser).
+
+    With ENABLE_AUTH off there are no users to sign in, so gated routes are
+    refused outright. app.core.auth (jose, passlib) is only imported when
+    auth is on.
+    """
+    if not settings.ENABLE_AUTH:
+        return [Depends(_auth_disabled)]
+    from app.core.auth import get_current_active_user, get_current_superuser
+    return [Depends(get_current_superuser if superuser else get_current_active_user)]
 
 
 # Simple in-memory cache with TTL
 class SimpleCache:
-    def __init__(self):
+    def __init__(self, max_entries: Optional[int] = None):
         self._cache: Dict[str, Dict[str, Any]] = {}
+        self.max_entries = max_entries
 
     def get(self, key: str) -> Any:
         if key in self._cache:
@@ -53,11 +72,17 @@ class SimpleCache:
         return None
 
     def set(self, key: str, value: Any, ttl_seconds: int = 300):
+        if self.max_entries and key not in self._cache and len(self._cache) >= self.max_entries:
+            # Evict the oldest insertion (dicts keep insertion order)
+            self._cache.pop(next(iter(self._cache)), None)
         self._cache[key] = {
             'value': value,
             'expires': time.time() + ttl_seconds
         }
 
+    def delete(self, key: str):
+        self._cache.pop(key, None)
+
     def clear(self):
         self._cache.clear()
 
@@ -0,0 +1,51 @@
+import importlib
+import time
+from contextlib import contextmanager
+from types import ModuleType
+from typing import Any, Dict, Iterator, List, Optional
+
+from app.core.logging import logger
+
+
+class StartupReport:
+    """Wall-clock timings for the imports and init steps that make up startup"""
+
+    def __init__(self):
+        self._origin = time.perf_counter()
+        self.steps: List[Dict[str, Any]] = []
+        self.ready_ms: Optional[float] = None
+
+    @contextmanager
+    def step(self, kind: str, name: str) -> Iterator[None]:
+        begin = time.perf_counter()
+        ok = False
+        try:
+            yield
+            ok = True
+        finally:
+            self.steps.append({
+                "kind": kind,
+                "name": name,
+                "ms": round((time.perf_counter() - begin) * 1000, 2),
+                "ok": ok,
+            })
+
+    def import_module(self, name: str) -> ModuleType:
+        """Import ``name`` and record how long it took (including modules it pulls in first)"""
+        with self.step("import", name):
+            return importlib.import_module(name)
+
+    def mark_ready(self) -> None:
+        self.ready_ms = round((time.perf_counter() - self._origin) * 1000, 2)
+        slowest = sorted(self.steps, key=lambda step: step["ms"], reverse=True)[:5]
+        logger.info(
+            "Startup finished in %.0f ms; slowest steps: %s",
+            self.ready_ms,
+            ", ".join(f"{step['kind']} {step['name']} {step['ms']:.0f} ms" for step in slowest),
+        )
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"ready_ms": self.ready_ms, "steps": self.steps}
+
+
+startup_report = StartupReport()
@@ -1,4 +1,5 @@
-from fastapi import FastAPI, Request, Depends
+from app.core.startup import startup_report  # first, so the report's clock covers every import below
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from slowapi.errors import RateLimitExceeded
@@ -6,24 +7,31 @@ from slowapi.middleware import SlowAPIMiddleware
 from app.core.shared import limiter
 from app.core.config import settings
 from app.core.logging import logger
-from app.core.database import engine
-from app.models.base import Base
-import app.models.zone_snapshot  # Ensure snapshot model is registered
-from app.routers.health import router as health_router
-from app.routers.zones import router as zones_router
-from app.core.database import get_db
-from sqlalchemy.orm import Session
+from app.core.database import SessionLocal, engine
+from app.core.deadlines import DeadlineMiddleware
+from app.core.pagination import NEXT_CURSOR_HEADER
 from sqlalchemy.exc import OperationalError
 from sqlalchemy import text
-from app.routers.auth import router as auth_router
-from app.routers.parking_history import router as parking_history_router
-from app.routers.favorites import router as favorites_router
-from app.routers.payments import router as payments_router
 
 
 # Initialize logging
 logger.info("Starting revAMP API server")
 
+PAYMENTS_ENABLED = settings.ENABLE_PAYMENTS and settings.ENABLE_AUTH
+if settings.ENABLE_PAYMENTS and not settings.ENABLE_AUTH:
+    logger.warning("ENABLE_PAYMENTS requires ENABLE_AUTH; payments are disabled")
+
+# (enabled, router module, include_router kwargs); a disabled feature's module is never imported
+ROUTERS = [
+    (True, "app.routers.health", {}),
+    (True, "app.routers.zones", {}),
+    (settings.ENABLE_ANALYTICS, "app.routers.analytics", {}),
+    (settings.ENABLE_AUTH, "app.routers.auth", {"prefix": "/auth", "tags": ["Authentication"]}),
+    (settings.ENABLE_AUTH, "app.routers.parking_history", {"prefix": "/parking", "tags": ["Parking History"]}),
+    (settings.ENABLE_AUTH, "app.routers.favorites", {"prefix": "/favorites", "tags": ["Favorites"]}),
+    (PAYMENTS_ENABLED, "app.routers.payments", {"prefix": "/payments", "tags": ["Payments"]}),
+]
+
 app = FastAPI(title=settings.API_TITLE, version=settings.API_VERSION)
 
 # CORS configuration
@@ -33,6 +41,7 @@ app.add_middleware(
     allow_credentials=settings.CORS_ALLOW_CREDENTIALS,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER],
 )
 logger.info("CORS origins configured: %s", settings.cors_origins_list)
 
@@ -41,17 +50,81 @@ logger.info("CORS origins configured: %s", settings.cors_origins_list)
 app.state.limiter = limiter
 app.add_middleware(SlowAPIMiddleware)
 
+# Per-request deadline for upstream calls (X-Request-Timeout-Ms)
+app.add_middleware(DeadlineMiddleware)
+
+
+def create_tables() -> None:
+    """Create missing tables and backfill payment rollups (local mode; see DB_CREATE_TABLES_ON_STARTUP)"""
+    from app import models  # noqa: F401  registers every model on Base.metadata
+    from app.models.base import Base
+    from app.services.payment_rollups import ensure_monthly_totals
+
+    Base.metadata.create_all(bind=engine)
+    logger.info("Database tables ensured.")
+    db = SessionLocal()
+    try:
+        ensure_monthly_totals(db)
+    finally:
+        db.close()
+
 
 @app.on_event("startup")
 async def startup_event():
-    # Create all database tables
-    # Use try/except so app can start even if DB is temporarily unavailable (e.g., sleeping Postgres)
-    try:
-        Base.metadata.create_all(bind=engine)
-        logger.info("Database tables ensured.")
-    except OperationalError as e:
-        logger.warning("DB not reachable on startup: %s", e)
-        logger.warning("Continuing without creating tables on startup.")
+    if settings.DB_CREATE_TABLES_ON_STARTUP:
+        # Use try/except so app can start even if DB is temporarily unavailable (e.g., sleeping Postgres)
+        try:
+            with startup_report.step("init", "create_tables"):
+                create_tables()
+        except OperationalError as e:
+            logger.warning("DB not reachable on startup: %s", e)
+            logger.warning("Continuing without creating tables on startup.")
+
+    if settings.ENABLE_ANALYTICS:
+        from app.routers.zones import cached_zone_name
+        from app.services.analytics_ingest import start_analytics_ingest
+        from app.services.analytics_sync import start_analytics_sync
+
+        with startup_report.step("init", "analytics_ingest"):
+            start_analytics_ingest(cached_zone_name)
+        with startup_report.step("init", "analytics_sync"):
+            start_analytics_sync()
+    if settings.ENABLE_AUTH:
+        from app.services.favorite_usage import start_favorite_usage_flush
+
+        with startup_report.step("init", "favorite_usage_flush"):
+            start_favorite_usage_flush()
+    if PAYMENTS_ENABLED:
+        from app.services.stripe_webhooks import start_stripe_webhook_worker
+
+        with startup_report.step("init", "stripe_webhook_worker"):
+            start_stripe_webhook_worker()
+    startup_report.mark_ready()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Apply queued tracking events, then flush pending counters to the shared store
+    if PAYMENTS_ENABLED:
+        from app.services.stripe_webhooks import stop_stripe_webhook_worker
+
+        await stop_stripe_webhook_worker()
+    if settings.ENABLE_ANALYTICS:
+        from app.services.analytics_ingest import stop_analytics_ingest
+        from app.services.analytics_sync import stop_analytics_sync
+
+        stop_analytics_ingest()
+        stop_analytics_sync()
+    if settings.ENABLE_AUTH:
+        from app.core.passwords import shutdown_password_hasher
+        from app.services.favorite_usage import stop_favorite_usage_flush
+
+        stop_favorite_usage_flush()
+        shutdown_password_hasher()
+    if PAYMENTS_ENABLED:
+        from app.services.stripe_client import shutdown_stripe_client
+
+        shutdown_stripe_client()
 
 @app.get("/health/db")
 def health_db():
@@ -79,9 +152,8 @@ async def rate_limit_handler(request: Request, exc: RateLimitExceeded):
 
 
 
-app.include_router(health_router)
-app.include_router(zones_router)
-app.include_router(auth_router, prefix="/auth", tags=["Authentication"])
-app.include_router(parking_history_router, prefix="/parking", tags=["Parking History"])
-app.include_router(favorites_router, prefix="/favorites", tags=["Favorites"])
-app.include_router(payments_router, prefix="/payments", tags=["Payments"])
+for enabled, module_name, options in ROUTERS:
+    if enabled:
+        app.include_router(startup_report.import_module(module_name).router, **options)
+    else:
+        logger.info("Feature router %s disabled by settings", module_name)
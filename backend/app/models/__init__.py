@@ -3,8 +3,9 @@ from .base import Base
 from .user import User
 from .parking_history import ParkingHistory
 from .favorite_zone import FavoriteZone
-from .payment import Payment
+from .payment import Payment, PaymentMonthlyTotal, StripeWebhookEvent
 from .zone_snapshot import ZoneSnapshot
+from .analytics import SearchEvent, ZonePopularity, DailyStats, UserSession, AnalyticsRollup
 
 __all__ = [
     "Base",
@@ -12,9 +13,12 @@ __all__ = [
     "ParkingHistory",
     "FavoriteZone",
     "Payment",
+    "PaymentMonthlyTotal",
+    "StripeWebhookEvent",
     "ZoneSnapshot",
     "SearchEvent",
     "ZonePopularity",
     "DailyStats",
     "UserSession",
+    "AnalyticsRollup",
 ]
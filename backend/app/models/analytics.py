@@ -0,0 +1,88 @@
+from datetime import datetime
+
+from sqlalchemy import (
+    BigInteger,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    LargeBinary,
+    String,
+    UniqueConstraint,
+)
+
+from .base import Base
+
+# SQLite only auto-increments INTEGER PRIMARY KEY columns
+BigIntegerId = BigInteger().with_variant(Integer, "sqlite")
+
+ROLLUP_GRANULARITIES = ("minute", "hour", "day")
+
+# zone_code used for rollup rows that count all zones together
+ALL_ZONES = "*"
+
+
+class SearchEvent(Base):
+    """Raw tracking event (search or directions request)"""
+
+    __tablename__ = "search_events"
+
+    id = Column(BigIntegerId, primary_key=True, autoincrement=True)
+    event_type = Column(String, nullable=False, default="search")  # "search", "directions"
+    zone_code = Column(String, nullable=False)
+    zone_name = Column(String, nullable=True)
+    occurred_at = Column(DateTime, nullable=False, index=True)
+    client_ip = Column(String, nullable=True)  # anonymized
+    user_agent = Column(String, nullable=True)
+    session_id = Column(String, nullable=True)
+
+
+class ZonePopularity(Base):
+    """All-time counters per zone"""
+
+    __tablename__ = "zone_popularity"
+
+    zone_code = Column(String, primary_key=True)
+    search_count = Column(BigInteger, nullable=False, default=0)
+    directions_requested = Column(BigInteger, nullable=False, default=0)
+    last_accessed = Column(DateTime, nullable=True)
+
+
+class DailyStats(Base):
+    """Per-day totals; unique users are a merged HyperLogLog sketch"""
+
+    __tablename__ = "daily_stats"
+
+    date = Column(Date, primary_key=True)
+    total_searches = Column(BigInteger, nullable=False, default=0)
+    total_directions = Column(BigInteger, nullable=False, default=0)
+    unique_users = Column(Integer, nullable=False, default=0)
+    unique_users_sketch = Column(LargeBinary, nullable=True)
+
+
+class UserSession(Base):
+    """Anonymous client session identified by the X-Session-Id header"""
+
+    __tablename__ = "user_sessions"
+
+    session_id = Column(String, primary_key=True)
+    first_seen = Column(DateTime, nullable=False, default=datetime.utcnow)
+    last_seen = Column(DateTime, nullable=False, default=datetime.utcnow)
+    total_searches = Column(Integer, nullable=False, default=0)
+
+
+class AnalyticsRollup(Base):
+    """Search/directions counts per time bucket and zone (``ALL_ZONES`` for totals)"""
+
+    __tablename__ = "analytics_rollups"
+
+    id = Column(BigIntegerId, primary_key=True, autoincrement=True)
+    granularity = Column(String, nullable=False)  # "minute", "hour", "day"
+    bucket_start = Column(DateTime, nullable=False)
+    zone_code = Column(String, nullable=False, default=ALL_ZONES)
+    searches = Column(BigInteger, nullable=False, default=0)
+    directions = Column(BigInteger, nullable=False, default=0)
+
+    __table_args__ = (
+        UniqueConstraint("granularity", "bucket_start", "zone_code", name="uq_analytics_rollup_bucket"),
+    )
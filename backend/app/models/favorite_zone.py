@@ -1,5 +1,5 @@
 # models/favorite_zone.py
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from .base import Base, TimestampMixin
 
@@ -23,5 +23,7 @@ class FavoriteZone(Base, TimestampMixin):
     user = relationship("User", back_populates="favorite_zones")
 
     __table_args__ = (
+        Index("uq_favorite_zones_user_zone", "user_id", "zone_code", unique=True),
+        Index("ix_favorite_zones_user_order", "user_id", "display_order"),
         {'sqlite_autoincrement': True},
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
 # models/parking_history.py
-from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base, TimestampMixin
 
@@ -33,4 +33,10 @@ class ParkingHistory(Base, TimestampMixin):
 
     # Relationships
     user = relationship("User", back_populates="parking_history")
-    payment = relationship("Payment", back_populates="parking_session", uselist=False)
\ No newline at end of file
+    payment = relationship("Payment", back_populates="parking_session", uselist=False)
+
+    __table_args__ = (
+        # History/stats filter by user (and status) and order by start time
+        Index("ix_parking_history_user_status_start", "user_id", "status", "start_time"),
+        Index("ix_parking_history_user_start", "user_id", "start_time"),
+    )
\ No newline at end of file
@@ -1,5 +1,5 @@
 # models/payment.py
-from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, DateTime, Text, ForeignKey, Index
 from sqlalchemy.orm import relationship
 from .base import Base, TimestampMixin
 
@@ -31,6 +31,11 @@ class Payment(Base, TimestampMixin):
     user = relationship("User", back_populates="payments")
     parking_session = relationship("ParkingHistory", back_populates="payment")
 
+    __table_args__ = (
+        Index("ix_payments_user_created", "user_id", "created_at"),
+        Index("uq_payments_stripe_payment_intent_id", "stripe_payment_intent_id", unique=True),
+    )
+
     @property
     def metadata_dict(self):
         """Get payment metadata as dict"""
@@ -44,4 +49,32 @@ class Payment(Base, TimestampMixin):
     def metadata_dict(self, value):
         """Set payment metadata as JSON string"""
         import json
-        self.payment_metadata = json.dumps(value)
\ No newline at end of file
+        self.payment_metadata = json.dumps(value)
+
+class PaymentMonthlyTotal(Base):
+    """Per-user ledger rollup of completed payments by month (YYYY-MM of created_at)"""
+    __tablename__ = "payment_monthly_totals"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    month = Column(String(7), primary_key=True)
+    total_amount = Column(Float, nullable=False, default=0.0)
+    transaction_count = Column(Integer, nullable=False, default=0)
+
+class StripeWebhookEvent(Base):
+    """Received Stripe webhook events, keyed by event id so redeliveries are recorded once"""
+    __tablename__ = "stripe_webhook_events"
+
+    id = Column(String, primary_key=True)  # Stripe event id (evt_...)
+    type = Column(String, nullable=False)
+    payment_intent_id = Column(String, nullable=True)
+    payload = Column(Text, nullable=False)  # JSON of event.data.object
+    status = Column(String, nullable=False, default="pending")  # "pending", "processed", "failed"
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    stripe_created = Column(Integer, nullable=True)  # event.created (unix time), for ordering
+    received_at = Column(DateTime, nullable=False)
+    processed_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_stripe_webhook_events_status_received", "status", "received_at"),
+    )
@@ -1,11 +1,8 @@
 # models/user.py
 from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
 from sqlalchemy.orm import relationship
-from passlib.context import CryptContext
 from .base import Base, TimestampMixin
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 class User(Base, TimestampMixin):
     __tablename__ = "users"
 
@@ -28,10 +25,12 @@ class User(Base, TimestampMixin):
     payments = relationship("Payment", back_populates="user")
 
     def verify_password(self, password: str) -> bool:
-        return pwd_context.verify(password, self.hashed_password)
+        from app.core.passwords import get_pwd_context
+        return get_pwd_context().verify(password, self.hashed_password)
 
     def hash_password(self, password: str) -> str:
-        return pwd_context.hash(password)
+        from app.core.passwords import get_pwd_context
+        return get_pwd_context().hash(password)
 
     @property
     def preferences(self):
@@ -0,0 +1,330 @@
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional, Tuple
+from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from app.schemas.zones import AnalyticsResponse, AnalyticsHistoryResponse, ZoneAnalytics
+from app.services.analytics_export import EXPORT_FORMATS, InvalidCursor, decode_cursor, stream_export
+from app.services.analytics_ingest import TrackingEvent, analytics_ingest
+from app.services.analytics_sync import get_analytics_view, reset_daily_analytics
+from app.services.analytics_rollups import (
+    choose_granularity,
+    get_daily_stats,
+    get_hourly_distribution,
+    get_rollup_series,
+    get_top_zones_between,
+)
+from app.models.analytics import ALL_ZONES
+from app.routers.zones import ZONE_CODE_PATTERN, get_cached_zones_data
+from app.core.shared import auth_dependencies, safe_rate_limit, CITY_BOUNDS
+from app.core.logging import logger
+from app.core.config import settings
+from app.core.database import ReadSessionLocal, get_read_db
+
+# Longest range accepted by the rollup-backed analytics queries
+ANALYTICS_MAX_RANGE_DAYS = 366
+
+router = APIRouter()
+
+
+def _utc_naive(value: datetime) -> datetime:
+    """Analytics rows are stored in naive UTC; convert offset-aware query values to match"""
+    if value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _analytics_range(start: datetime, end: Optional[datetime]) -> Tuple[datetime, datetime]:
+    start = _utc_naive(start)
+    end = _utc_naive(end) if end is not None else datetime.utcnow()
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > timedelta(days=ANALYTICS_MAX_RANGE_DAYS):
+        raise HTTPException(status_code=400, detail=f"Range cannot exceed {ANALYTICS_MAX_RANGE_DAYS} days")
+    return start, end
+
+
+def _session_id(request: Request) -> str:
+    """Reuse the client's X-Session-Id when it is a valid UUID, else start a new session"""
+    raw = request.headers.get("x-session-id", "")
+    try:
+        return str(uuid.UUID(raw))
+    except ValueError:
+        return str(uuid.uuid4())
+
+
+
+@router.post("/api/analytics/search/{zone_code:path}", status_code=202)
+@safe_rate_limit("100/minute")
+def track_search(request: Request, zone_code: str):
+    """Track when a user searches for a zone (queued; applied in the background)"""
+    # Validate zone_code input
+    if not ZONE_CODE_PATTERN.match(zone_code):
+        raise HTTPException(status_code=400, detail="Invalid zone code format")
+
+    # Anonymize IP for privacy; zone names are resolved by the ingest consumer
+    client_ip = request.client.host if request.client else "unknown"
+    anonymized_ip = ".".join(client_ip.split(".")[:2] + ["x", "x"]) if "." in client_ip else "anonymous"
+    session_id = _session_id(request)
+    queued = analytics_ingest.submit(
+        TrackingEvent(
+            kind="search",
+            zone_code=zone_code,
+            client_ip=client_ip,
+            anonymized_ip=anonymized_ip,
+            user_agent=request.headers.get("user-agent", "")[:200],
+            session_id=session_id,
+        )
+    )
+    return {"message": "Search accepted", "session_id": session_id, "queued": queued}
+
+
+@router.post("/api/analytics/directions/{zone_code:path}", status_code=202)
+@safe_rate_limit("50/minute")
+def track_directions_request(request: Request, zone_code: str):
+    """Track when a user requests directions to a zone (queued; applied in the background)"""
+    # Validate zone_code input
+    if not ZONE_CODE_PATTERN.match(zone_code):
+        raise HTTPException(status_code=400, detail="Invalid zone code format")
+    queued = analytics_ingest.submit(TrackingEvent(kind="directions", zone_code=zone_code))
+    return {"message": "Directions request accepted", "queued": queued}
+
+
+@router.get("/api/analytics/ingest")
+@safe_rate_limit("30/minute")
+def get_ingest_status(request: Request):
+    """Get tracking queue depth and load-shedding counters for this worker"""
+    return analytics_ingest.stats()
+
+
+@router.get("/api/analytics/overview", response_model=AnalyticsResponse)
+@safe_rate_limit("20/minute")
+def get_analytics_overview(request: Request):
+    """Get comprehensive analytics overview"""
+    try:
+        return AnalyticsResponse(**get_analytics_view().overview())
+
+    except Exception as e:
+        logger.error(f"Error generating analytics overview: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to generate analytics")
+
+
+@router.get("/api/analytics/zones/{zone_code}", response_model=ZoneAnalytics)
+@safe_rate_limit("30/minute")
+def get_zone_analytics(request: Request, zone_code: str, db: Session = Depends(get_read_db)):
+    """Get detailed analytics for a specific zone"""
+    try:
+        analytics = get_analytics_view().zone_stats(zone_code)
+
+        # Get zone name
+        zone_result = get_cached_zones_data(
+            CITY_BOUNDS["left_long"],
+            CITY_BOUNDS["right_long"],
+            CITY_BOUNDS["top_lat"],
+            CITY_BOUNDS["bottom_lat"],
+            db,
+        )
+        entry = zone_result.zone_index.get(zone_code)
+        zone_name = entry.name if entry else "Unknown Zone"
+        coordinates = entry.first_coordinate if entry else None
+
+        return ZoneAnalytics(
+            zone_code=zone_code,
+            zone_name=zone_name,
+            search_count=analytics["search_count"],
+            directions_requested=analytics["directions_requested"],
+            last_accessed=analytics["last_accessed"],
+            coordinates=coordinates
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting zone analytics for {zone_code}: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get zone analytics")
+
+
+@router.get("/api/analytics/history", response_model=AnalyticsHistoryResponse)
+@safe_rate_limit("20/minute")
+def get_analytics_history(
+    request: Request,
+    start: datetime,
+    end: Optional[datetime] = None,
+    granularity: Optional[str] = Query(None, pattern="^(minute|hour|day)$"),
+    zone_code: Optional[str] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Get search/directions counts over a date range from the rollup tables"""
+    start, end = _analytics_range(start, end)
+    if zone_code is not None and not ZONE_CODE_PATTERN.match(zone_code):
+        raise HTTPException(status_code=400, detail="Invalid zone code format")
+    granularity = granularity or choose_granularity(start, end)
+    try:
+        series = get_rollup_series(db, start, end, granularity, zone_code or ALL_ZONES)
+        return AnalyticsHistoryResponse(
+            granularity=granularity,
+            zone_code=zone_code or ALL_ZONES,
+            start=start.isoformat(),
+            end=end.isoformat(),
+            series=series,
+            total_searches=sum(row["searches"] for row in series),
+            total_directions=sum(row["directions"] for row in series),
+        )
+
+    except Exception as e:
+        logger.error(f"Error getting analytics history: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get analytics history")
+
+
+@router.get("/api/analytics/export", dependencies=auth_dependencies(superuser=True))
+@safe_rate_limit("5/minute")
+def export_analytics(
+    request: Request,
+    start: datetime,
+    end: Optional[datetime] = None,
+    dataset: str = Query("events", pattern="^(events|rollups)$"),
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    cursor: Optional[str] = None,
+    zone_code: Optional[str] = None,
+    granularity: Optional[str] = Query(None, pattern="^(minute|hour|day)$"),
+):
+    """Stream raw events or rollups for a date range as NDJSON or CSV (admin only).
+
+    Each row has a ``cursor``; pass the last one received to resume.
+    """
+    start, end = _analytics_range(start, end)
+    if zone_code is not None and not ZONE_CODE_PATTERN.match(zone_code):
+        raise HTTPException(status_code=400, detail="Invalid zone code format")
+    if granularity is not None and dataset != "rollups":
+        raise HTTPException(status_code=400, detail="granularity only applies to the rollups dataset")
+    try:
+        after_id = decode_cursor(dataset, cursor) if cursor else 0
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    filters = {"zone_code": zone_code}
+    if dataset == "rollups":
+        filters["granularity"] = granularity
+    filename = f"analytics-{dataset}-{start:%Y%m%d%H%M}-{end:%Y%m%d%H%M}.{format}"
+    return StreamingResponse(
+        stream_export(ReadSessionLocal, dataset, format, start, end, after_id=after_id, **filters),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/api/analytics/top-zones")
+@safe_rate_limit("20/minute")
+def get_top_zones(
+    request: Request,
+    limit: int = 10,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Get most searched parking zones (live, or over a date range from rollups)"""
+    if start is not None:
+        start, end = _analytics_range(start, end)
+    try:
+        if start is not None:
+            return {"top_zones": get_top_zones_between(db, start, end, limit)}
+        return {"top_zones": get_analytics_view().top_zones(limit)}
+
+    except Exception as e:
+        logger.error(f"Error getting top zones: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get top zones")
+
+
+@router.get("/api/analytics/peak-hours")
+@safe_rate_limit("20/minute")
+def get_peak_hours_analytics(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: Session = Depends(get_read_db),
+):
+    """Get peak usage hours analytics (today, or over a date range from rollups)"""
+    if start is not None:
+        start, end = _analytics_range(start, end)
+    try:
+        if start is not None:
+            peak_hours = get_hourly_distribution(db, start, end)
+        else:
+            peak_hours = get_analytics_view().peak_hours()
+
+        # Get top 5 peak hours
+        sorted_hours = sorted(peak_hours.items(), key=lambda x: x[1], reverse=True)[:5]
+
+        result = {
+            "peak_hours": [{"hour": hour, "searches": count} for hour, count in sorted_hours],
+            "all_hours": peak_hours,
+        }
+        if start is not None:
+            result.update(start=start.isoformat(), end=end.isoformat(), total_searches=sum(peak_hours.values()))
+        else:
+            result["total_searches_today"] = sum(peak_hours.values())
+        return result
+
+    except Exception as e:
+        logger.error(f"Error getting peak hours analytics: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get peak hours analytics")
+
+
+@router.get("/api/analytics/daily-summary")
+@safe_rate_limit("20/minute")
+def get_daily_summary(
+    request: Request,
+    day: Optional[date] = Query(None, alias="date"),
+    db: Session = Depends(get_read_db),
+):
+    """Get comprehensive daily analytics summary (today, or a past date from storage)"""
+    try:
+        if day is None or day == datetime.utcnow().date():
+            view = get_analytics_view()
+            daily = view.daily_summary()
+            peak_hours = view.peak_hours()
+        else:
+            day_start = datetime.combine(day, datetime.min.time())
+            day_end = day_start + timedelta(days=1) - timedelta(microseconds=1)
+            stats = get_daily_stats(db, day)
+            daily = {
+                "date": day.isoformat(),
+                "total_searches": stats.total_searches if stats else 0,
+                "total_directions": stats.total_directions if stats else 0,
+                "unique_users": stats.unique_users if stats else 0,
+                "popular_zones": {
+                    zone["zone_code"]: zone["search_count"]
+                    for zone in get_top_zones_between(db, day_start, day_end, settings.ANALYTICS_TOP_K)
+                },
+            }
+            peak_hours = get_hourly_distribution(db, day_start, day_end)
+        return {
+            "date": daily["date"],
+            "summary": {
+                "total_searches": daily["total_searches"],
+                "total_directions": daily["total_directions"],
+                "unique_users": daily["unique_users"],
+                "conversion_rate": round(
+                    (daily["total_directions"] / max(daily["total_searches"], 1)) * 100, 2
+                )
+            },
+            "popular_zones_today": daily["popular_zones"],
+            "peak_hour": max(peak_hours.items(), key=lambda x: x[1], default=("N/A", 0))[0]
+        }
+
+    except Exception as e:
+        logger.error(f"Error getting daily summary: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to get daily summary")
+
+
+@router.post("/api/analytics/reset-daily", dependencies=auth_dependencies())
+@safe_rate_limit("5/minute")
+def reset_daily_stats(request: Request):
+    """Reset daily statistics (requires authentication)"""
+    try:
+        reset_daily_analytics()
+
+        return {"message": "Daily statistics reset successfully"}
+
+    except Exception as e:
+        logger.error(f"Error resetting daily stats: {str(e)}")
+        raise HTTPException(status_code=500, detail="Failed to reset daily stats")
@@ -4,7 +4,8 @@ import uuid
 from typing import Any
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy import or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 from app.core.auth import (
@@ -12,7 +13,8 @@ from app.core.auth import (
     get_current_active_user, get_current_user
 )
 from app.core.config import settings
-from app.core.database import get_db
+from app.core.database import get_async_db
+from app.core.passwords import hash_password, verify_password
 from app.models.user import User
 from app.schemas.auth import UserCreate, UserLogin, Token, User as UserSchema, UserUpdate
 from app.schemas.zones import ErrorResponse
@@ -20,13 +22,13 @@ from app.schemas.zones import ErrorResponse
 router = APIRouter()
 
 @router.post("/register", response_model=UserSchema)
-async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Any:
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)) -> Any:
     """Register a new user"""
     try:
         # Check if user already exists
-        db_user = db.query(User).filter(
-            (User.email == user_data.email) | (User.username == user_data.username)
-        ).first()
+        db_user = (await db.execute(
+            select(User).where(or_(User.email == user_data.email, User.username == user_data.username))
+        )).scalars().first()
         if db_user:
             raise HTTPException(
                 status_code=400,
@@ -34,7 +36,7 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Any:
             )
 
         # Create new user
-        hashed_password = User().hash_password(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         db_user = User(
             email=user_data.email,
             username=user_data.username,
@@ -42,12 +44,12 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Any:
             hashed_password=hashed_password
         )
         db.add(db_user)
-        db.commit()
-        db.refresh(db_user)
+        await db.commit()
+        await db.refresh(db_user)
         return db_user
 
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail="Email or username already registered"
@@ -56,14 +58,14 @@ async def register(user_data: UserCreate, db: Session = Depends(get_db)) -> Any:
 @router.post("/token", response_model=Token)
 async def login_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ) -> Any:
     """Login user and return access token (OAuth2 form)"""
-    user = db.query(User).filter(
-        (User.email == form_data.username) | (User.username == form_data.username)
-    ).first()
+    user = (await db.execute(
+        select(User).where(or_(User.email == form_data.username, User.username == form_data.username))
+    )).scalars().first()
 
-    if not user or not user.verify_password(form_data.password):
+    if not user or not await verify_password(form_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/username or password",
@@ -83,11 +85,11 @@ async def login_token(
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.post("/login", response_model=Token)
-async def login(user_data: UserLogin, db: Session = Depends(get_db)) -> Any:
+async def login(user_data: UserLogin, db: AsyncSession = Depends(get_async_db)) -> Any:
     """Login user and return access token (JSON)"""
-    user = db.query(User).filter(User.email == user_data.email).first()
+    user = (await db.execute(select(User).where(User.email == user_data.email))).scalars().first()
 
-    if not user or not user.verify_password(user_data.password):
+    if not user or not await verify_password(user_data.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -125,26 +127,31 @@ async def read_users_me(current_user: User = Depends(get_current_user)):
 async def update_user(
     user_update: UserUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update current user information"""
     update_data = user_update.dict(exclude_unset=True)
 
     # Hash password if it's being updated
     if "password" in update_data:
-        update_data["hashed_password"] = User().hash_password(update_data.pop("password"))
+        update_data["hashed_password"] = await hash_password(update_data.pop("password"))
+
+    # current_user is a cached snapshot; update the persistent row (commit invalidates the cache)
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(status_code=404, detail="User not found")
 
     # Update user fields
     for field, value in update_data.items():
-        if hasattr(current_user, field):
-            setattr(current_user, field, value)
+        if hasattr(user, field):
+            setattr(user, field, value)
 
     try:
-        db.commit()
-        db.refresh(current_user)
-        return current_user
+        await db.commit()
+        await db.refresh(user)
+        return user
     except IntegrityError:
-        db.rollback()
+        await db.rollback()
         raise HTTPException(
             status_code=400,
             detail="Email or username already taken"
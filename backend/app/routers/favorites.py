@@ -1,14 +1,18 @@
 # routers/favorites.py
 from typing import List
 from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.database import get_async_db, get_async_read_db
 from app.models.user import User
 from app.models.favorite_zone import FavoriteZone
 from app.schemas.favorites import FavoriteZoneCreate, FavoriteZoneUpdate, FavoriteZoneResponse, FavoriteReorderRequest
 from app.core.shared import safe_rate_limit
+from app.services.favorite_usage import favorite_usage
 
 router = APIRouter()
 
@@ -18,22 +22,22 @@ async def add_favorite_zone(
     request: Request,
     favorite_data: FavoriteZoneCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a zone to user's favorites"""
     # Check if already favorited
-    existing = db.query(FavoriteZone).filter(
+    existing = (await db.execute(select(FavoriteZone.id).where(
         FavoriteZone.user_id == current_user.id,
         FavoriteZone.zone_code == favorite_data.zone_code
-    ).first()
+    ))).first()
 
     if existing:
         raise HTTPException(status_code=400, detail="Zone already in favorites")
 
     # Get max display order
-    max_order = db.query(FavoriteZone).filter(
+    max_order = await db.scalar(select(func.count(FavoriteZone.id)).where(
         FavoriteZone.user_id == current_user.id
-    ).count()
+    ))
 
     favorite = FavoriteZone(
         user_id=current_user.id,
@@ -44,8 +48,13 @@ async def add_favorite_zone(
     )
 
     db.add(favorite)
-    db.commit()
-    db.refresh(favorite)
+    try:
+        await db.commit()
+    except IntegrityError:
+        # Concurrent add of the same zone lost the race on uq_favorite_zones_user_zone
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Zone already in favorites")
+    await db.refresh(favorite)
     return favorite
 
 @router.get("/", response_model=List[FavoriteZoneResponse])
@@ -53,12 +62,21 @@ async def add_favorite_zone(
 async def get_favorite_zones(
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get user's favorite zones"""
-    favorites = db.query(FavoriteZone).filter(
+    favorites = (await db.execute(select(FavoriteZone).where(
         FavoriteZone.user_id == current_user.id
-    ).order_by(FavoriteZone.display_order).all()
+    ).order_by(FavoriteZone.display_order))).scalars().all()
+
+    # Include uses that are still buffered for the next flush
+    for favorite in favorites:
+        pending = favorite_usage.pending(favorite.id, current_user.id)
+        if pending:
+            uses, last_used = pending
+            set_committed_value(favorite, "times_used", (favorite.times_used or 0) + uses)
+            if favorite.last_used is None or favorite.last_used < last_used:
+                set_committed_value(favorite, "last_used", last_used)
     return favorites
 
 @router.patch("/reorder")
@@ -67,14 +85,14 @@ async def reorder_favorites(
     request: Request,
     reorder_data: FavoriteReorderRequest,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Bulk-update display_order for the user's favorites"""
     favorite_ids = [item.id for item in reorder_data.order]
-    favorites = db.query(FavoriteZone).filter(
+    favorites = (await db.execute(select(FavoriteZone).where(
         FavoriteZone.id.in_(favorite_ids),
         FavoriteZone.user_id == current_user.id
-    ).all()
+    ))).scalars().all()
 
     fav_map = {f.id: f for f in favorites}
     for item in reorder_data.order:
@@ -82,7 +100,7 @@ async def reorder_favorites(
             raise HTTPException(status_code=404, detail=f"Favorite {item.id} not found")
         fav_map[item.id].display_order = item.display_order
 
-    db.commit()
+    await db.commit()
     return {"message": "Favorites reordered successfully"}
 
 @router.put("/{favorite_id}", response_model=FavoriteZoneResponse)
@@ -92,13 +110,13 @@ async def update_favorite_zone(
     favorite_id: int,
     favorite_data: FavoriteZoneUpdate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update a favorite zone"""
-    favorite = db.query(FavoriteZone).filter(
+    favorite = (await db.execute(select(FavoriteZone).where(
         FavoriteZone.id == favorite_id,
         FavoriteZone.user_id == current_user.id
-    ).first()
+    ))).scalar_one_or_none()
 
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite zone not found")
@@ -108,8 +126,8 @@ async def update_favorite_zone(
         if hasattr(favorite, field):
             setattr(favorite, field, value)
 
-    db.commit()
-    db.refresh(favorite)
+    await db.commit()
+    await db.refresh(favorite)
     return favorite
 
 @router.delete("/{favorite_id}")
@@ -118,19 +136,19 @@ async def remove_favorite_zone(
     request: Request,
     favorite_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove a zone from user's favorites"""
-    favorite = db.query(FavoriteZone).filter(
+    favorite = (await db.execute(select(FavoriteZone).where(
         FavoriteZone.id == favorite_id,
         FavoriteZone.user_id == current_user.id
-    ).first()
+    ))).scalar_one_or_none()
 
     if not favorite:
         raise HTTPException(status_code=404, detail="Favorite zone not found")
 
-    db.delete(favorite)
-    db.commit()
+    await db.delete(favorite)
+    await db.commit()
     return {"message": "Favorite zone removed successfully"}
 
 @router.post("/{favorite_id}/use")
@@ -139,22 +157,17 @@ async def record_zone_usage(
     request: Request,
     favorite_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Record that a favorite zone was used"""
-    from datetime import datetime
-
-    favorite = db.query(FavoriteZone).filter(
+    times_used = (await db.execute(select(FavoriteZone.times_used).where(
         FavoriteZone.id == favorite_id,
         FavoriteZone.user_id == current_user.id
-    ).first()
+    ))).first()
 
-    if not favorite:
+    if not times_used:
         raise HTTPException(status_code=404, detail="Favorite zone not found")
 
-    favorite.times_used += 1
-    favorite.last_used = datetime.utcnow()
-
-    db.commit()
-    db.refresh(favorite)
-    return {"message": "Zone usage recorded", "times_used": favorite.times_used}
+    # Buffered and written in batches by the favorite usage flusher
+    pending = favorite_usage.record(favorite_id, current_user.id)
+    return {"message": "Zone usage recorded", "times_used": (times_used[0] or 0) + pending}
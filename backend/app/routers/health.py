@@ -1,4 +1,8 @@
 from fastapi import APIRouter
+from app.core.config import settings
+from app.core.startup import startup_report
+from app.services.search_zones import retry_budget
+from app.services.upstream_proxy import circuit_stats, hedger
 from app.schemas.zones import HealthResponse
 
 router = APIRouter()
@@ -7,3 +11,37 @@ router = APIRouter()
 def health():
     return {"status": "ok"}
 
+@router.get("/health/passwords")
+def health_passwords():
+    """Password hashing pool: in-flight jobs, queue depth and latency"""
+    if not settings.ENABLE_AUTH:
+        return {"enabled": False}
+    from app.core.passwords import password_hasher
+
+    return password_hasher.stats()
+
+@router.get("/health/stripe")
+def health_stripe():
+    """Stripe executor: in-flight calls, queue depth and per-operation latency"""
+    if not (settings.ENABLE_PAYMENTS and settings.ENABLE_AUTH):
+        return {"enabled": False}
+    from app.services.stripe_client import stripe_client
+
+    return stripe_client.stats()
+
+@router.get("/health/upstream")
+def health_upstream():
+    """Upstream proxy circuit breakers (per command and viewport size), state changes, retry budget and hedging"""
+    return {**circuit_stats(), "retry_budget": retry_budget.stats(), "hedging": hedger.stats()}
+
+@router.get("/health/startup")
+def health_startup():
+    """Per-module import and init timings from this worker's startup"""
+    return {
+        "features": {
+            "auth": settings.ENABLE_AUTH,
+            "payments": settings.ENABLE_PAYMENTS and settings.ENABLE_AUTH,
+            "analytics": settings.ENABLE_ANALYTICS,
+        },
+        **startup_report.as_dict(),
+    }
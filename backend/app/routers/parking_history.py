@@ -1,18 +1,25 @@
 # routers/parking_history.py
 from typing import List, Optional
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, Request, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import AsyncReadSessionLocal, get_async_db, get_async_read_db
+from app.core.pagination import MAX_PAGE_SIZE, keyset_page
 from app.models.user import User
 from app.models.parking_history import ParkingHistory
 from app.schemas.parking_history import (
     ParkingHistoryCreate, ParkingHistoryUpdate,
-    ParkingHistoryResponse, ParkingHistoryStats
+    ParkingHistoryResponse, ParkingHistoryStats, ParkingHistoryImportResult
 )
 from app.core.shared import safe_rate_limit
+from app.services.parking_history_transfer import (
+    TRANSFER_FORMATS, ImportAborted, import_parking_history, stream_parking_history
+)
 
 router = APIRouter()
 
@@ -22,7 +29,7 @@ async def start_parking_session(
     request: Request,
     session_data: ParkingHistoryCreate,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Start a new parking session"""
     parking_session = ParkingHistory(
@@ -37,8 +44,8 @@ async def start_parking_session(
     )
 
     db.add(parking_session)
-    db.commit()
-    db.refresh(parking_session)
+    await db.commit()
+    await db.refresh(parking_session)
     return parking_session
 
 @router.put("/end/{session_id}", response_model=ParkingHistoryResponse)
@@ -47,13 +54,13 @@ async def end_parking_session(
     request: Request,
     session_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """End a parking session"""
-    session = db.query(ParkingHistory).filter(
+    session = (await db.execute(select(ParkingHistory).where(
         ParkingHistory.id == session_id,
         ParkingHistory.user_id == current_user.id
-    ).first()
+    ))).scalar_one_or_none()
 
     if not session:
         raise HTTPException(status_code=404, detail="Parking session not found")
@@ -65,41 +72,45 @@ async def end_parking_session(
     session.duration_minutes = int((session.end_time - session.start_time).total_seconds() / 60)
     session.status = "completed"
 
-    db.commit()
-    db.refresh(session)
+    await db.commit()
+    await db.refresh(session)
     return session
 
 @router.get("/", response_model=List[ParkingHistoryResponse])
 @safe_rate_limit("60/minute")
-async def get_parking_history(
-    request: Request,
-    skip: int = 0,
-    limit: int = 50,
-    status_filter: Optional[str] = None,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+async def get_parking_history(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get user's parking history"""
-    query = db.query(ParkingHistory).filter(ParkingHistory.user_id == current_user.id)
+    """Get user's parking history (pass the X-Next-Cursor header back as `cursor` for the next page)"""
+    query = select(ParkingHistory).where(ParkingHistory.user_id == current_user.id)
 
     if status_filter:
-        query = query.filter(ParkingHistory.status == status_filter)
+        query = query.where(ParkingHistory.status == status_filter)
 
-    sessions = query.order_by(ParkingHistory.start_time.desc()).offset(skip).limit(limit).all()
-    return sessions
+    return await keyset_page(
+        db,
+        query, ParkingHistory.start_time, ParkingHistory.id, limit, response, cursor=cursor, skip=skip
+    )
 
 @router.get("/active", response_model=List[ParkingHistoryResponse])
 @safe_rate_limit("60/minute")
 async def get_active_sessions(
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get user's active parking sessions"""
-    sessions = db.query(ParkingHistory).filter(
+    sessions = (await db.execute(select(ParkingHistory).where(
         ParkingHistory.user_id == current_user.id,
         ParkingHistory.status == "active"
-    ).all()
+    ))).scalars().all()
     return sessions
 
 @router.get("/stats", response_model=ParkingHistoryStats)
@@ -107,15 +118,22 @@ async def get_active_sessions(
 async def get_parking_stats(
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get parking statistics for the user"""
-    sessions = db.query(ParkingHistory).filter(
+    completed = (
         ParkingHistory.user_id == current_user.id,
-        ParkingHistory.status == "completed"
-    ).all()
+        ParkingHistory.status == "completed",
+    )
+
+    # Aggregate in the database rather than loading every session
+    total_sessions, total_duration, total_paid = (await db.execute(select(
+        func.count(ParkingHistory.id),
+        func.coalesce(func.sum(ParkingHistory.duration_minutes), 0),
+        func.coalesce(func.sum(ParkingHistory.amount_paid), 0.0),
+    ).where(*completed))).one()
 
-    if not sessions:
+    if not total_sessions:
         return ParkingHistoryStats(
             total_sessions=0,
             total_duration=0,
@@ -124,23 +142,80 @@ async def get_parking_stats(
             total_paid=0.0
         )
 
-    total_sessions = len(sessions)
-    total_duration = sum(session.duration_minutes or 0 for session in sessions)
-    avg_duration = total_duration // total_sessions if total_sessions > 0 else 0
-    total_paid = sum(session.amount_paid or 0 for session in sessions)
+    avg_duration = int(total_duration) // total_sessions
 
     # Find favorite zone
-    zone_counts = {}
-    for session in sessions:
-        zone_counts[session.zone_code] = zone_counts.get(session.zone_code, 0) + 1
-    favorite_zone = max(zone_counts.items(), key=lambda x: x[1])[0] if zone_counts else None
+    zone_count = func.count(ParkingHistory.id)
+    favorite_zone = await db.scalar(
+        select(ParkingHistory.zone_code)
+        .where(*completed)
+        .group_by(ParkingHistory.zone_code)
+        .order_by(zone_count.desc(), ParkingHistory.zone_code)
+        .limit(1)
+    )
 
     return ParkingHistoryStats(
         total_sessions=total_sessions,
-        total_duration=total_duration,
+        total_duration=int(total_duration),
         avg_duration=avg_duration,
         favorite_zone=favorite_zone,
-        total_paid=total_paid
+        total_paid=float(total_paid)
+    )
+
+async def _transfer_user_id(current_user: User, user_id: Optional[int], db: AsyncSession) -> int:
+    """The caller's own id, or any user's for superusers (support migrations)"""
+    if user_id is None or user_id == current_user.id:
+        return current_user.id
+    if not current_user.is_superuser:
+        raise HTTPException(status_code=403, detail="Not enough permissions")
+    if await db.get(User, user_id) is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user_id
+
+@router.post("/import", response_model=ParkingHistoryImportResult)
+@safe_rate_limit("5/minute")
+async def import_parking_sessions(
+    request: Request,
+    format: Optional[str] = Query(None, pattern="^(ndjson|csv)$"),
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Bulk import past sessions from a CSV or NDJSON request body.
+
+    The body is streamed and inserted in batches; rows that fail validation
+    are skipped and reported by line number. The format defaults to the
+    Content-Type (text/csv, otherwise NDJSON).
+    """
+    target_id = await _transfer_user_id(current_user, user_id, db)
+    fmt = format or ("csv" if "csv" in request.headers.get("content-type", "") else "ndjson")
+    try:
+        return await import_parking_history(
+            db,
+            target_id,
+            request.stream(),
+            fmt,
+            batch_size=settings.PARKING_IMPORT_BATCH_SIZE,
+            max_rows=settings.PARKING_IMPORT_MAX_ROWS,
+        )
+    except ImportAborted as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.get("/export")
+@safe_rate_limit("5/minute")
+async def export_parking_sessions(
+    request: Request,
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    user_id: Optional[int] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    """Stream the full parking history as NDJSON or CSV (importable with /parking/import)"""
+    target_id = await _transfer_user_id(current_user, user_id, db)
+    return StreamingResponse(
+        stream_parking_history(AsyncReadSessionLocal, target_id, format),
+        media_type=TRANSFER_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="parking-history-{target_id}.{format}"'},
     )
 
 @router.delete("/{session_id}")
@@ -149,13 +224,13 @@ async def delete_parking_session(
     request: Request,
     session_id: int,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Delete a parking session (only for inactive sessions)"""
-    session = db.query(ParkingHistory).filter(
+    session = (await db.execute(select(ParkingHistory).where(
         ParkingHistory.id == session_id,
         ParkingHistory.user_id == current_user.id
-    ).first()
+    ))).scalar_one_or_none()
 
     if not session:
         raise HTTPException(status_code=404, detail="Parking session not found")
@@ -163,6 +238,6 @@ async def delete_parking_session(
     if session.status == "active":
         raise HTTPException(status_code=400, detail="Cannot delete active session")
 
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await db.commit()
     return {"message": "Parking session deleted successfully"}
@@ -1,15 +1,20 @@
 # routers/payments.py
 import stripe
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status, Request, Response
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.auth import get_current_active_user
-from app.core.database import get_db
+from app.core.database import get_async_db, get_async_read_db
+from app.core.pagination import MAX_PAGE_SIZE, keyset_page
 from app.core.config import settings
 from app.models.user import User
 from app.models.payment import Payment
-from app.models.parking_history import ParkingHistory
+from app.services.payment_rollups import get_spending_stats
+from app.services.stripe_client import stripe_client
+from app.services.stripe_webhooks import HANDLED_EVENT_TYPES, record_event, stripe_webhook_worker
 from app.schemas.payments import (
     PaymentCreate, PaymentResponse, PaymentIntentResponse,
     ParkingRate, PaymentStats
@@ -18,22 +23,20 @@ from app.core.shared import safe_rate_limit
 
 router = APIRouter()
 
-# Initialize Stripe (only if keys are provided)
-if settings.STRIPE_SECRET_KEY:
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-else:
-    # Disable Stripe functionality if no keys provided
-    stripe.api_key = None
-
 @router.post("/create-payment-intent", response_model=PaymentIntentResponse)
 @safe_rate_limit("10/minute")
 async def create_payment_intent(
     request: Request,
     payment_data: PaymentCreate,
+    idempotency_key: str = Header(..., alias="Idempotency-Key", min_length=1, max_length=255),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Create a Stripe payment intent for parking payment"""
+    """Create a Stripe payment intent for parking payment
+
+    Clients must send an ``Idempotency-Key`` header, unique per purchase,
+    and reuse it when retrying, so a retried request returns the same intent.
+    """
     # Check if Stripe is configured
     if not settings.STRIPE_SECRET_KEY:
         raise HTTPException(
@@ -45,8 +48,12 @@ async def create_payment_intent(
         # Calculate amount in cents
         amount_cents = int(payment_data.amount * 100)
 
-        # Create payment intent
-        intent = stripe.PaymentIntent.create(
+        # Scoped per user so keys from different clients cannot collide
+        key = f"payment-intent:{current_user.id}:{idempotency_key}"
+
+        # Create payment intent (runs on the Stripe executor, off the event loop)
+        intent = await stripe_client.create_payment_intent(
+            key,
             amount=amount_cents,
             currency=payment_data.currency,
             metadata={
@@ -56,6 +63,13 @@ async def create_payment_intent(
             }
         )
 
+        # A retried request gets the intent, and so the payment row, it already created
+        payment = (await db.execute(
+            select(Payment).where(Payment.stripe_payment_intent_id == intent.id)
+        )).scalar_one_or_none()
+        if payment:
+            return PaymentIntentResponse(client_secret=intent.client_secret, payment_id=payment.id)
+
         # Store payment record
         payment = Payment(
             user_id=current_user.id,
@@ -68,8 +82,15 @@ async def create_payment_intent(
         )
 
         db.add(payment)
-        db.commit()
-        db.refresh(payment)
+        try:
+            await db.commit()
+        except IntegrityError:
+            # A concurrent retry with the same key stored it first
+            await db.rollback()
+            payment = (await db.execute(
+                select(Payment).where(Payment.stripe_payment_intent_id == intent.id)
+            )).scalar_one()
+        await db.refresh(payment)
 
         return PaymentIntentResponse(
             client_secret=intent.client_secret,
@@ -80,8 +101,8 @@ async def create_payment_intent(
         raise HTTPException(status_code=400, detail=f"Payment error: {str(e)}")
 
 @router.post("/webhook")
-async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
-    """Handle Stripe webhooks"""
+async def stripe_webhook(request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Record a Stripe webhook and acknowledge it; the webhook worker applies it"""
     # Check if Stripe is configured
     if not settings.STRIPE_SECRET_KEY or not settings.STRIPE_WEBHOOK_SECRET:
         raise HTTPException(
@@ -97,12 +118,9 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
             payload, sig_header, settings.STRIPE_WEBHOOK_SECRET
         )
 
-        if event['type'] == 'payment_intent.succeeded':
-            payment_intent = event['data']['object']
-            await handle_payment_success(payment_intent, db)
-        elif event['type'] == 'payment_intent.payment_failed':
-            payment_intent = event['data']['object']
-            await handle_payment_failure(payment_intent, db)
+        # Redeliveries of an already recorded event id are acknowledged without any work
+        if event['type'] in HANDLED_EVENT_TYPES and await record_event(db, event):
+            stripe_webhook_worker.notify()
 
         return {"status": "success"}
 
@@ -111,36 +129,6 @@ async def stripe_webhook(request: Request, db: Session = Depends(get_db)):
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-async def handle_payment_success(payment_intent, db: Session):
-    """Handle successful payment"""
-    payment = db.query(Payment).filter(
-        Payment.stripe_payment_intent_id == payment_intent.id
-    ).first()
-
-    if payment:
-        payment.status = "completed"
-        payment.stripe_charge_id = payment_intent.charges.data[0].id
-
-        # Link to parking session if provided
-        if payment.parking_history_id:
-            parking_session = db.query(ParkingHistory).get(payment.parking_history_id)
-            if parking_session:
-                parking_session.amount_paid = payment.amount
-                parking_session.payment_method = "card"
-                parking_session.payment_id = payment.id
-
-        db.commit()
-
-async def handle_payment_failure(payment_intent, db: Session):
-    """Handle failed payment"""
-    payment = db.query(Payment).filter(
-        Payment.stripe_payment_intent_id == payment_intent.id
-    ).first()
-
-    if payment:
-        payment.status = "failed"
-        db.commit()
-
 @router.get("/rates", response_model=List[ParkingRate])
 @safe_rate_limit("60/minute")
 async def get_parking_rates(request: Request):
@@ -170,51 +158,26 @@ async def get_parking_rates(request: Request):
 
 @router.get("/history", response_model=List[PaymentResponse])
 @safe_rate_limit("60/minute")
-async def get_payment_history(
-    request: Request,
-    skip: int = 0,
-    limit: int = 50,
-    current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+async def get_payment_history(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    current_user: User = Depends(get_current_active_user),
+    db: AsyncSession = Depends(get_async_read_db)
 ):
-    """Get user's payment history"""
-    payments = db.query(Payment).filter(
-        Payment.user_id == current_user.id
-    ).order_by(Payment.created_at.desc()).offset(skip).limit(limit).all()
-    return payments
+    """Get user's payment history (pass the X-Next-Cursor header back as `cursor` for the next page)"""
+    query = select(Payment).where(Payment.user_id == current_user.id)
+    return await keyset_page(db, query, Payment.created_at, Payment.id, limit, response, cursor=cursor, skip=skip)
 
 @router.get("/stats", response_model=PaymentStats)
 @safe_rate_limit("30/minute")
 async def get_payment_stats(
     request: Request,
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_read_db)
 ):
     """Get payment statistics for the user"""
-    payments = db.query(Payment).filter(
-        Payment.user_id == current_user.id,
-        Payment.status == "completed"
-    ).all()
-
-    total_paid = sum(payment.amount for payment in payments)
-    total_transactions = len(payments)
-
-    # Monthly spending (last 12 months)
-    from datetime import datetime, timedelta
-    from collections import defaultdict
-
-    monthly_spending = defaultdict(float)
-    for payment in payments:
-        month_key = payment.created_at.strftime("%Y-%m")
-        monthly_spending[month_key] += payment.amount
-
-    monthly_data = [
-        {"month": month, "amount": amount}
-        for month, amount in sorted(monthly_spending.items(), reverse=True)[:12]
-    ]
-
-    return PaymentStats(
-        total_paid=total_paid,
-        total_transactions=total_transactions,
-        monthly_spending=monthly_data
-    )
+    # Served from the monthly ledger rollup (last 12 months)
+    return PaymentStats(**await get_spending_stats(db, current_user.id))
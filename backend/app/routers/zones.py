@@ -1,39 +1,47 @@
 import re
-import uuid
-from datetime import datetime, timedelta
-from typing import Any, Dict
-from collections import defaultdict
+import threading
+from contextvars import copy_context
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+from typing import Any, Dict, Optional
 from fastapi import APIRouter, Request, HTTPException, Depends
 from sqlalchemy.orm import Session
 from app.schemas.zones import (
     Bounds,
+    BoundsBatchRequest,
+    BatchParkingDataResponse,
+    ExternalAPIResponse,
+    ExternalZone,
     ParkingDataResponse,
     ParkingSpotInfo,
     ZoneCoordinatesResponse,
+    ZoneBatchRequest,
+    ZoneBatchResponse,
     ZonesListResponse,
     BoundsInfoResponse,
-    SearchEvent,
-    AnalyticsResponse,
-    ZoneAnalytics,
 )
-from app.services.filter_by_zone import filter_by_zone
 from app.services.get_description import get_description, clean_description
 from app.services.zones_service import ZoneDataResult, fetch_zones_with_snapshot
 from app.services.zone_snapshots import make_bounds_key
-from app.core.shared import safe_rate_limit, DEFAULT_BOUNDS, CITY_BOUNDS, get_bounds_info
+from app.core.shared import auth_dependencies, safe_rate_limit, DEFAULT_BOUNDS, CITY_BOUNDS, get_bounds_info
 from app.core.logging import logger
-from app.core.database import get_db
-from app.core.auth import get_current_active_user
-from app.models.user import User
+from app.core.database import ReadSessionLocal, get_read_db
 
 # Zone code validation pattern (alphanumeric, hyphens, underscores, slashes, max 100 chars)
 ZONE_CODE_PATTERN = re.compile(r'^[\w\-/. ]{1,100}$')
 
-# In-memory cache to reduce repeated DB lookups between requests
+# In-memory cache to reduce repeated DB lookups between requests. Batch
+# worker threads share it, so every access goes through _cache_lock.
 zone_cache: Dict[str, ZoneDataResult] = {}
 cache_timestamps: Dict[str, datetime] = {}
+_cache_lock = threading.Lock()
 CACHE_DURATION_MINUTES = 30  # Cache for 30 minutes
 
+# Worker pool for resolving multi-viewport batch requests concurrently
+BATCH_MAX_WORKERS = 4
+_batch_executor = ThreadPoolExecutor(max_workers=BATCH_MAX_WORKERS, thread_name_prefix="zones-batch")
+
 router = APIRouter()
 
 
@@ -53,8 +61,9 @@ def get_cached_zones_data(
     """Get zones data with caching and persistent snapshot fallback"""
     cache_key = make_bounds_key(left_long, right_long, top_lat, bottom_lat, precision=5)
 
-    cache_time = cache_timestamps.get(cache_key)
-    cached_result = zone_cache.get(cache_key)
+    with _cache_lock:
+        cache_time = cache_timestamps.get(cache_key)
+        cached_result = zone_cache.get(cache_key)
     if cached_result and cache_time:
         age_seconds = (datetime.now() - cache_time).seconds
         if age_seconds < (CACHE_DURATION_MINUTES * 60):
@@ -64,18 +73,106 @@ def get_cached_zones_data(
     logger.info("Cache miss for bounds: %s - fetching fresh data", cache_key)
     fresh_result = fetch_zones_with_snapshot(left_long, right_long, top_lat, bottom_lat, db)
 
-    zone_cache[cache_key] = fresh_result
-    cache_timestamps[cache_key] = datetime.now()
+    with _cache_lock:
+        zone_cache[cache_key] = fresh_result
+        cache_timestamps[cache_key] = datetime.now()
 
-    # Clean up old cache entries (simple cleanup - keep only last 10)
-    if len(zone_cache) > 10:
-        oldest_key = min(cache_timestamps.keys(), key=lambda k: cache_timestamps[k])
-        zone_cache.pop(oldest_key, None)
-        cache_timestamps.pop(oldest_key, None)
+        # Clean up old cache entries (simple cleanup - keep only last 10)
+        if len(zone_cache) > 10:
+            oldest_key = min(cache_timestamps.keys(), key=lambda k: cache_timestamps[k])
+            zone_cache.pop(oldest_key, None)
+            cache_timestamps.pop(oldest_key, None)
 
     return fresh_result
 
 
+def cached_zone_name(zone_code: str) -> Optional[str]:
+    """Zone name from the cached city-wide snapshot, without fetching on a miss"""
+    city_key = make_bounds_key(
+        CITY_BOUNDS["left_long"],
+        CITY_BOUNDS["right_long"],
+        CITY_BOUNDS["top_lat"],
+        CITY_BOUNDS["bottom_lat"],
+        precision=5,
+    )
+    with _cache_lock:
+        cached_result = zone_cache.get(city_key)
+    if cached_result is None:
+        return None
+    entry = cached_result.zone_index.get(zone_code)
+    return entry.name if entry else None
+
+
+def _parking_data_response(zone_result: ZoneDataResult) -> ParkingDataResponse:
+    zones_response = zone_result.data
+    # Convert Pydantic model to dict for compatibility with existing service functions
+    locations = [zone.dict() for zone in zones_response.zones]
+    parking_spots: Dict[str, ParkingSpotInfo] = {}
+    get_description(parking_spots, locations)
+    return ParkingDataResponse(parkingSpots=parking_spots, **_metadata_from_result(zone_result))
+
+
+def _box(bounds: Bounds):
+    """(west, east, south, north) of a viewport, whichever way round its edges were sent"""
+    return (
+        min(bounds.left_long, bounds.right_long),
+        max(bounds.left_long, bounds.right_long),
+        min(bounds.bottom_lat, bounds.top_lat),
+        max(bounds.bottom_lat, bounds.top_lat),
+    )
+
+
+def _contains(outer: Bounds, inner: Bounds) -> bool:
+    west, east, south, north = _box(outer)
+    inner_west, inner_east, inner_south, inner_north = _box(inner)
+    return west <= inner_west and inner_east <= east and south <= inner_south and inner_north <= north
+
+
+def _area(bounds: Bounds) -> float:
+    west, east, south, north = _box(bounds)
+    return (east - west) * (north - south)
+
+
+def _zone_in_view(zone: ExternalZone, bounds: Bounds) -> bool:
+    """Whether a zone's outline overlaps the viewport (zones without positions are kept)"""
+    if not zone.positions:
+        return True
+    west, east, south, north = _box(bounds)
+    lngs = [position.lng for position in zone.positions]
+    lats = [position.lat for position in zone.positions]
+    return min(lngs) <= east and max(lngs) >= west and min(lats) <= north and max(lats) >= south
+
+
+def _clip_to(zone_result: ZoneDataResult, bounds: Bounds) -> ZoneDataResult:
+    """The zones of a larger viewport's result that show in ``bounds``"""
+    zones = [zone for zone in zone_result.data.zones if _zone_in_view(zone, bounds)]
+    return replace(zone_result, data=ExternalAPIResponse(zones=zones))
+
+
+def _resolve_bounds(outer_key: str, viewports: Dict[str, Bounds]) -> Dict[str, ParkingDataResponse]:
+    """Resolve a batch viewport and the viewports nested in it on a worker thread with its own DB session
+
+    ``viewports`` maps each key to its bounds, ``outer_key`` being the containing
+    one; only that viewport is looked up, the nested ones are clipped from it.
+    """
+    outer = viewports[outer_key]
+    db = ReadSessionLocal()
+    try:
+        zone_result = get_cached_zones_data(
+            outer.left_long,
+            outer.right_long,
+            outer.top_lat,
+            outer.bottom_lat,
+            db,
+        )
+    finally:
+        db.close()
+    return {
+        key: _parking_data_response(zone_result if key == outer_key else _clip_to(zone_result, bounds))
+        for key, bounds in viewports.items()
+    }
+
+
 @router.get("/api/test/bounds", response_model=BoundsInfoResponse)
 @safe_rate_limit("60/minute")
 def test_bounds(request: Request):
@@ -84,7 +181,7 @@ def test_bounds(request: Request):
 
 @router.get("/api/data", response_model=ParkingDataResponse)
 @safe_rate_limit("120/minute")
-def get_data_default(request: Request, db: Session = Depends(get_db)):
+def get_data_default(request: Request, db: Session = Depends(get_read_db)):
     """Get parking data for default bounds (UC Davis main campus)"""
     zone_result = get_cached_zones_data(
         DEFAULT_BOUNDS["left_long"],
@@ -93,17 +190,12 @@ def get_data_default(request: Request, db: Session = Depends(get_db)):
         DEFAULT_BOUNDS["bottom_lat"],
         db,
     )
-    zones_response = zone_result.data
-    # Convert Pydantic model to dict for compatibility with existing service functions
-    locations = [zone.dict() for zone in zones_response.zones]
-    parking_spots: Dict[str, ParkingSpotInfo] = {}
-    get_description(parking_spots, locations)
-    return ParkingDataResponse(parkingSpots=parking_spots, **_metadata_from_result(zone_result))
+    return _parking_data_response(zone_result)
 
 
 @router.post("/api/data", response_model=ParkingDataResponse)
 @safe_rate_limit("120/minute")
-def get_data(request: Request, bounds: Bounds, db: Session = Depends(get_db)):
+def get_data(request: Request, bounds: Bounds, db: Session = Depends(get_read_db)):
     """Get parking data for custom bounds"""
     zone_result = get_cached_zones_data(
         bounds.left_long,
@@ -112,17 +204,61 @@ def get_data(request: Request, bounds: Bounds, db: Session = Depends(get_db)):
         bounds.bottom_lat,
         db,
     )
-    zones_response = zone_result.data
-    # Convert Pydantic model to dict for compatibility with existing service functions
-    locations = [zone.dict() for zone in zones_response.zones]
-    parking_spots: Dict[str, ParkingSpotInfo] = {}
-    get_description(parking_spots, locations)
-    return ParkingDataResponse(parkingSpots=parking_spots, **_metadata_from_result(zone_result))
+    return _parking_data_response(zone_result)
+
+
+@router.post("/api/data/batch", response_model=BatchParkingDataResponse)
+@safe_rate_limit("30/minute")
+def get_data_batch(request: Request, batch: BoundsBatchRequest):
+    """Get parking data for several viewports in one request
+
+    Bounds that normalize to the same key share one lookup, and a viewport that
+    lies entirely inside another one in the batch is served from the outer
+    viewport's lookup, keeping only the zones that overlap it. Viewports that
+    merely overlap are still looked up separately.
+    """
+    keys = [
+        make_bounds_key(b.left_long, b.right_long, b.top_lat, b.bottom_lat, precision=5)
+        for b in batch.bounds
+    ]
+    unique_bounds = dict(zip(keys, batch.bounds))
+
+    # Group every viewport under the largest batch viewport that contains it
+    groups: Dict[str, Dict[str, Bounds]] = {}
+    for key, bounds in unique_bounds.items():
+        outer_key = max(
+            (other for other, outer in unique_bounds.items() if _contains(outer, bounds)),
+            key=lambda other: _area(unique_bounds[other]),
+        )
+        groups.setdefault(outer_key, {outer_key: unique_bounds[outer_key]})[key] = bounds
+
+    # copy_context carries the request deadline to the worker threads
+    futures = {
+        outer_key: _batch_executor.submit(copy_context().run, _resolve_bounds, outer_key, viewports)
+        for outer_key, viewports in groups.items()
+    }
+
+    results: Dict[str, ParkingDataResponse] = {}
+    errors: Dict[str, Dict[str, Any]] = {}
+    for outer_key, future in futures.items():
+        group_keys = list(groups[outer_key])
+        try:
+            results.update(future.result())
+        except HTTPException as exc:
+            detail = exc.detail if isinstance(exc.detail, dict) else {"error": str(exc.detail)}
+            for key in group_keys:
+                errors[key] = {"status_code": exc.status_code, **detail}
+        except Exception as exc:
+            logger.error("Batch data lookup failed for %s: %s", outer_key, exc)
+            for key in group_keys:
+                errors[key] = {"status_code": 500, "error": "lookup_failed"}
+
+    return BatchParkingDataResponse(keys=keys, results=results, errors=errors)
 
 
 @router.get("/api/zones/{zone_code}", response_model=ZoneCoordinatesResponse)
 @safe_rate_limit("60/minute")
-def get_zone_coords(request: Request, zone_code: str, db: Session = Depends(get_db)):
+def get_zone_coords(request: Request, zone_code: str, db: Session = Depends(get_read_db)):
     """Get coordinates for a specific zone code"""
     zone_result = get_cached_zones_data(
         CITY_BOUNDS["left_long"],
@@ -131,17 +267,41 @@ def get_zone_coords(request: Request, zone_code: str, db: Session = Depends(get_
         CITY_BOUNDS["bottom_lat"],
         db,
     )
-    zones_response = zone_result.data
-    # Convert Pydantic model to dict for compatibility with existing service functions
-    locations = [zone.dict() for zone in zones_response.zones]
-    coords = filter_by_zone(locations, zone_code)
-    # Convert tuples to lists for JSON serialization
-    coords_list = [[lat, lng] for lat, lng in coords]
+    entry = zone_result.zone_index.get(zone_code)
+    coords_list = entry.coordinates if entry else []
     return ZoneCoordinatesResponse(coordinates=coords_list, **_metadata_from_result(zone_result))
 
+
+@router.post("/api/zones/batch", response_model=ZoneBatchResponse)
+@safe_rate_limit("30/minute")
+def get_zones_coords_batch(request: Request, batch: ZoneBatchRequest, db: Session = Depends(get_read_db)):
+    """Get coordinates for many zone codes from a single snapshot lookup"""
+    for zone_code in batch.codes:
+        if not ZONE_CODE_PATTERN.match(zone_code):
+            raise HTTPException(status_code=400, detail=f"Invalid zone code format: {zone_code[:100]}")
+
+    zone_result = get_cached_zones_data(
+        CITY_BOUNDS["left_long"],
+        CITY_BOUNDS["right_long"],
+        CITY_BOUNDS["top_lat"],
+        CITY_BOUNDS["bottom_lat"],
+        db,
+    )
+    zone_index = zone_result.zone_index
+
+    zones: Dict[str, list] = {}
+    missing = []
+    for zone_code in dict.fromkeys(batch.codes):
+        entry = zone_index.get(zone_code)
+        if entry:
+            zones[zone_code] = entry.coordinates
+        else:
+            missing.append(zone_code)
+    return ZoneBatchResponse(zones=zones, missing=missing, **_metadata_from_result(zone_result))
+
 @router.get("/api/raw-zones")
 @safe_rate_limit("20/minute")
-def get_raw_zones(request: Request, db: Session = Depends(get_db)):
+def get_raw_zones(request: Request, db: Session = Depends(get_read_db)):
     """Get raw zones data from external API"""
     try:
         zone_result = get_cached_zones_data(
@@ -166,7 +326,7 @@ def get_raw_zones(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/api/zones", response_model=ZonesListResponse)
 @safe_rate_limit("20/minute")
-def get_zones(request: Request, db: Session = Depends(get_db)):
+def get_zones(request: Request, db: Session = Depends(get_read_db)):
     """Get list of zone descriptions"""
     zone_result = get_cached_zones_data(
         CITY_BOUNDS["left_long"],
@@ -182,292 +342,12 @@ def get_zones(request: Request, db: Session = Depends(get_db)):
 
 @router.get("/api/filter/description_to_zones")
 @safe_rate_limit("60/minute")
-def get_description_to_zones(request: Request, db: Session = Depends(get_db)):
+def get_description_to_zones(request: Request, db: Session = Depends(get_read_db)):
     """Get mapping of zone descriptions to zone codes"""
     all_zones_data = get_raw_zones(request, db)
     zones = {clean_description(zone["description"]): zone["code"] for zone in all_zones_data["zones"]}
     return zones
 
-# In-memory storage for demo (would be database in production)
-search_events = []
-zone_analytics = defaultdict(lambda: {"search_count": 0, "directions_requested": 0, "last_accessed": None})
-user_sessions = defaultdict(list)
-
-# Peak usage tracking
-peak_hours_data = defaultdict(int)
-daily_stats = {
-    "date": datetime.now().date().isoformat(),
-    "total_searches": 0,
-    "total_directions": 0,
-    "unique_users": set(),
-    "popular_zones": defaultdict(int)
-}
-
-
-@router.post("/api/analytics/search/{zone_code:path}")
-@safe_rate_limit("100/minute")
-def track_search(request: Request, zone_code: str, db: Session = Depends(get_db)):
-    """Track when a user searches for a zone"""
-    try:
-        # Validate zone_code input
-        if not ZONE_CODE_PATTERN.match(zone_code):
-            raise HTTPException(status_code=400, detail="Invalid zone code format")
-
-        # Get zone data for the zone name
-        zone_result = get_cached_zones_data(
-            CITY_BOUNDS["left_long"],
-            CITY_BOUNDS["right_long"],
-            CITY_BOUNDS["top_lat"],
-            CITY_BOUNDS["bottom_lat"],
-            db,
-        )
-        zones_response = zone_result.data
-
-        zone_name = "Unknown Zone"
-        for zone in zones_response.zones:
-            if zone.code == zone_code:
-                zone_name = clean_description(zone.description)
-                break
-
-        # Create search event (anonymize IP for privacy)
-        client_ip = request.client.host if request.client else "unknown"
-        anonymized_ip = ".".join(client_ip.split(".")[:2] + ["x", "x"]) if "." in client_ip else "anonymous"
-        search_event = SearchEvent(
-            zone_code=zone_code,
-            zone_name=zone_name,
-            timestamp=datetime.now().isoformat(),
-            client_ip=anonymized_ip,
-            user_agent=request.headers.get("user-agent", "")[:200]
-        )
-
-        # Store the event
-        search_events.append(search_event)
-        logger.info(f"Search tracked: '{zone_code}' ({zone_name}) - Total searches: {len(search_events)}")
-
-        # Update zone analytics
-        zone_analytics[zone_code]["search_count"] += 1
-        zone_analytics[zone_code]["last_accessed"] = search_event.timestamp
-
-        # Update peak hours and daily stats
-        current_hour = datetime.now().hour
-        peak_hours_data[current_hour] += 1
-        daily_stats["total_searches"] += 1
-        daily_stats["unique_users"].add(request.client.host or "unknown")
-        daily_stats["popular_zones"][zone_code] += 1
-
-        # Generate session ID and track user session
-        session_id = str(uuid.uuid4())  # In production, use proper session management
-        user_sessions[session_id].append(search_event)
-
-        return {"message": "Search tracked successfully", "session_id": session_id, "total_searches": len(search_events)}
-
-    except Exception as e:
-        logger.error(f"Error tracking search for zone {zone_code}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to track search")
-
-
-@router.post("/api/analytics/directions/{zone_code:path}")
-@safe_rate_limit("50/minute")
-def track_directions_request(request: Request, zone_code: str):
-    """Track when a user requests directions to a zone"""
-    try:
-        # Validate zone_code input
-        if not ZONE_CODE_PATTERN.match(zone_code):
-            raise HTTPException(status_code=400, detail="Invalid zone code format")
-        # Update zone analytics
-        zone_analytics[zone_code]["directions_requested"] += 1
-
-        # Update daily stats for directions
-        daily_stats["total_directions"] += 1
-
-        logger.info(f"Directions tracked: {zone_code} - Total directions: {zone_analytics[zone_code]['directions_requested']}")
-
-        return {"message": "Directions request tracked successfully", "total_directions": zone_analytics[zone_code]["directions_requested"]}
-
-    except Exception as e:
-        logger.error(f"Error tracking directions request for zone {zone_code}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to track directions request")
-
-
-@router.get("/api/analytics/overview", response_model=AnalyticsResponse)
-@safe_rate_limit("20/minute")
-def get_analytics_overview(request: Request):
-    """Get comprehensive analytics overview"""
-    try:
-        # Calculate analytics
-        total_searches = len(search_events)
-        unique_zones_searched = len(set(event.zone_code for event in search_events))
-
-        # Popular zones
-        popular_zones = defaultdict(int)
-        for event in search_events:
-            popular_zones[event.zone_code] += 1
-
-        # Recent searches (last 24 hours)
-        recent_searches = [
-            event for event in search_events
-            if datetime.fromisoformat(event.timestamp) > datetime.now() - timedelta(hours=24)
-        ][:10]  # Last 10 searches
-
-        # Search trends by hour
-        search_trends = defaultdict(int)
-        for event in search_events:
-            hour = datetime.fromisoformat(event.timestamp).hour
-            search_trends[str(hour)] += 1
-
-        # Peak hours (top 3)
-        sorted_hours = sorted(search_trends.items(), key=lambda x: x[1], reverse=True)
-        peak_hours = [f"{hour}:00" for hour, _ in sorted_hours[:3]]
-
-        return AnalyticsResponse(
-            total_searches=total_searches,
-            unique_zones_searched=unique_zones_searched,
-            popular_zones=dict(popular_zones),
-            recent_searches=recent_searches,
-            search_trends=dict(search_trends),
-            peak_hours=peak_hours
-        )
-
-    except Exception as e:
-        logger.error(f"Error generating analytics overview: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to generate analytics")
-
-
-@router.get("/api/analytics/zones/{zone_code}", response_model=ZoneAnalytics)
-@safe_rate_limit("30/minute")
-def get_zone_analytics(request: Request, zone_code: str, db: Session = Depends(get_db)):
-    """Get detailed analytics for a specific zone"""
-    try:
-        analytics = zone_analytics[zone_code]
-
-        # Get zone name
-        zone_result = get_cached_zones_data(
-            CITY_BOUNDS["left_long"],
-            CITY_BOUNDS["right_long"],
-            CITY_BOUNDS["top_lat"],
-            CITY_BOUNDS["bottom_lat"],
-            db,
-        )
-        zones_response = zone_result.data
-
-        zone_name = "Unknown Zone"
-        coordinates = None
-        for zone in zones_response.zones:
-            if zone.code == zone_code:
-                zone_name = clean_description(zone.description)
-                if zone.positions:
-                    coordinates = [zone.positions[0].lat, zone.positions[0].lng]
-                break
-
-        return ZoneAnalytics(
-            zone_code=zone_code,
-            zone_name=zone_name,
-            search_count=analytics["search_count"],
-            directions_requested=analytics["directions_requested"],
-            last_accessed=analytics["last_accessed"],
-            coordinates=coordinates
-        )
-
-    except Exception as e:
-        logger.error(f"Error getting zone analytics for {zone_code}: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get zone analytics")
-
-
-@router.get("/api/analytics/top-zones")
-@safe_rate_limit("20/minute")
-def get_top_zones(request: Request, limit: int = 10):
-    """Get most searched parking zones"""
-    try:
-        # Sort zones by search count
-        sorted_zones = sorted(
-            zone_analytics.items(),
-            key=lambda x: x[1]["search_count"],
-            reverse=True
-        )[:limit]
-
-        result = []
-        for zone_code, analytics in sorted_zones:
-            result.append({
-                "zone_code": zone_code,
-                "search_count": analytics["search_count"],
-                "directions_requested": analytics["directions_requested"],
-                "last_accessed": analytics["last_accessed"]
-            })
-
-        return {"top_zones": result}
-
-    except Exception as e:
-        logger.error(f"Error getting top zones: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get top zones")
-
-
-@router.get("/api/analytics/peak-hours")
-@safe_rate_limit("20/minute")
-def get_peak_hours_analytics(request: Request):
-    """Get peak usage hours analytics"""
-    try:
-        # Convert defaultdict to regular dict for JSON serialization
-        peak_hours = dict(peak_hours_data)
-
-        # Get top 5 peak hours
-        sorted_hours = sorted(peak_hours.items(), key=lambda x: x[1], reverse=True)[:5]
-
-        return {
-            "peak_hours": [{"hour": hour, "searches": count} for hour, count in sorted_hours],
-            "all_hours": peak_hours,
-            "total_searches_today": sum(peak_hours.values())
-        }
-
-    except Exception as e:
-        logger.error(f"Error getting peak hours analytics: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get peak hours analytics")
-
-
-@router.get("/api/analytics/daily-summary")
-@safe_rate_limit("20/minute")
-def get_daily_summary(request: Request):
-    """Get comprehensive daily analytics summary"""
-    try:
-        return {
-            "date": daily_stats["date"],
-            "summary": {
-                "total_searches": daily_stats["total_searches"],
-                "total_directions": daily_stats["total_directions"],
-                "unique_users": len(daily_stats["unique_users"]),
-                "conversion_rate": round(
-                    (daily_stats["total_directions"] / max(daily_stats["total_searches"], 1)) * 100, 2
-                )
-            },
-            "popular_zones_today": dict(daily_stats["popular_zones"]),
-            "peak_hour": max(peak_hours_data.items(), key=lambda x: x[1], default=("N/A", 0))[0]
-        }
-
-    except Exception as e:
-        logger.error(f"Error getting daily summary: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to get daily summary")
-
-
-@router.post("/api/analytics/reset-daily")
-@safe_rate_limit("5/minute")
-def reset_daily_stats(request: Request, current_user: User = Depends(get_current_active_user)):
-    """Reset daily statistics (requires authentication)"""
-    try:
-        global daily_stats, peak_hours_data
-        daily_stats = {
-            "date": datetime.now().date().isoformat(),
-            "total_searches": 0,
-            "total_directions": 0,
-            "unique_users": set(),
-            "popular_zones": defaultdict(int)
-        }
-        peak_hours_data = defaultdict(int)
-
-        return {"message": "Daily statistics reset successfully"}
-
-    except Exception as e:
-        logger.error(f"Error resetting daily stats: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to reset daily stats")
-
 
 @router.get("/api/cache/status")
 @safe_rate_limit("30/minute")
@@ -477,7 +357,11 @@ def get_cache_status(request: Request):
         current_time = datetime.now()
         cache_info = []
 
-        for cache_key, cache_time in cache_timestamps.items():
+        with _cache_lock:
+            timestamps = list(cache_timestamps.items())
+            total_cache_entries = len(zone_cache)
+
+        for cache_key, cache_time in timestamps:
             age_minutes = (current_time - cache_time).seconds / 60
             cache_info.append({
                 "key": cache_key,
@@ -486,7 +370,6 @@ def get_cache_status(request: Request):
             })
 
         # Calculate cache performance metrics
-        total_cache_entries = len(zone_cache)
         expired_entries = sum(1 for info in cache_info if info["expires_in_minutes"] <= 0)
 
         return {
@@ -506,15 +389,15 @@ def get_cache_status(request: Request):
         raise HTTPException(status_code=500, detail="Failed to get cache status")
 
 
-@router.post("/api/cache/clear")
+@router.post("/api/cache/clear", dependencies=auth_dependencies())
 @safe_rate_limit("5/minute")
-def clear_cache(request: Request, current_user: User = Depends(get_current_active_user)):
+def clear_cache(request: Request):
     """Clear all cached data (requires authentication)"""
     try:
-        global zone_cache, cache_timestamps
-        cleared_entries = len(zone_cache)
-        zone_cache = {}
-        cache_timestamps = {}
+        with _cache_lock:
+            cleared_entries = len(zone_cache)
+            zone_cache.clear()
+            cache_timestamps.clear()
 
         logger.info(f"Cache cleared: {cleared_entries} entries removed")
         return {
@@ -1,7 +1,7 @@
 # schemas/parking_history.py
-from pydantic import BaseModel
-from typing import Optional
-from datetime import datetime
+from pydantic import BaseModel, field_validator, model_validator
+from typing import List, Optional
+from datetime import datetime, timezone
 
 class ParkingHistoryBase(BaseModel):
     zone_code: str
@@ -40,4 +40,56 @@ class ParkingHistoryStats(BaseModel):
     total_duration: int  # in minutes
     avg_duration: int   # in minutes
     favorite_zone: Optional[str] = None
-    total_paid: float
\ No newline at end of file
+    total_paid: float
+
+class ParkingHistoryImport(ParkingHistoryBase):
+    """One row of a bulk parking history import"""
+    start_time: datetime
+    end_time: Optional[datetime] = None
+    duration_minutes: Optional[int] = None
+    amount_paid: float = 0.0
+    payment_method: Optional[str] = None
+    status: str = "completed"
+
+    @field_validator("zone_code")
+    @classmethod
+    def validate_zone_code(cls, v: str) -> str:
+        v = v.strip()
+        if not v:
+            raise ValueError("zone_code must not be empty")
+        return v
+
+    @field_validator("status")
+    @classmethod
+    def validate_status(cls, v: str) -> str:
+        if v not in ("active", "completed", "cancelled"):
+            raise ValueError("status must be active, completed or cancelled")
+        return v
+
+    @field_validator("start_time", "end_time")
+    @classmethod
+    def to_naive_utc(cls, v: Optional[datetime]) -> Optional[datetime]:
+        # The columns are naive UTC; offsets such as "Z" or "+02:00" are folded in
+        if v is not None and v.tzinfo is not None:
+            v = v.astimezone(timezone.utc).replace(tzinfo=None)
+        return v
+
+    @model_validator(mode="after")
+    def validate_times(self) -> "ParkingHistoryImport":
+        if self.end_time is not None:
+            if self.end_time < self.start_time:
+                raise ValueError("end_time is before start_time")
+            if self.duration_minutes is None:
+                self.duration_minutes = int((self.end_time - self.start_time).total_seconds() / 60)
+        elif self.status == "completed":
+            raise ValueError("completed sessions need an end_time")
+        return self
+
+class ParkingHistoryImportError(BaseModel):
+    line: int
+    error: str
+
+class ParkingHistoryImportResult(BaseModel):
+    imported: int
+    rejected: int
+    errors: List[ParkingHistoryImportError]
@@ -1,5 +1,5 @@
 # schemas/zones.py
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import List, Optional, Dict, Any, Literal
 
 class Position(BaseModel):
@@ -43,10 +43,29 @@ class ParkingDataResponse(StaleMetadata):
     parkingSpots: Dict[str, ParkingSpotInfo]
 
 
+class BoundsBatchRequest(BaseModel):
+    bounds: List[Bounds] = Field(..., min_length=1, max_length=9)
+
+
+class BatchParkingDataResponse(BaseModel):
+    keys: List[str]  # bounds_key for each requested bounds, in request order
+    results: Dict[str, ParkingDataResponse]  # bounds_key -> parking data
+    errors: Dict[str, Dict[str, Any]] = {}  # bounds_key -> error detail
+
+
 class ZoneCoordinatesResponse(StaleMetadata):
     coordinates: List[List[float]]  # List of [lat, lng] pairs
 
 
+class ZoneBatchRequest(BaseModel):
+    codes: List[str] = Field(..., min_length=1, max_length=100)
+
+
+class ZoneBatchResponse(StaleMetadata):
+    zones: Dict[str, List[List[float]]]  # zone_code -> list of [lat, lng] pairs
+    missing: List[str] = []
+
+
 class ZonesListResponse(StaleMetadata):
     zones: List[str]
 
@@ -82,6 +101,16 @@ class AnalyticsResponse(BaseModel):
     peak_hours: List[str]  # most active hours
 
 
+class AnalyticsHistoryResponse(BaseModel):
+    granularity: Literal["minute", "hour", "day"]
+    zone_code: str
+    start: str
+    end: str
+    series: List[Dict[str, Any]]  # [{bucket_start, searches, directions}]
+    total_searches: int
+    total_directions: int
+
+
 class ZoneAnalytics(BaseModel):
     zone_code: str
     zone_name: str
@@ -0,0 +1,369 @@
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.schemas.zones import SearchEvent
+from app.services.sketches import CountMinSketch, HyperLogLog, TopK
+
+HOURS_PER_DAY = 24
+
+
+def _empty_zone_stats() -> Dict[str, Any]:
+    return {"search_count": 0, "directions_requested": 0, "last_accessed": None}
+
+
+def _empty_daily_delta() -> Dict[str, Any]:
+    return {"searches": 0, "directions": 0, "hours": {}, "zones": {}}
+
+
+def _empty_bucket() -> Dict[str, Any]:
+    return {"searches": 0, "directions": 0, "zones": {}}  # zones: code -> [searches, directions]
+
+
+def _increment(counter: Dict[Any, int], key: Any, amount: int = 1) -> None:
+    counter[key] = counter.get(key, 0) + amount
+
+
+def minute_bucket(moment: datetime) -> datetime:
+    return moment.replace(second=0, microsecond=0)
+
+
+@dataclass
+class AnalyticsDelta:
+    """Counter increments and raw events accumulated since the last flush"""
+
+    searches: int = 0
+    directions: int = 0
+    hours: Dict[int, int] = field(default_factory=dict)
+    zone_searches: Dict[str, int] = field(default_factory=dict)
+    zone_directions: Dict[str, int] = field(default_factory=dict)
+    zone_last_accessed: Dict[str, str] = field(default_factory=dict)
+    daily: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # date -> daily increments
+    daily_users: Dict[str, bytes] = field(default_factory=dict)  # date -> serialized HyperLogLog
+    buckets: Dict[datetime, Dict[str, Any]] = field(default_factory=dict)  # minute -> increments
+    sessions: Dict[str, Dict[str, Any]] = field(default_factory=dict)  # session_id -> activity
+    events: List[Dict[str, Any]] = field(default_factory=list)  # raw events, oldest first
+    dropped_events: int = 0
+
+    def is_empty(self) -> bool:
+        return not (self.searches or self.directions)
+
+    def recent_searches(self, limit: int) -> List[SearchEvent]:
+        searches = [e for e in self.events if e["event_type"] == "search"][-limit:]
+        return [
+            SearchEvent(
+                zone_code=e["zone_code"],
+                zone_name=e["zone_name"],
+                timestamp=e["occurred_at"].isoformat(),
+                client_ip=e["client_ip"],
+                user_agent=e["user_agent"],
+            )
+            for e in searches
+        ]
+
+    def merge(self, other: "AnalyticsDelta", max_events: int) -> None:
+        """Fold ``other`` (older increments) into this delta"""
+        self.searches += other.searches
+        self.directions += other.directions
+        for hour, count in other.hours.items():
+            _increment(self.hours, hour, count)
+        for code, count in other.zone_searches.items():
+            _increment(self.zone_searches, code, count)
+        for code, count in other.zone_directions.items():
+            _increment(self.zone_directions, code, count)
+        for code, timestamp in other.zone_last_accessed.items():
+            self.zone_last_accessed[code] = max(timestamp, self.zone_last_accessed.get(code, ""))
+        for date, daily in other.daily.items():
+            target = self.daily.setdefault(date, _empty_daily_delta())
+            target["searches"] += daily["searches"]
+            target["directions"] += daily["directions"]
+            for hour, count in daily["hours"].items():
+                _increment(target["hours"], hour, count)
+            for code, count in daily["zones"].items():
+                _increment(target["zones"], code, count)
+        for date, sketch in other.daily_users.items():
+            # Sketches only grow within a day, so the newer one already covers the older
+            self.daily_users.setdefault(date, sketch)
+        for minute, bucket in other.buckets.items():
+            target = self.buckets.setdefault(minute, _empty_bucket())
+            target["searches"] += bucket["searches"]
+            target["directions"] += bucket["directions"]
+            for code, (searches, directions) in bucket["zones"].items():
+                counts = target["zones"].setdefault(code, [0, 0])
+                counts[0] += searches
+                counts[1] += directions
+        for session_id, activity in other.sessions.items():
+            target = self.sessions.get(session_id)
+            if target is None:
+                self.sessions[session_id] = dict(activity)
+            else:
+                target["first_seen"] = min(target["first_seen"], activity["first_seen"])
+                target["searches"] += activity["searches"]
+        room = max_events - len(self.events)
+        kept = other.events[-room:] if room > 0 else []
+        self.dropped_events += other.dropped_events + len(other.events) - len(kept)
+        self.events[:0] = kept
+
+
+@dataclass
+class AnalyticsSnapshot:
+    """Point-in-time analytics view served by the read endpoints"""
+
+    total_searches: int
+    search_trends: Dict[int, int]  # all-time searches per hour of day
+    zones: Dict[str, Dict[str, Any]]
+    top: List[Tuple[str, int]]  # heaviest zones first
+    recent: List[SearchEvent]  # oldest first
+    daily_date: str
+    daily_searches: int
+    daily_directions: int
+    daily_unique_users: int
+    daily_zones: Dict[str, int]
+    daily_hours: Dict[int, int]
+
+    def overview(self, recent_limit: int = 10) -> Dict[str, Any]:
+        cutoff = datetime.utcnow() - timedelta(hours=24)
+        recent: List[SearchEvent] = []
+        for event in reversed(self.recent):
+            if len(recent) >= recent_limit or datetime.fromisoformat(event.timestamp) <= cutoff:
+                break
+            recent.append(event)
+        recent.reverse()
+
+        search_trends = {str(hour): count for hour, count in sorted(self.search_trends.items()) if count}
+        popular_zones = {
+            code: stats["search_count"] for code, stats in self.zones.items() if stats["search_count"]
+        }
+        sorted_hours = sorted(search_trends.items(), key=lambda x: x[1], reverse=True)
+        return {
+            "total_searches": self.total_searches,
+            "unique_zones_searched": len(popular_zones),
+            "popular_zones": popular_zones,
+            "recent_searches": recent,
+            "search_trends": search_trends,
+            "peak_hours": [f"{hour}:00" for hour, _ in sorted_hours[:3]],
+        }
+
+    def zone_stats(self, zone_code: str) -> Dict[str, Any]:
+        return dict(self.zones.get(zone_code) or _empty_zone_stats())
+
+    def top_zones(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Heaviest zones (at most ``ANALYTICS_TOP_K`` entries)"""
+        result = []
+        for zone_code, estimate in self.top[:limit]:
+            stats = self.zones.get(zone_code)
+            if stats is None:
+                # Zone is past the per-zone cap; fall back to the sketch estimate
+                stats = {**_empty_zone_stats(), "search_count": estimate}
+            result.append({"zone_code": zone_code, **stats})
+        return result
+
+    def peak_hours(self) -> Dict[int, int]:
+        """Today's searches per hour of day (hours without searches omitted)"""
+        return {hour: count for hour, count in sorted(self.daily_hours.items()) if count}
+
+    def daily_summary(self) -> Dict[str, Any]:
+        return {
+            "date": self.daily_date,
+            "total_searches": self.daily_searches,
+            "total_directions": self.daily_directions,
+            "unique_users": self.daily_unique_users,
+            "popular_zones": dict(self.daily_zones),
+        }
+
+
+class AnalyticsStore:
+    """Fixed-size, pre-aggregated analytics state for this worker.
+
+    Recent events live in a ring buffer; everything the read endpoints need is
+    kept as running counters, so reads are O(1) or O(zones) and memory does not
+    grow with traffic. Daily unique users are a HyperLogLog estimate and zone
+    popularity is ranked by a Count-Min sketch feeding a bounded top-K set.
+    Increments and raw events are also collected into a pending delta that
+    ``app.services.analytics_sync`` drains into the shared and durable stores.
+    Daily statistics rotate automatically when the date changes.
+    """
+
+    def __init__(
+        self,
+        recent_events: int = settings.ANALYTICS_RECENT_EVENTS,
+        max_zones: int = settings.ANALYTICS_MAX_ZONES,
+        top_k: int = settings.ANALYTICS_TOP_K,
+        max_pending_events: int = settings.ANALYTICS_EVENT_BUFFER,
+    ):
+        self._lock = Lock()
+        self.max_zones = max_zones
+        self.top_k = top_k
+        self.max_pending_events = max_pending_events
+        self._recent: Deque[SearchEvent] = deque(maxlen=recent_events)
+        self.total_searches = 0
+        self.total_directions = 0
+        self._hourly_searches: List[int] = [0] * HOURS_PER_DAY
+        self._zones: Dict[str, Dict[str, Any]] = {}
+        self._zone_counts = CountMinSketch()
+        self._top_zones = TopK(k=top_k)
+        self._pending = AnalyticsDelta()
+        self._reset_daily_locked(datetime.utcnow())
+
+    def _reset_daily_locked(self, now: datetime) -> None:
+        self.daily_date = now.date().isoformat()
+        self.daily_searches = 0
+        self.daily_directions = 0
+        self._daily_users = HyperLogLog()
+        self._daily_zones: Dict[str, int] = {}
+        self._daily_hours: List[int] = [0] * HOURS_PER_DAY
+
+    def _rotate_daily_locked(self, now: datetime) -> None:
+        if now.date().isoformat() != self.daily_date:
+            # Keep the finished day's unique-user sketch for the next flush
+            self._pending.daily_users[self.daily_date] = self._daily_users.to_bytes()
+            self._reset_daily_locked(now)
+
+    def _zone_stats_locked(self, zone_code: str) -> Optional[Dict[str, Any]]:
+        stats = self._zones.get(zone_code)
+        if stats is None and len(self._zones) < self.max_zones:
+            stats = self._zones[zone_code] = _empty_zone_stats()
+        return stats
+
+    def _pending_daily_locked(self, now: datetime) -> Dict[str, Any]:
+        return self._pending.daily.setdefault(now.date().isoformat(), _empty_daily_delta())
+
+    def _pending_event_locked(self, event: Dict[str, Any]) -> None:
+        if len(self._pending.events) < self.max_pending_events:
+            self._pending.events.append(event)
+        else:
+            self._pending.dropped_events += 1
+
+    def record_search(
+        self,
+        zone_code: str,
+        zone_name: str,
+        client_ip: str,
+        anonymized_ip: str,
+        user_agent: str,
+        session_id: Optional[str] = None,
+        now: Optional[datetime] = None,
+    ) -> SearchEvent:
+        now = now or datetime.utcnow()
+        event = SearchEvent(
+            zone_code=zone_code,
+            zone_name=zone_name,
+            timestamp=now.isoformat(),
+            client_ip=anonymized_ip,
+            user_agent=user_agent,
+        )
+        with self._lock:
+            self._rotate_daily_locked(now)
+            self._recent.append(event)
+            self.total_searches += 1
+            self._hourly_searches[now.hour] += 1
+
+            stats = self._zone_stats_locked(zone_code)
+            if stats is not None:
+                stats["search_count"] += 1
+                stats["last_accessed"] = event.timestamp
+            self._top_zones.offer(zone_code, self._zone_counts.add(zone_code))
+
+            self.daily_searches += 1
+            self._daily_hours[now.hour] += 1
+            self._daily_users.add(client_ip)
+            if zone_code in self._daily_zones or len(self._daily_zones) < self.max_zones:
+                self._daily_zones[zone_code] = self._daily_zones.get(zone_code, 0) + 1
+
+            pending = self._pending
+            pending.searches += 1
+            _increment(pending.hours, now.hour)
+            if stats is not None:
+                _increment(pending.zone_searches, zone_code)
+                pending.zone_last_accessed[zone_code] = event.timestamp
+            daily = self._pending_daily_locked(now)
+            daily["searches"] += 1
+            _increment(daily["hours"], now.hour)
+            if stats is not None:
+                _increment(daily["zones"], zone_code)
+            bucket = pending.buckets.setdefault(minute_bucket(now), _empty_bucket())
+            bucket["searches"] += 1
+            if stats is not None:
+                bucket["zones"].setdefault(zone_code, [0, 0])[0] += 1
+            if session_id:
+                activity = pending.sessions.setdefault(
+                    session_id, {"first_seen": now, "last_seen": now, "searches": 0}
+                )
+                activity["last_seen"] = now
+                activity["searches"] += 1
+            self._pending_event_locked({
+                "event_type": "search",
+                "zone_code": zone_code,
+                "zone_name": zone_name,
+                "occurred_at": now,
+                "client_ip": anonymized_ip,
+                "user_agent": user_agent,
+                "session_id": session_id,
+            })
+        return event
+
+    def record_directions(self, zone_code: str, now: Optional[datetime] = None) -> int:
+        """Count a directions request and return the zone's running total"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            self._rotate_daily_locked(now)
+            self.total_directions += 1
+            self.daily_directions += 1
+            self._pending.directions += 1
+            self._pending_daily_locked(now)["directions"] += 1
+            bucket = self._pending.buckets.setdefault(minute_bucket(now), _empty_bucket())
+            bucket["directions"] += 1
+            self._pending_event_locked({
+                "event_type": "directions",
+                "zone_code": zone_code,
+                "zone_name": None,
+                "occurred_at": now,
+                "client_ip": None,
+                "user_agent": None,
+                "session_id": None,
+            })
+            stats = self._zone_stats_locked(zone_code)
+            if stats is None:
+                return 0
+            stats["directions_requested"] += 1
+            _increment(self._pending.zone_directions, zone_code)
+            bucket["zones"].setdefault(zone_code, [0, 0])[1] += 1
+            return stats["directions_requested"]
+
+    def snapshot(self) -> AnalyticsSnapshot:
+        """Copy this worker's state into a read-only view"""
+        with self._lock:
+            self._rotate_daily_locked(datetime.utcnow())
+            return AnalyticsSnapshot(
+                total_searches=self.total_searches,
+                search_trends=dict(enumerate(self._hourly_searches)),
+                zones={code: dict(stats) for code, stats in self._zones.items()},
+                top=self._top_zones.top(self.top_k),
+                recent=list(self._recent),
+                daily_date=self.daily_date,
+                daily_searches=self.daily_searches,
+                daily_directions=self.daily_directions,
+                daily_unique_users=self._daily_users.count(),
+                daily_zones=dict(self._daily_zones),
+                daily_hours=dict(enumerate(self._daily_hours)),
+            )
+
+    def drain_pending(self) -> AnalyticsDelta:
+        """Hand over pending increments, including today's unique-user sketch"""
+        with self._lock:
+            self._rotate_daily_locked(datetime.utcnow())
+            delta, self._pending = self._pending, AnalyticsDelta()
+            delta.daily_users[self.daily_date] = self._daily_users.to_bytes()
+            return delta
+
+    def reset_daily(self) -> None:
+        with self._lock:
+            self._reset_daily_locked(datetime.utcnow())
+            self._pending.daily.pop(self.daily_date, None)
+
+
+# Global analytics store instance
+analytics_store = AnalyticsStore()
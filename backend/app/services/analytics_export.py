@@ -0,0 +1,128 @@
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.core.logging import logger
+from app.models.analytics import AnalyticsRollup, SearchEvent
+
+EXPORT_DATASETS = {
+    "events": (
+        SearchEvent,
+        SearchEvent.occurred_at,
+        ["id", "event_type", "zone_code", "zone_name", "occurred_at", "client_ip", "user_agent", "session_id"],
+    ),
+    "rollups": (
+        AnalyticsRollup,
+        AnalyticsRollup.bucket_start,
+        ["id", "granularity", "bucket_start", "zone_code", "searches", "directions"],
+    ),
+}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(dataset: str, last_id: int) -> str:
+    raw = json.dumps({"d": dataset, "id": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(dataset: str, token: str) -> int:
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        last_id = int(payload["id"])
+    except (ValueError, KeyError, TypeError) as exc:
+        raise InvalidCursor("Malformed cursor") from exc
+    if payload.get("d") != dataset:
+        raise InvalidCursor(f"Cursor does not belong to the {dataset} export")
+    return last_id
+
+
+def _serialize(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def _iter_rows(
+    session_factory: Callable[[], Session],
+    dataset: str,
+    start: datetime,
+    end: datetime,
+    after_id: int,
+    chunk_size: int,
+    filters: Dict[str, Any],
+) -> Iterator[List[Dict[str, Any]]]:
+    """Yield chunks of rows in id order from a server-side cursor"""
+    model, time_column, columns = EXPORT_DATASETS[dataset]
+    query = (
+        select(*(getattr(model, name) for name in columns))
+        .where(time_column >= start, time_column <= end, model.id > after_id)
+        .order_by(model.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    for name, value in filters.items():
+        if value is not None:
+            query = query.where(getattr(model, name) == value)
+
+    # The request's session is closed before the body streams, so use our own
+    db = session_factory()
+    try:
+        result = db.execute(query)
+        for partition in result.partitions():
+            yield [
+                {name: _serialize(value) for name, value in zip(columns, row)} for row in partition
+            ]
+    finally:
+        db.close()
+
+
+def stream_export(
+    session_factory: Callable[[], Session],
+    dataset: str,
+    fmt: str,
+    start: datetime,
+    end: datetime,
+    after_id: int = 0,
+    chunk_size: int = 1000,
+    **filters: Any,
+) -> Iterator[str]:
+    """Stream ``dataset`` rows as NDJSON or CSV in constant memory.
+
+    Every row carries a ``cursor`` token; the export resumes after the row
+    whose id is ``after_id`` (see ``decode_cursor``).
+    """
+    columns = EXPORT_DATASETS[dataset][2] + ["cursor"]
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+
+    exported = 0
+    try:
+        for chunk in _iter_rows(session_factory, dataset, start, end, after_id, chunk_size, filters):
+            for row in chunk:
+                row["cursor"] = encode_cursor(dataset, row["id"])
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(row))
+                    buffer.write("\n")
+            exported += len(chunk)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        if writer and not exported:
+            yield buffer.getvalue()
+    except Exception as exc:
+        # Headers are already sent, so the client sees a truncated body and resumes from its last cursor
+        logger.error("Analytics %s export aborted after %s rows: %s", dataset, exported, exc)
+        raise
+    logger.info("Exported %s analytics %s rows as %s", exported, dataset, fmt)
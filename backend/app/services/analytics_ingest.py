@@ -0,0 +1,155 @@
+import queue
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from app.core.config import settings
+from app.core.logging import logger
+from app.services.analytics import AnalyticsStore, analytics_store
+
+UNKNOWN_ZONE_NAME = "Unknown Zone"
+
+
+@dataclass
+class TrackingEvent:
+    """Validated tracking beacon waiting to be applied to the analytics store"""
+
+    kind: str  # "search" or "directions"
+    zone_code: str
+    occurred_at: datetime = field(default_factory=datetime.utcnow)
+    client_ip: str = "unknown"
+    anonymized_ip: str = "anonymous"
+    user_agent: str = ""
+    session_id: Optional[str] = None
+
+
+class AnalyticsIngestQueue:
+    """Bounded in-process queue between the tracking endpoints and the store.
+
+    ``submit`` never blocks: past ``shed_threshold`` of capacity only a
+    ``sample_rate`` fraction of events is accepted, and once the queue is full
+    events are dropped. A consumer thread applies events in batches and
+    resolves zone names from the cached snapshot index, so tracking requests
+    never wait on the upstream API, the database or the store lock.
+    """
+
+    def __init__(
+        self,
+        store: AnalyticsStore,
+        maxsize: int = settings.ANALYTICS_INGEST_QUEUE_SIZE,
+        batch_size: int = settings.ANALYTICS_INGEST_BATCH_SIZE,
+        shed_threshold: float = settings.ANALYTICS_INGEST_SHED_THRESHOLD,
+        sample_rate: float = settings.ANALYTICS_INGEST_SAMPLE_RATE,
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.sample_rate = sample_rate
+        self._queue: "queue.Queue[Optional[TrackingEvent]]" = queue.Queue(maxsize=maxsize)
+        self._shed_above = int(maxsize * shed_threshold)
+        self._zone_name_resolver: Callable[[str], Optional[str]] = lambda zone_code: None
+        self._thread: Optional[threading.Thread] = None
+        self.accepted = 0
+        self.sampled_out = 0
+        self.dropped = 0
+
+    def submit(self, event: TrackingEvent) -> bool:
+        """Enqueue ``event``; returns False if it was shed"""
+        if self._queue.qsize() >= self._shed_above and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return False
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            return False
+        self.accepted += 1
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "queued": self._queue.qsize(),
+            "capacity": self._queue.maxsize,
+            "accepted": self.accepted,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+        }
+
+    def _next_batch(self) -> Optional[List[TrackingEvent]]:
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        while len(batch) < self.batch_size:
+            try:
+                event = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if event is None:
+                # Re-queue the stop marker so the loop exits after this batch
+                self._queue.put(None)
+                break
+            batch.append(event)
+        return batch
+
+    def apply(self, batch: List[TrackingEvent]) -> None:
+        names: Dict[str, str] = {}
+        for event in batch:
+            if event.kind == "directions":
+                self.store.record_directions(event.zone_code, now=event.occurred_at)
+                continue
+            name = names.get(event.zone_code)
+            if name is None:
+                name = names[event.zone_code] = self._zone_name_resolver(event.zone_code) or UNKNOWN_ZONE_NAME
+            self.store.record_search(
+                zone_code=event.zone_code,
+                zone_name=name,
+                client_ip=event.client_ip,
+                anonymized_ip=event.anonymized_ip,
+                user_agent=event.user_agent,
+                session_id=event.session_id,
+                now=event.occurred_at,
+            )
+
+    def _run(self) -> None:
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                self.apply(batch)
+            except Exception as exc:
+                logger.error("Failed to apply %s analytics events: %s", len(batch), exc)
+            else:
+                logger.debug("Applied %s analytics events (%s queued)", len(batch), self._queue.qsize())
+
+    def start(self, zone_name_resolver: Callable[[str], Optional[str]]) -> None:
+        self._zone_name_resolver = zone_name_resolver
+        self._thread = threading.Thread(target=self._run, name="analytics-ingest", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Apply everything already queued, then stop the consumer"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout=timeout)
+        self._thread = None
+        if self.sampled_out or self.dropped:
+            logger.warning(
+                "Analytics ingest shed %s sampled and %s dropped events", self.sampled_out, self.dropped
+            )
+
+
+# Global ingest queue feeding ``analytics_store``
+analytics_ingest = AnalyticsIngestQueue(analytics_store)
+
+
+def start_analytics_ingest(zone_name_resolver: Callable[[str], Optional[str]]) -> None:
+    """Start the consumer thread; ``zone_name_resolver`` must not do I/O"""
+    analytics_ingest.start(zone_name_resolver)
+
+
+def stop_analytics_ingest() -> None:
+    analytics_ingest.stop()
@@ -0,0 +1,312 @@
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import upsert_insert
+from app.core.logging import logger
+from app.models.analytics import (
+    ALL_ZONES,
+    AnalyticsRollup,
+    DailyStats,
+    SearchEvent,
+    UserSession,
+    ZonePopularity,
+)
+from app.services.analytics import AnalyticsDelta
+from app.services.sketches import HyperLogLog
+
+# Largest range (inclusive) served at each granularity when none is requested
+AUTO_GRANULARITY_LIMITS = (("minute", timedelta(hours=6)), ("hour", timedelta(days=7)))
+
+
+def bucket_start(moment: datetime, granularity: str) -> datetime:
+    if granularity == "minute":
+        return moment.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return moment.replace(minute=0, second=0, microsecond=0)
+    return moment.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def choose_granularity(start: datetime, end: datetime) -> str:
+    for granularity, limit in AUTO_GRANULARITY_LIMITS:
+        if end - start <= limit:
+            return granularity
+    return "day"
+
+
+def _rollup_rows(delta: AnalyticsDelta) -> List[Dict[str, Any]]:
+    """Fold per-minute buckets into minute, hour and day rollup rows"""
+    rows: Dict[Tuple[str, datetime, str], List[int]] = {}
+
+    def add(key: Tuple[str, datetime, str], searches: int, directions: int) -> None:
+        counts = rows.setdefault(key, [0, 0])
+        counts[0] += searches
+        counts[1] += directions
+
+    for minute, bucket in delta.buckets.items():
+        for granularity in ("minute", "hour", "day"):
+            start = bucket_start(minute, granularity)
+            add((granularity, start, ALL_ZONES), bucket["searches"], bucket["directions"])
+            for zone_code, (searches, directions) in bucket["zones"].items():
+                add((granularity, start, zone_code), searches, directions)
+
+    return [
+        {
+            "granularity": granularity,
+            "bucket_start": start,
+            "zone_code": zone_code,
+            "searches": searches,
+            "directions": directions,
+        }
+        for (granularity, start, zone_code), (searches, directions) in rows.items()
+    ]
+
+
+class DatabaseAnalyticsSink:
+    """Durable analytics: raw events, rollups and per-day/zone/session totals.
+
+    Each flush writes one batch per table in a single transaction; counters are
+    applied with INSERT ... ON CONFLICT DO UPDATE so concurrent workers add up.
+    Expired raw events and minute rollups are pruned once per day.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        event_retention_days: int = settings.ANALYTICS_EVENT_RETENTION_DAYS,
+        minute_retention_days: int = settings.ANALYTICS_MINUTE_RETENTION_DAYS,
+    ):
+        self.session_factory = session_factory
+        self.event_retention_days = event_retention_days
+        self.minute_retention_days = minute_retention_days
+        self._last_prune: Optional[date] = None
+
+    def flush(self, delta: AnalyticsDelta) -> None:
+        db = self.session_factory()
+        try:
+            if delta.events:
+                db.execute(insert(SearchEvent), delta.events)
+            if delta.dropped_events:
+                logger.warning("Analytics event buffer full; %s raw events not persisted", delta.dropped_events)
+
+            rollups = _rollup_rows(delta)
+            if rollups:
+                stmt = upsert_insert(db, AnalyticsRollup)
+                db.execute(
+                    stmt.on_conflict_do_update(
+                        index_elements=["granularity", "bucket_start", "zone_code"],
+                        set_={
+                            "searches": AnalyticsRollup.searches + stmt.excluded.searches,
+                            "directions": AnalyticsRollup.directions + stmt.excluded.directions,
+                        },
+                    ),
+                    rollups,
+                )
+
+            self._flush_zones(db, delta)
+            self._flush_daily(db, delta)
+            self._flush_sessions(db, delta)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        today = datetime.utcnow().date()
+        if self._last_prune != today:
+            self._last_prune = today
+            self.prune()
+
+    def _flush_zones(self, db: Session, delta: AnalyticsDelta) -> None:
+        codes = set(delta.zone_searches) | set(delta.zone_directions)
+        if not codes:
+            return
+        last_accessed = {code: datetime.fromisoformat(ts) for code, ts in delta.zone_last_accessed.items()}
+        stmt = upsert_insert(db, ZonePopularity)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["zone_code"],
+                set_={
+                    "search_count": ZonePopularity.search_count + stmt.excluded.search_count,
+                    "directions_requested": ZonePopularity.directions_requested
+                    + stmt.excluded.directions_requested,
+                    "last_accessed": case(
+                        (ZonePopularity.last_accessed.is_(None), stmt.excluded.last_accessed),
+                        (stmt.excluded.last_accessed > ZonePopularity.last_accessed, stmt.excluded.last_accessed),
+                        else_=ZonePopularity.last_accessed,
+                    ),
+                },
+            ),
+            [
+                {
+                    "zone_code": code,
+                    "search_count": delta.zone_searches.get(code, 0),
+                    "directions_requested": delta.zone_directions.get(code, 0),
+                    "last_accessed": last_accessed.get(code),
+                }
+                for code in codes
+            ],
+        )
+
+    def _flush_daily(self, db: Session, delta: AnalyticsDelta) -> None:
+        dates = set(delta.daily) | set(delta.daily_users)
+        if not dates:
+            return
+        stmt = upsert_insert(db, DailyStats)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["date"],
+                set_={
+                    "total_searches": DailyStats.total_searches + stmt.excluded.total_searches,
+                    "total_directions": DailyStats.total_directions + stmt.excluded.total_directions,
+                },
+            ),
+            [
+                {
+                    "date": date.fromisoformat(day),
+                    "total_searches": delta.daily.get(day, {}).get("searches", 0),
+                    "total_directions": delta.daily.get(day, {}).get("directions", 0),
+                    "unique_users": 0,
+                }
+                for day in dates
+            ],
+        )
+
+        # Unique users: merge this worker's sketch into the stored one under a row lock
+        for day, raw_sketch in delta.daily_users.items():
+            row = db.execute(
+                select(DailyStats).where(DailyStats.date == date.fromisoformat(day)).with_for_update()
+            ).scalar_one()
+            sketch = HyperLogLog.from_bytes(raw_sketch)
+            if row.unique_users_sketch:
+                sketch.merge(HyperLogLog.from_bytes(row.unique_users_sketch))
+            row.unique_users_sketch = sketch.to_bytes()
+            row.unique_users = sketch.count()
+
+    def _flush_sessions(self, db: Session, delta: AnalyticsDelta) -> None:
+        if not delta.sessions:
+            return
+        stmt = upsert_insert(db, UserSession)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["session_id"],
+                set_={
+                    "last_seen": stmt.excluded.last_seen,
+                    "total_searches": UserSession.total_searches + stmt.excluded.total_searches,
+                },
+            ),
+            [
+                {
+                    "session_id": session_id,
+                    "first_seen": activity["first_seen"],
+                    "last_seen": activity["last_seen"],
+                    "total_searches": activity["searches"],
+                }
+                for session_id, activity in delta.sessions.items()
+            ],
+        )
+
+    def prune(self) -> None:
+        """Drop raw events and minute rollups past their retention window"""
+        now = datetime.utcnow()
+        db = self.session_factory()
+        try:
+            events = db.execute(
+                delete(SearchEvent).where(
+                    SearchEvent.occurred_at < now - timedelta(days=self.event_retention_days)
+                )
+            )
+            minutes = db.execute(
+                delete(AnalyticsRollup).where(
+                    AnalyticsRollup.granularity == "minute",
+                    AnalyticsRollup.bucket_start < now - timedelta(days=self.minute_retention_days),
+                )
+            )
+            db.commit()
+            logger.info(
+                "Pruned %s analytics events and %s minute rollups", events.rowcount, minutes.rowcount
+            )
+        except Exception as exc:
+            db.rollback()
+            logger.warning("Analytics pruning failed: %s", exc)
+        finally:
+            db.close()
+
+    def reset_daily(self, day: str) -> None:
+        db = self.session_factory()
+        try:
+            db.execute(delete(DailyStats).where(DailyStats.date == date.fromisoformat(day)))
+            db.commit()
+        finally:
+            db.close()
+
+
+def get_rollup_series(
+    db: Session,
+    start: datetime,
+    end: datetime,
+    granularity: str,
+    zone_code: str = ALL_ZONES,
+) -> List[Dict[str, Any]]:
+    rows = db.execute(
+        select(AnalyticsRollup.bucket_start, AnalyticsRollup.searches, AnalyticsRollup.directions)
+        .where(
+            AnalyticsRollup.granularity == granularity,
+            AnalyticsRollup.zone_code == zone_code,
+            AnalyticsRollup.bucket_start >= bucket_start(start, granularity),
+            AnalyticsRollup.bucket_start <= end,
+        )
+        .order_by(AnalyticsRollup.bucket_start)
+    ).all()
+    return [
+        {"bucket_start": row.bucket_start.isoformat(), "searches": row.searches, "directions": row.directions}
+        for row in rows
+    ]
+
+
+def get_top_zones_between(db: Session, start: datetime, end: datetime, limit: int) -> List[Dict[str, Any]]:
+    granularity = "hour" if choose_granularity(start, end) != "day" else "day"
+    searches = func.sum(AnalyticsRollup.searches).label("search_count")
+    rows = db.execute(
+        select(
+            AnalyticsRollup.zone_code,
+            searches,
+            func.sum(AnalyticsRollup.directions).label("directions_requested"),
+            func.max(AnalyticsRollup.bucket_start).label("last_bucket"),
+        )
+        .where(
+            AnalyticsRollup.granularity == granularity,
+            AnalyticsRollup.zone_code != ALL_ZONES,
+            AnalyticsRollup.bucket_start >= bucket_start(start, granularity),
+            AnalyticsRollup.bucket_start <= end,
+        )
+        .group_by(AnalyticsRollup.zone_code)
+        .order_by(searches.desc())
+        .limit(limit)
+    ).all()
+    return [
+        {
+            "zone_code": row.zone_code,
+            "search_count": row.search_count,
+            "directions_requested": row.directions_requested,
+            "last_accessed": row.last_bucket.isoformat() if row.last_bucket else None,
+        }
+        for row in rows
+    ]
+
+
+def get_hourly_distribution(db: Session, start: datetime, end: datetime) -> Dict[int, int]:
+    """Searches per hour of day across the range, from hourly total rollups"""
+    distribution: Dict[int, int] = {}
+    for row in get_rollup_series(db, start, end, "hour"):
+        hour = datetime.fromisoformat(row["bucket_start"]).hour
+        distribution[hour] = distribution.get(hour, 0) + row["searches"]
+    return {hour: count for hour, count in sorted(distribution.items()) if count}
+
+
+def get_daily_stats(db: Session, day: date) -> Optional[DailyStats]:
+    return db.execute(select(DailyStats).where(DailyStats.date == day)).scalar_one_or_none()
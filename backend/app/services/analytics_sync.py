@@ -0,0 +1,265 @@
+import copy
+import heapq
+import os
+import socket
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import redis
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.core.shared import cache
+from app.schemas.zones import SearchEvent
+from app.services.analytics import AnalyticsDelta, AnalyticsSnapshot, AnalyticsStore, analytics_store
+from app.services.analytics_rollups import DatabaseAnalyticsSink
+from app.services.sketches import HyperLogLog
+
+KEY_PREFIX = "revamp:analytics"
+DAILY_KEY_TTL_SECONDS = 3 * 24 * 3600
+VIEW_CACHE_KEY = "analytics_view"
+
+WORKER_ID = f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _key(*parts: str) -> str:
+    return ":".join((KEY_PREFIX,) + parts)
+
+
+def _int_hash(raw: Dict[bytes, bytes]) -> Dict[str, int]:
+    return {k.decode(): int(v) for k, v in raw.items()}
+
+
+class RedisAnalyticsSink:
+    """Shared analytics counters kept in Redis hashes.
+
+    Workers add their increments with HINCRBY in one pipeline per flush, so
+    the hashes always hold the cluster-wide totals. Daily unique users are
+    stored as one HyperLogLog per worker and merged on read.
+    """
+
+    def __init__(self, client: redis.Redis, recent_events: int = settings.ANALYTICS_RECENT_EVENTS):
+        self.client = client
+        self.recent_events = recent_events
+
+    def flush(self, delta: AnalyticsDelta) -> None:
+        pipe = self.client.pipeline(transaction=False)
+        if delta.searches:
+            pipe.hincrby(_key("totals"), "searches", delta.searches)
+        if delta.directions:
+            pipe.hincrby(_key("totals"), "directions", delta.directions)
+        for hour, count in delta.hours.items():
+            pipe.hincrby(_key("hours"), str(hour), count)
+        for code, count in delta.zone_searches.items():
+            pipe.hincrby(_key("zones", "searches"), code, count)
+        for code, count in delta.zone_directions.items():
+            pipe.hincrby(_key("zones", "directions"), code, count)
+        if delta.zone_last_accessed:
+            pipe.hset(_key("zones", "last_accessed"), mapping=delta.zone_last_accessed)
+
+        for date, daily in delta.daily.items():
+            totals_key = _key("daily", date)
+            if daily["searches"]:
+                pipe.hincrby(totals_key, "searches", daily["searches"])
+            if daily["directions"]:
+                pipe.hincrby(totals_key, "directions", daily["directions"])
+            for hour, count in daily["hours"].items():
+                pipe.hincrby(_key("daily", date, "hours"), str(hour), count)
+            for code, count in daily["zones"].items():
+                pipe.hincrby(_key("daily", date, "zones"), code, count)
+            for suffix in ((), ("hours",), ("zones",)):
+                pipe.expire(_key("daily", date, *suffix), DAILY_KEY_TTL_SECONDS)
+
+        for date, sketch in delta.daily_users.items():
+            pipe.set(_key("daily", date, "hll", WORKER_ID), sketch, ex=DAILY_KEY_TTL_SECONDS)
+            pipe.sadd(_key("daily", date, "hll_workers"), WORKER_ID)
+            pipe.expire(_key("daily", date, "hll_workers"), DAILY_KEY_TTL_SECONDS)
+
+        recent = delta.recent_searches(self.recent_events)
+        if recent:
+            pipe.lpush(_key("recent"), *(event.model_dump_json() for event in recent))
+            pipe.ltrim(_key("recent"), 0, self.recent_events - 1)
+        pipe.execute()
+
+    def read_view(self, top_k: int = settings.ANALYTICS_TOP_K) -> AnalyticsSnapshot:
+        date = datetime.utcnow().date().isoformat()
+        pipe = self.client.pipeline(transaction=False)
+        pipe.hgetall(_key("totals"))
+        pipe.hgetall(_key("hours"))
+        pipe.hgetall(_key("zones", "searches"))
+        pipe.hgetall(_key("zones", "directions"))
+        pipe.hgetall(_key("zones", "last_accessed"))
+        pipe.lrange(_key("recent"), 0, 9)
+        pipe.hgetall(_key("daily", date))
+        pipe.hgetall(_key("daily", date, "hours"))
+        pipe.hgetall(_key("daily", date, "zones"))
+        pipe.smembers(_key("daily", date, "hll_workers"))
+        totals, hours, searches, directions, last_accessed, recent, daily, daily_hours, daily_zones, workers = (
+            pipe.execute()
+        )
+
+        totals = _int_hash(totals)
+        searches = _int_hash(searches)
+        directions = _int_hash(directions)
+        last_accessed = {k.decode(): v.decode() for k, v in last_accessed.items()}
+        zones = {
+            code: {
+                "search_count": searches.get(code, 0),
+                "directions_requested": directions.get(code, 0),
+                "last_accessed": last_accessed.get(code),
+            }
+            for code in set(searches) | set(directions)
+        }
+        daily = _int_hash(daily)
+
+        return AnalyticsSnapshot(
+            total_searches=totals.get("searches", 0),
+            search_trends={int(h): c for h, c in _int_hash(hours).items()},
+            zones=zones,
+            top=heapq.nlargest(top_k, searches.items(), key=lambda x: x[1]),
+            recent=[SearchEvent.model_validate_json(raw) for raw in reversed(recent)],
+            daily_date=date,
+            daily_searches=daily.get("searches", 0),
+            daily_directions=daily.get("directions", 0),
+            daily_unique_users=self._daily_unique_users(date, workers),
+            daily_zones=_int_hash(daily_zones),
+            daily_hours={int(h): c for h, c in _int_hash(daily_hours).items()},
+        )
+
+    def _daily_unique_users(self, date: str, workers) -> int:
+        if not workers:
+            return 0
+        keys = [_key("daily", date, "hll", worker.decode()) for worker in workers]
+        merged: Optional[HyperLogLog] = None
+        for raw in self.client.mget(keys):
+            if raw is None:
+                continue
+            sketch = HyperLogLog.from_bytes(raw)
+            if merged is None:
+                merged = sketch
+            else:
+                merged.merge(sketch)
+        return merged.count() if merged else 0
+
+    def reset_daily(self, date: str) -> None:
+        workers = self.client.smembers(_key("daily", date, "hll_workers"))
+        keys = [_key("daily", date, *suffix) for suffix in ((), ("hours",), ("zones",), ("hll_workers",))]
+        keys += [_key("daily", date, "hll", worker.decode()) for worker in workers]
+        self.client.delete(*keys)
+
+
+class AnalyticsSyncWorker:
+    """Background thread that periodically flushes a store's pending counters.
+
+    Each sink keeps its own backlog, so a delta that failed to reach one sink
+    is retried there without being applied twice to the others.
+    """
+
+    def __init__(self, store: AnalyticsStore, sinks: List[Any], interval_seconds: float):
+        self.store = store
+        self.sinks = sinks
+        self.interval_seconds = interval_seconds
+        self._backlog: Dict[int, AnalyticsDelta] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def flush(self) -> None:
+        delta = self.store.drain_pending()
+        for index, sink in enumerate(self.sinks):
+            pending = delta
+            backlog = self._backlog.pop(index, None)
+            if backlog is not None:
+                pending = copy.deepcopy(delta)
+                pending.merge(backlog, self.store.max_pending_events)
+            if pending.is_empty():
+                continue
+            try:
+                sink.flush(pending)
+            except Exception as exc:
+                logger.warning(
+                    "Analytics flush to %s failed; keeping %s pending searches: %s",
+                    type(sink).__name__,
+                    pending.searches,
+                    exc,
+                )
+                self._backlog[index] = pending
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.flush()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="analytics-sync", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds)
+        self.flush()
+
+
+_sink: Optional[RedisAnalyticsSink] = None
+_db_sink: Optional[DatabaseAnalyticsSink] = None
+_worker: Optional[AnalyticsSyncWorker] = None
+
+
+def start_analytics_sync() -> None:
+    """Start flushing this worker's analytics to Redis and/or the database"""
+    global _sink, _db_sink, _worker
+    sinks: List[Any] = []
+    if settings.REDIS_URL:
+        _sink = RedisAnalyticsSink(redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2))
+        sinks.append(_sink)
+    else:
+        logger.info("REDIS_URL not set; live analytics endpoints report this worker only.")
+    if settings.ANALYTICS_PERSIST:
+        _db_sink = DatabaseAnalyticsSink(SessionLocal)
+        sinks.append(_db_sink)
+    if not sinks:
+        return
+    _worker = AnalyticsSyncWorker(analytics_store, sinks, settings.ANALYTICS_FLUSH_SECONDS)
+    _worker.start()
+    logger.info(
+        "Analytics sync started (worker=%s, sinks=%s, every %ss)",
+        WORKER_ID,
+        [type(sink).__name__ for sink in sinks],
+        settings.ANALYTICS_FLUSH_SECONDS,
+    )
+
+
+def stop_analytics_sync() -> None:
+    """Stop the background flusher after a final flush"""
+    global _worker
+    if _worker:
+        _worker.stop()
+        _worker = None
+
+
+def get_analytics_view() -> AnalyticsSnapshot:
+    """Cluster-wide analytics when a shared store is configured, else this worker's"""
+    if _sink is None:
+        return analytics_store.snapshot()
+
+    view: Optional[AnalyticsSnapshot] = cache.get(VIEW_CACHE_KEY)
+    if view:
+        return view
+    try:
+        view = _sink.read_view()
+    except redis.RedisError as exc:
+        logger.warning("Shared analytics unavailable; serving this worker's view: %s", exc)
+        return analytics_store.snapshot()
+    cache.set(VIEW_CACHE_KEY, view, ttl_seconds=settings.ANALYTICS_VIEW_TTL_SECONDS)
+    return view
+
+
+def reset_daily_analytics() -> None:
+    """Reset today's statistics locally and, if configured, in the shared store"""
+    analytics_store.reset_daily()
+    if _sink is not None:
+        _sink.reset_daily(analytics_store.daily_date)
+    if _db_sink is not None:
+        _db_sink.reset_daily(analytics_store.daily_date)
+    cache.delete(VIEW_CACHE_KEY)
@@ -0,0 +1,116 @@
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import bindparam, case, func
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.models.favorite_zone import FavoriteZone
+
+# (favorite_id, user_id) -> (uses not yet written, latest use)
+UsageKey = Tuple[int, int]
+PendingUsage = Tuple[int, datetime]
+
+_table = FavoriteZone.__table__
+# One atomic increment per favorite; the user_id guard keeps a stale buffer from touching another user's row
+_apply_usage = (
+    _table.update()
+    .where(_table.c.id == bindparam("b_id"), _table.c.user_id == bindparam("b_user_id"))
+    .values(
+        times_used=func.coalesce(_table.c.times_used, 0) + bindparam("b_uses"),
+        last_used=case(
+            (_table.c.last_used.is_(None), bindparam("b_last_used")),
+            (_table.c.last_used < bindparam("b_last_used"), bindparam("b_last_used")),
+            else_=_table.c.last_used,
+        ),
+    )
+)
+
+
+class FavoriteUsageBuffer:
+    """Aggregates favorite-zone usage in memory and writes it in batches.
+
+    Each flush issues a single executemany of ``times_used = times_used + n``
+    updates, so a burst of taps on a favorite costs one write instead of a
+    read-modify-write per tap, and concurrent taps are never lost.
+    """
+
+    def __init__(self, session_factory, interval_seconds: float):
+        self.session_factory = session_factory
+        self.interval_seconds = interval_seconds
+        self._pending: Dict[UsageKey, PendingUsage] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def record(self, favorite_id: int, user_id: int, used_at: Optional[datetime] = None) -> int:
+        """Buffer one use; returns the uses still pending for this favorite"""
+        used_at = used_at or datetime.utcnow()
+        key = (favorite_id, user_id)
+        with self._lock:
+            uses, last_used = self._pending.get(key, (0, used_at))
+            self._pending[key] = (uses + 1, max(last_used, used_at))
+            return uses + 1
+
+    def pending(self, favorite_id: int, user_id: int) -> Optional[PendingUsage]:
+        with self._lock:
+            return self._pending.get((favorite_id, user_id))
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = self._pending, {}
+        if not batch:
+            return 0
+        params = [
+            {"b_id": favorite_id, "b_user_id": user_id, "b_uses": uses, "b_last_used": last_used}
+            for (favorite_id, user_id), (uses, last_used) in batch.items()
+        ]
+        db = self.session_factory()
+        try:
+            db.execute(_apply_usage, params)
+            db.commit()
+        except Exception as exc:
+            db.rollback()
+            logger.warning("Favorite usage flush failed; keeping %s favorites pending: %s", len(batch), exc)
+            self._requeue(batch)
+            return 0
+        finally:
+            db.close()
+        return len(batch)
+
+    def _requeue(self, batch: Dict[UsageKey, PendingUsage]) -> None:
+        with self._lock:
+            for key, (uses, last_used) in batch.items():
+                newer_uses, newer_last_used = self._pending.get(key, (0, last_used))
+                self._pending[key] = (uses + newer_uses, max(last_used, newer_last_used))
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval_seconds):
+            self.flush()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="favorite-usage", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.interval_seconds)
+            self._thread = None
+        self.flush()
+
+
+favorite_usage = FavoriteUsageBuffer(SessionLocal, settings.FAVORITE_USAGE_FLUSH_SECONDS)
+
+
+def start_favorite_usage_flush() -> None:
+    favorite_usage.start()
+    logger.info("Favorite usage flush started (every %ss)", favorite_usage.interval_seconds)
+
+
+def stop_favorite_usage_flush() -> None:
+    """Stop the background flusher after writing whatever is still buffered"""
+    favorite_usage.stop()
@@ -0,0 +1,204 @@
+import codecs
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.logging import logger
+from app.models.parking_history import ParkingHistory
+from app.schemas.parking_history import ParkingHistoryImport
+
+TRANSFER_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_COLUMNS = [
+    "id",
+    "zone_code",
+    "zone_description",
+    "latitude",
+    "longitude",
+    "start_time",
+    "end_time",
+    "duration_minutes",
+    "amount_paid",
+    "payment_method",
+    "status",
+    "notes",
+]
+MAX_REPORTED_ERRORS = 100
+
+
+class ImportAborted(ValueError):
+    pass
+
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines (with their newline) without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        lines = pending.splitlines(keepends=True)
+        pending = lines.pop() if lines and not lines[-1].endswith(("\n", "\r")) else ""
+        for line in lines:
+            yield line
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending
+
+
+async def _iter_records(chunks: AsyncIterator[bytes], fmt: str) -> AsyncIterator[Tuple[int, Any]]:
+    """Yield (line number, raw record) pairs; a record that cannot be parsed is yielded as an exception"""
+    header: Optional[List[str]] = None
+    record, first_line = "", 0
+    line_no = 0
+    async for line in _iter_lines(chunks):
+        line_no += 1
+        if fmt == "ndjson":
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as exc:
+                yield line_no, exc
+            continue
+
+        # A quoted CSV field may contain newlines; wait until the quotes balance
+        if not record:
+            first_line = line_no
+        record += line
+        if record.count('"') % 2:
+            continue
+        text, record = record, ""
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as exc:
+            yield first_line, exc
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            if "zone_code" not in header or "start_time" not in header:
+                raise ImportAborted("CSV header must include zone_code and start_time")
+            continue
+        if len(values) != len(header):
+            yield first_line, ValueError(f"expected {len(header)} fields, got {len(values)}")
+            continue
+        yield first_line, dict(zip(header, values))
+    if record:
+        yield first_line, ValueError("unterminated quoted field")
+
+
+def _row(user_id: int, raw: Any, now: datetime) -> Dict[str, Any]:
+    if not isinstance(raw, dict):
+        raise ValueError("record must be an object")
+    # CSV has no nulls; treat empty cells as missing
+    data = {key: value for key, value in raw.items() if value != "" and key in ParkingHistoryImport.model_fields}
+    row = ParkingHistoryImport.model_validate(data).model_dump()
+    row.update(user_id=user_id, created_at=now, updated_at=now)
+    return row
+
+
+def _error_message(exc: Exception) -> str:
+    if isinstance(exc, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in err['loc']) or 'row'}: {err['msg']}" for err in exc.errors()
+        )
+    return str(exc)
+
+
+async def import_parking_history(
+    db: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterator[bytes],
+    fmt: str,
+    batch_size: int = 1000,
+    max_rows: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Validate and insert streamed CSV/NDJSON rows for ``user_id``.
+
+    Valid rows are inserted with one executemany per ``batch_size`` rows and
+    each batch is committed on its own, so memory stays flat however large
+    the upload is. Invalid rows are skipped and reported by line number.
+    """
+    statement = insert(ParkingHistory.__table__)
+    now = datetime.utcnow()
+    batch: List[Dict[str, Any]] = []
+    imported = rejected = 0
+    errors: List[Dict[str, Any]] = []
+
+    async def write_batch() -> None:
+        nonlocal imported
+        await db.execute(statement, batch)
+        await db.commit()
+        imported += len(batch)
+        batch.clear()
+
+    async for line, raw in _iter_records(chunks, fmt):
+        try:
+            if isinstance(raw, Exception):
+                raise raw
+            row = _row(user_id, raw, now)
+        except (ValueError, ValidationError) as exc:
+            rejected += 1
+            if len(errors) < MAX_REPORTED_ERRORS:
+                errors.append({"line": line, "error": _error_message(exc)})
+            continue
+        if max_rows is not None and imported + len(batch) >= max_rows:
+            raise ImportAborted(f"Import is limited to {max_rows} rows; {imported} were imported")
+        batch.append(row)
+        if len(batch) >= batch_size:
+            await write_batch()
+    if batch:
+        await write_batch()
+
+    logger.info("Imported %s parking sessions for user %s (%s rejected)", imported, user_id, rejected)
+    return {"imported": imported, "rejected": rejected, "errors": errors}
+
+
+def _serialize(value: Any) -> Any:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+async def stream_parking_history(
+    session_factory: Callable[[], AsyncSession],
+    user_id: int,
+    fmt: str,
+    chunk_size: int = 1000,
+) -> AsyncIterator[str]:
+    """Stream a user's sessions oldest first as NDJSON or CSV from a server-side cursor"""
+    query = (
+        select(*(getattr(ParkingHistory, name) for name in EXPORT_COLUMNS))
+        .where(ParkingHistory.user_id == user_id)
+        .order_by(ParkingHistory.start_time, ParkingHistory.id)
+        .execution_options(yield_per=chunk_size)
+    )
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS) if fmt == "csv" else None
+    if writer:
+        writer.writeheader()
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+    exported = 0
+    # The request's session is closed before the body streams, so use our own
+    async with session_factory() as db:
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            for values in partition:
+                row = {name: _serialize(value) for name, value in zip(EXPORT_COLUMNS, values)}
+                if writer:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(row))
+                    buffer.write("\n")
+            exported += len(partition)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    logger.info("Exported %s parking sessions for user %s as %s", exported, user_id, fmt)
@@ -0,0 +1,94 @@
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.database import upsert_insert
+from app.core.logging import logger
+from app.models.payment import Payment, PaymentMonthlyTotal
+
+MONTH_FORMAT = "%Y-%m"
+STATS_MONTHS = 12
+
+
+async def record_completed_payment(db: AsyncSession, payment: Payment) -> None:
+    """Add ``payment`` to its month's total; the caller commits with the status change"""
+    stmt = upsert_insert(db, PaymentMonthlyTotal)
+    await db.execute(
+        stmt.values(
+            user_id=payment.user_id,
+            month=payment.created_at.strftime(MONTH_FORMAT),
+            total_amount=payment.amount,
+            transaction_count=1,
+        ).on_conflict_do_update(
+            index_elements=["user_id", "month"],
+            set_={
+                "total_amount": PaymentMonthlyTotal.total_amount + stmt.excluded.total_amount,
+                "transaction_count": PaymentMonthlyTotal.transaction_count + 1,
+            },
+        )
+    )
+
+
+def _month_of(db: Session, column):
+    if db.get_bind().dialect.name == "postgresql":
+        return func.to_char(column, "YYYY-MM")
+    return func.strftime(MONTH_FORMAT, column)
+
+
+def backfill_monthly_totals(db: Session, user_id: Optional[int] = None) -> int:
+    """Rebuild monthly totals from completed payments with one GROUP BY; returns rows written"""
+    month = _month_of(db, Payment.created_at)
+    query = select(
+        Payment.user_id,
+        month.label("month"),
+        func.sum(Payment.amount),
+        func.count(Payment.id),
+    ).where(Payment.status == "completed")
+    clear = delete(PaymentMonthlyTotal)
+    if user_id is not None:
+        query = query.where(Payment.user_id == user_id)
+        clear = clear.where(PaymentMonthlyTotal.user_id == user_id)
+    query = query.group_by(Payment.user_id, month)
+
+    db.execute(clear)
+    result = db.execute(
+        insert(PaymentMonthlyTotal).from_select(
+            ["user_id", "month", "total_amount", "transaction_count"], query
+        )
+    )
+    db.commit()
+    return result.rowcount
+
+
+def ensure_monthly_totals(db: Session) -> None:
+    """Backfill once when completed payments exist but the rollup table is still empty"""
+    if db.execute(select(PaymentMonthlyTotal.user_id).limit(1)).first() is not None:
+        return
+    if db.execute(select(Payment.id).where(Payment.status == "completed").limit(1)).first() is None:
+        return
+    rows = backfill_monthly_totals(db)
+    logger.info("Backfilled %s monthly payment totals", rows)
+
+
+async def get_spending_stats(db: AsyncSession, user_id: int) -> Dict[str, Any]:
+    totals = (await db.execute(
+        select(
+            func.coalesce(func.sum(PaymentMonthlyTotal.total_amount), 0.0),
+            func.coalesce(func.sum(PaymentMonthlyTotal.transaction_count), 0),
+        ).where(PaymentMonthlyTotal.user_id == user_id)
+    )).one()
+    recent = (await db.execute(
+        select(PaymentMonthlyTotal.month, PaymentMonthlyTotal.total_amount)
+        .where(PaymentMonthlyTotal.user_id == user_id)
+        .order_by(PaymentMonthlyTotal.month.desc())
+        .limit(STATS_MONTHS)
+    )).all()
+    monthly: List[Dict[str, Any]] = [{"month": row.month, "amount": row.total_amount} for row in recent]
+    return {
+        "total_paid": float(totals[0]),
+        "total_transactions": int(totals[1]),
+        "monthly_spending": monthly,
+    }
+
@@ -1,6 +1,6 @@
 import random
 import time
-from concurrent.futures import Future
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from dataclasses import dataclass
 from datetime import datetime
 from threading import Lock
@@ -9,15 +9,18 @@ from typing import Any, Dict, Optional
 import requests
 
 from app.core.config import settings
+from app.core.deadlines import current_deadline
 from app.core.logging import logger
 from app.core.shared import cache
 from app.services.zone_snapshots import make_bounds_key
 from app.services.upstream_proxy import (
     ProxyCircuitOpen,
     ProxyConfigurationError,
+    RetryBudget,
     call_upstream,
     record_proxy_failure,
     record_proxy_success,
+    release_proxy_call,
 )
 
 # Things we should NOT retry (hard block / auth / forbidden)
@@ -26,6 +29,10 @@ NON_RETRY_STATUSES = {401, 403}
 # Things we MAY retry (transient)
 RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
 
+# An attempt with less time than this left before the deadline is not started
+MIN_ATTEMPT_SECONDS = 0.25
+RETRY_BUDGET_WINDOW_SECONDS = 10
+
 
 class UpstreamBlocked(Exception):
     def __init__(self, status: int, content_type: str, preview: str):
@@ -42,6 +49,18 @@ class UpstreamFailed(Exception):
         self.reason = reason
 
 
+class UpstreamDeadlineExceeded(UpstreamFailed):
+    def __init__(self, reason: str):
+        super().__init__(status=None, reason=reason)
+
+
+retry_budget = RetryBudget(
+    settings.UPSTREAM_RETRY_BUDGET_RATIO,
+    settings.UPSTREAM_RETRY_BUDGET_MIN_PER_SECOND,
+    RETRY_BUDGET_WINDOW_SECONDS,
+)
+
+
 @dataclass
 class ZoneFetchResult:
     data: Dict[str, Any]
@@ -74,18 +93,31 @@ def _backoff_seconds(attempt: int) -> float:
     return base + jitter
 
 
-def fetch_zones_from_upstream(payload: Dict[str, Any], max_attempts: int = 3) -> Dict[str, Any]:
+def fetch_zones_from_upstream(
+    payload: Dict[str, Any], max_attempts: int = 3, deadline: Optional[float] = None
+) -> Dict[str, Any]:
+    """Call the upstream, retrying transient failures until ``deadline`` (monotonic; defaults to the request's)"""
     last_err: Optional[Exception] = None
-    cmd = payload.get("cmd")
+    cmd = payload.get("cmd") or ""
     # Include cmd in params so Lambda receives it in queryStringParameters
     params = payload.copy()
+    deadline = deadline or current_deadline()
 
     for attempt in range(1, max_attempts + 1):
+        remaining = deadline - time.monotonic()
+        if remaining < MIN_ATTEMPT_SECONDS:
+            last_err = UpstreamDeadlineExceeded(
+                f"request deadline reached before attempt {attempt} (last error: {last_err})"
+            )
+            break
+        if attempt == 1:
+            retry_budget.record_attempt()
+        attempt_timeout = min(settings.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS, remaining)
         try:
             response = call_upstream(
-                cmd=cmd or "",
+                cmd=cmd,
                 params=params,
-                timeout=settings.EXTERNAL_API_TIMEOUT,
+                timeout=attempt_timeout,
             )
 
             status = response.status_code
@@ -95,23 +127,24 @@ def fetch_zones_from_upstream(payload: Dict[str, Any], max_attempts: int = 3) ->
             )
 
             if status in NON_RETRY_STATUSES:
-                record_proxy_failure(f"non-retry-status-{status}")
+                record_proxy_failure(cmd, params, f"non-retry-status-{status}")
                 raise UpstreamBlocked(status=status, content_type=content_type, preview=_preview_text(response))
 
             if not _is_json_response(response):
-                record_proxy_failure("non-json-response")
+                record_proxy_failure(cmd, params, "non-json-response")
                 raise UpstreamBlocked(status=status, content_type=content_type, preview=_preview_text(response))
 
             if status in RETRY_STATUSES:
-                record_proxy_failure(f"retryable-status-{status}")
+                record_proxy_failure(cmd, params, f"retryable-status-{status}")
                 last_err = UpstreamFailed(status=status, reason=f"retryable status {status}")
             else:
                 try:
                     parsed = response.json()
-                    record_proxy_success()
+                    if not response.from_cache:
+                        record_proxy_success(cmd, params, response.elapsed)
                     return parsed
                 except ValueError:
-                    record_proxy_failure("json-parse-failed")
+                    record_proxy_failure(cmd, params, "json-parse-failed")
                     preview = _preview_text(response)
                     logger.warning(
                         "Upstream returned invalid JSON (status=%s): %s", status, preview[:120]
@@ -127,7 +160,7 @@ def fetch_zones_from_upstream(payload: Dict[str, Any], max_attempts: int = 3) ->
             raise
 
         except UpstreamBlocked as e:
-            record_proxy_failure("upstream-blocked")
+            # Already recorded against the breaker where it was raised
             logger.warning(
                 "Upstream blocked (status=%s, content_type=%s): %s",
                 e.status,
@@ -136,24 +169,42 @@ def fetch_zones_from_upstream(payload: Dict[str, Any], max_attempts: int = 3) ->
             )
             raise
 
-        except (requests.Timeout, requests.ConnectionError) as e:
-            record_proxy_failure("timeout-or-connection")
+        except requests.Timeout as e:
+            if attempt_timeout >= settings.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS:
+                record_proxy_failure(cmd, params, "timeout")
+            else:
+                # Cut short by a tight request deadline; says nothing about the upstream's health
+                release_proxy_call(cmd, params)
+            last_err = e
+
+        except requests.ConnectionError as e:
+            record_proxy_failure(cmd, params, "connection-error")
             last_err = e
 
         except requests.HTTPError as e:
             status_code = e.response.status_code if e.response else None
-            record_proxy_failure(f"http-error-{status_code}")
+            record_proxy_failure(cmd, params, f"http-error-{status_code}")
             last_err = UpstreamFailed(status=status_code, reason=str(e))
 
         except Exception as e:
+            record_proxy_failure(cmd, params, f"unexpected-{type(e).__name__}")
             last_err = UpstreamFailed(status=getattr(e, "status", None), reason=str(e))
 
-        if attempt < max_attempts:
-            backoff = _backoff_seconds(attempt)
-            logger.warning("Upstream proxy attempt %s failed; retrying in %.2fs", attempt, backoff)
-            time.sleep(backoff)
-        else:
+        if attempt >= max_attempts:
             logger.error("Upstream proxy attempt %s failed; no more retries", attempt)
+            break
+        backoff = _backoff_seconds(attempt)
+        if time.monotonic() + backoff + MIN_ATTEMPT_SECONDS > deadline:
+            logger.warning("Upstream proxy attempt %s failed; no time left before the request deadline", attempt)
+            last_err = UpstreamDeadlineExceeded(
+                f"request deadline reached after {attempt} attempts (last error: {last_err})"
+            )
+            break
+        if not retry_budget.try_retry():
+            logger.warning("Upstream proxy attempt %s failed; retry budget exhausted", attempt)
+            break
+        logger.warning("Upstream proxy attempt %s failed; retrying in %.2fs", attempt, backoff)
+        time.sleep(backoff)
 
     if isinstance(last_err, Exception):
         raise last_err
@@ -191,15 +242,19 @@ def search_zones(left_long: float, right_long: float, top_lat: float, bottom_lat
             future = Future()
             _inflight_requests[cache_key] = future
 
+    deadline = current_deadline()
     if join_future:
         logger.info("Singleflight join for bounds: %s", cache_key)
-        return join_future.result()
+        try:
+            return join_future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            raise UpstreamDeadlineExceeded("request deadline reached waiting for an in-flight fetch")
 
     assert future is not None
 
     try:
         logger.info("Requesting zones via upstream proxy (cmd=%s)", payload["cmd"])
-        data = fetch_zones_from_upstream(payload)
+        data = fetch_zones_from_upstream(payload, deadline=deadline)
         result = ZoneFetchResult(data=data, fetched_at=datetime.utcnow(), from_cache=False)
 
         cache.set(cache_key, result, ttl_seconds=settings.CACHE_TTL_SECONDS)
@@ -0,0 +1,163 @@
+import hashlib
+import heapq
+import math
+import struct
+import sys
+from array import array
+from typing import Dict, Iterable, List, Tuple
+
+_HASH_BITS = 64
+
+
+def _hash64(value: str) -> int:
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+class HyperLogLog:
+    """Distinct-count estimator using 2**precision one-byte registers.
+
+    The default precision (14) costs 16 KiB and has a standard error of ~0.8%.
+    """
+
+    def __init__(self, precision: int = 14):
+        if not 4 <= precision <= 18:
+            raise ValueError("precision must be between 4 and 18")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.registers = bytearray(self.num_registers)
+
+    def add(self, value: str) -> None:
+        hashed = _hash64(value)
+        index = hashed >> (_HASH_BITS - self.precision)
+        remaining = hashed & ((1 << (_HASH_BITS - self.precision)) - 1)
+        rank = (_HASH_BITS - self.precision) - remaining.bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small-range correction (linear counting)
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+    def merge(self, other: "HyperLogLog") -> None:
+        if other.precision != self.precision:
+            raise ValueError("cannot merge HyperLogLog sketches with different precision")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.precision]) + bytes(self.registers)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "HyperLogLog":
+        sketch = cls(precision=data[0])
+        sketch.registers = bytearray(data[1:])
+        return sketch
+
+
+class CountMinSketch:
+    """Frequency estimator with a fixed depth x width table of counters.
+
+    Estimates never undercount; with the defaults the overcount is at most
+    ~0.1% of the total with ~98% confidence.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.tables: List[List[int]] = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, item: str) -> List[int]:
+        hashed = _hash64(item)
+        h1, h2 = hashed & 0xFFFFFFFF, hashed >> 32
+        return [(h1 + row * h2) % self.width for row in range(self.depth)]
+
+    def add(self, item: str, count: int = 1) -> int:
+        """Add ``count`` occurrences of ``item`` and return its new estimate"""
+        estimate = None
+        for row, index in enumerate(self._indexes(item)):
+            self.tables[row][index] += count
+            value = self.tables[row][index]
+            estimate = value if estimate is None else min(estimate, value)
+        return estimate or 0
+
+    def estimate(self, item: str) -> int:
+        return min(self.tables[row][index] for row, index in enumerate(self._indexes(item)))
+
+    def merge(self, other: "CountMinSketch") -> None:
+        """Add ``other``'s counts (e.g. another worker's) to this sketch"""
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("cannot merge Count-Min sketches with different dimensions")
+        for row, other_row in zip(self.tables, other.tables):
+            for index, count in enumerate(other_row):
+                row[index] += count
+
+    def to_bytes(self) -> bytes:
+        counters = array("Q", (count for row in self.tables for count in row))
+        if sys.byteorder == "little":
+            counters.byteswap()
+        return struct.pack(">II", self.width, self.depth) + counters.tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "CountMinSketch":
+        width, depth = struct.unpack_from(">II", data)
+        counters = array("Q")
+        counters.frombytes(data[8:])
+        if sys.byteorder == "little":
+            counters.byteswap()
+        if len(counters) != width * depth:
+            raise ValueError("Count-Min sketch data does not match its dimensions")
+        sketch = cls(width=width, depth=depth)
+        sketch.tables = [counters[row * width:(row + 1) * width].tolist() for row in range(depth)]
+        return sketch
+
+
+class TopK:
+    """Bounded set of the ``k`` heaviest items, fed with Count-Min estimates.
+
+    A min-heap keeps the lightest tracked item on top. Estimates only grow,
+    so a raised item just gets a new heap entry and the outdated one is
+    dropped when it reaches the top; the heap is rebuilt once it holds more
+    than ``2 * k`` entries.
+    """
+
+    def __init__(self, k: int = 100):
+        if k < 1:
+            raise ValueError("k must be at least 1")
+        self.k = k
+        self._counts: Dict[str, int] = {}
+        self._heap: List[Tuple[int, str]] = []
+
+    def _push(self, item: str, estimate: int) -> None:
+        self._counts[item] = estimate
+        heapq.heappush(self._heap, (estimate, item))
+        if len(self._heap) > 2 * self.k:
+            self._heap = [(count, key) for key, count in self._counts.items()]
+            heapq.heapify(self._heap)
+
+    def offer(self, item: str, estimate: int) -> None:
+        if item in self._counts or len(self._counts) < self.k:
+            self._push(item, estimate)
+            return
+        heap = self._heap
+        while heap[0][0] != self._counts.get(heap[0][1]):
+            heapq.heappop(heap)
+        if estimate > heap[0][0]:
+            _, smallest = heapq.heappop(heap)
+            del self._counts[smallest]
+            self._push(item, estimate)
+
+    def top(self, limit: int) -> List[Tuple[str, int]]:
+        return heapq.nlargest(limit, self._counts.items(), key=lambda x: x[1])
+
+    @classmethod
+    def from_sketch(cls, sketch: CountMinSketch, items: Iterable[str], k: int = 100) -> "TopK":
+        """Rebuild the top ``k`` of ``items`` from (e.g. merged) Count-Min counts"""
+        top = cls(k)
+        for item in items:
+            top.offer(item, sketch.estimate(item))
+        return top
@@ -0,0 +1,133 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+import stripe
+from fastapi import HTTPException
+
+from app.core.config import settings
+from app.core.logging import logger
+
+
+class StripeCallStats:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def observe(self, seconds: float, ok: bool) -> None:
+        self.calls += 1
+        if not ok:
+            self.errors += 1
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "avg_ms": round(self.total_seconds / (self.calls or 1) * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+        }
+
+
+class StripeClient:
+    """Runs blocking Stripe SDK calls on a small dedicated thread pool.
+
+    The pool size caps concurrent calls to Stripe; callers beyond
+    ``max_pending`` waiting for a thread get 503 rather than queueing
+    behind a slow provider. Every request carries an idempotency key so SDK
+    and client retries resolve to the same object.
+    """
+
+    def __init__(self, max_concurrency: int, max_pending: int):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="stripe")
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiting = 0
+        self._rejected = 0
+        self._operations: Dict[str, StripeCallStats] = {}
+
+    async def call(self, operation: str, fn: Callable, **params: Any) -> Any:
+        if self._waiting + self._in_flight >= self.max_concurrency + self.max_pending:
+            self._rejected += 1
+            raise HTTPException(
+                status_code=503,
+                detail="Payment provider is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+
+        stats = self._operations.setdefault(operation, StripeCallStats())
+        with self._lock:
+            self._waiting += 1
+        state = {"started": False, "abandoned": False}
+
+        def run():
+            with self._lock:
+                if state["abandoned"]:
+                    return None
+                self._waiting -= 1
+                self._in_flight += 1
+                state["started"] = True
+            begin = time.perf_counter()
+            ok = False
+            try:
+                result = fn(**params)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    stats.observe(time.perf_counter() - begin, ok)
+
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        finally:
+            with self._lock:
+                if not state["started"]:
+                    # Caller went away before a thread picked the call up; skip it
+                    state["abandoned"] = True
+                    self._waiting -= 1
+
+    async def create_payment_intent(self, idempotency_key: str, **params: Any) -> stripe.PaymentIntent:
+        return await self.call(
+            "payment_intent.create", stripe.PaymentIntent.create, idempotency_key=idempotency_key, **params
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_pending": self.max_pending,
+            "in_flight": self._in_flight,
+            "queue_depth": self._waiting,
+            "rejected": self._rejected,
+            "operations": {name: stats.as_dict() for name, stats in self._operations.items()},
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def configure_stripe() -> None:
+    """Apply key, timeout, retry and endpoint settings to the Stripe SDK"""
+    # Disable Stripe functionality if no keys provided
+    stripe.api_key = settings.STRIPE_SECRET_KEY or None
+    stripe.max_network_retries = settings.STRIPE_MAX_NETWORK_RETRIES
+    stripe.default_http_client = stripe.http_client.new_default_http_client(timeout=settings.STRIPE_TIMEOUT_SECONDS)
+    if settings.STRIPE_API_BASE:
+        # e.g. a local stripe-mock or stub server
+        stripe.api_base = settings.STRIPE_API_BASE
+        logger.info("Using Stripe API base %s", settings.STRIPE_API_BASE)
+
+
+configure_stripe()
+stripe_client = StripeClient(settings.STRIPE_MAX_CONCURRENCY, settings.STRIPE_MAX_PENDING)
+
+
+def shutdown_stripe_client() -> None:
+    stripe_client.shutdown()
@@ -0,0 +1,231 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Mapping, Optional
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal, upsert_insert
+from app.core.logging import logger
+from app.models.parking_history import ParkingHistory
+from app.models.payment import Payment, StripeWebhookEvent
+from app.services.payment_rollups import record_completed_payment
+
+HANDLED_EVENT_TYPES = ("payment_intent.succeeded", "payment_intent.payment_failed")
+PURGE_INTERVAL = timedelta(hours=1)
+
+
+async def record_event(db: AsyncSession, event: Mapping[str, Any]) -> bool:
+    """Store a verified (or locally faked) Stripe event for the worker.
+
+    Returns False when the event id was already recorded, i.e. for Stripe
+    redeliveries, which are acknowledged without doing any work.
+    """
+    intent = event["data"]["object"]
+    stmt = upsert_insert(db, StripeWebhookEvent).values(
+        id=event["id"],
+        type=event["type"],
+        payment_intent_id=intent.get("id"),
+        payload=json.dumps(intent),
+        status="pending",
+        attempts=0,
+        stripe_created=event.get("created"),
+        received_at=datetime.utcnow(),
+    ).on_conflict_do_nothing(index_elements=["id"])
+    result = await db.execute(stmt)
+    await db.commit()
+    return result.rowcount == 1
+
+
+def _charge_id(intent: Dict[str, Any]) -> Optional[str]:
+    if intent.get("latest_charge"):
+        return intent["latest_charge"]
+    charges = (intent.get("charges") or {}).get("data") or []
+    return charges[0]["id"] if charges else None
+
+
+async def _apply_success(db: AsyncSession, payment: Payment, intent: Dict[str, Any]) -> None:
+    # The event row is claimed exactly once, but a succeeded event may follow an
+    # earlier one for the same intent; only the first transition is counted
+    if payment.status != "completed":
+        await record_completed_payment(db, payment)
+    payment.status = "completed"
+    payment.stripe_charge_id = _charge_id(intent)
+
+    # Link to parking session if provided
+    if payment.parking_history_id:
+        parking_session = await db.get(ParkingHistory, payment.parking_history_id)
+        if parking_session:
+            parking_session.amount_paid = payment.amount
+            parking_session.payment_method = "card"
+            parking_session.payment_id = payment.id
+
+
+async def _claim(db: AsyncSession, event: StripeWebhookEvent) -> bool:
+    """Mark ``event`` processed in the caller's transaction; False if another worker got it first"""
+    result = await db.execute(
+        update(StripeWebhookEvent)
+        .where(StripeWebhookEvent.id == event.id, StripeWebhookEvent.status == "pending")
+        .values(status="processed", processed_at=datetime.utcnow(), attempts=StripeWebhookEvent.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+async def _apply(db: AsyncSession, events: List[StripeWebhookEvent]) -> int:
+    """Apply ``events`` in one transaction (not committed here); returns how many were claimed"""
+    intent_ids = {event.payment_intent_id for event in events if event.payment_intent_id}
+    payments = {}
+    if intent_ids:
+        # One lookup per batch on uq_payments_stripe_payment_intent_id
+        rows = (await db.execute(
+            select(Payment).where(Payment.stripe_payment_intent_id.in_(intent_ids))
+        )).scalars().all()
+        payments = {payment.stripe_payment_intent_id: payment for payment in rows}
+
+    applied = 0
+    for event in events:
+        if not await _claim(db, event):
+            continue
+        applied += 1
+        payment = payments.get(event.payment_intent_id)
+        if payment is None:
+            continue
+        if event.type == "payment_intent.succeeded":
+            await _apply_success(db, payment, json.loads(event.payload))
+        elif event.type == "payment_intent.payment_failed":
+            payment.status = "failed"
+    return applied
+
+
+class StripeWebhookWorker:
+    """Applies recorded webhook events in batches off the request path.
+
+    Each event is claimed with a conditional ``status = 'pending'`` update in
+    the same transaction as its payment changes, so an event is applied once
+    even with several API workers. A batch commits as a whole; if it fails the
+    events are retried one by one so a single bad event cannot hold the rest
+    back, and it is marked failed after ``max_attempts``.
+    """
+
+    def __init__(self, session_factory, batch_size: int, poll_seconds: float, max_attempts: int):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self.max_attempts = max_attempts
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._last_purge = datetime.min
+
+    def notify(self) -> None:
+        """Wake the worker now instead of at the next poll"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _pending(self, db: AsyncSession) -> List[StripeWebhookEvent]:
+        return list((await db.execute(
+            select(StripeWebhookEvent)
+            .where(StripeWebhookEvent.status == "pending")
+            .order_by(StripeWebhookEvent.stripe_created, StripeWebhookEvent.received_at)
+            .limit(self.batch_size)
+        )).scalars().all())
+
+    async def _apply_one(self, event_id: str) -> None:
+        async with self.session_factory() as db:
+            event = await db.get(StripeWebhookEvent, event_id)
+            if event is None or event.status != "pending":
+                return
+            try:
+                await _apply(db, [event])
+                await db.commit()
+            except Exception as exc:
+                await db.rollback()
+                event = await db.get(StripeWebhookEvent, event_id)
+                event.attempts += 1
+                event.last_error = str(exc)
+                if event.attempts >= self.max_attempts:
+                    event.status = "failed"
+                    logger.error("Stripe webhook event %s failed after %s attempts: %s", event_id, event.attempts, exc)
+                await db.commit()
+
+    async def process_pending(self) -> int:
+        """Apply one batch of pending events; returns how many were applied"""
+        async with self.session_factory() as db:
+            events = await self._pending(db)
+            if not events:
+                return 0
+            event_ids = [event.id for event in events]
+            try:
+                applied = await _apply(db, events)
+                await db.commit()
+                return applied
+            except Exception as exc:
+                await db.rollback()
+                logger.warning("Stripe webhook batch of %s failed, retrying individually: %s", len(event_ids), exc)
+        for event_id in event_ids:
+            await self._apply_one(event_id)
+        return len(event_ids)
+
+    async def purge_processed(self) -> None:
+        cutoff = datetime.utcnow() - timedelta(days=settings.STRIPE_WEBHOOK_RETENTION_DAYS)
+        async with self.session_factory() as db:
+            await db.execute(
+                delete(StripeWebhookEvent).where(
+                    StripeWebhookEvent.status == "processed", StripeWebhookEvent.received_at < cutoff
+                )
+            )
+            await db.commit()
+        self._last_purge = datetime.utcnow()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                # Drain a backlog (e.g. after a Stripe outage) batch after batch
+                while await self.process_pending() >= self.batch_size and not self._stopping:
+                    pass
+                if datetime.utcnow() - self._last_purge > PURGE_INTERVAL:
+                    await self.purge_processed()
+            except Exception as exc:
+                logger.warning("Stripe webhook worker error: %s", exc)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run(), name="stripe-webhooks")
+
+    async def stop(self) -> None:
+        self._stopping = True
+        if self._task is None:
+            return
+        self.notify()
+        try:
+            await asyncio.wait_for(self._task, timeout=self.poll_seconds)
+        except asyncio.TimeoutError:
+            self._task.cancel()
+        self._task = None
+
+
+stripe_webhook_worker = StripeWebhookWorker(
+    AsyncSessionLocal,
+    batch_size=settings.STRIPE_WEBHOOK_BATCH_SIZE,
+    poll_seconds=settings.STRIPE_WEBHOOK_POLL_SECONDS,
+    max_attempts=settings.STRIPE_WEBHOOK_MAX_ATTEMPTS,
+)
+
+
+def start_stripe_webhook_worker() -> None:
+    stripe_webhook_worker.start()
+    logger.info("Stripe webhook worker started (batch=%s)", stripe_webhook_worker.batch_size)
+
+
+async def stop_stripe_webhook_worker() -> None:
+    """Stop the worker; events still pending are picked up after the next start"""
+    await stripe_webhook_worker.stop()
@@ -2,22 +2,27 @@ import json
 import threading
 import time
 from collections import deque
-from typing import Any, Dict, Optional
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Optional
 
 import requests
 
 from app.core.config import settings
+from app.core.deadlines import request_deadline
 from app.core.logging import logger
 
 MICRO_CACHE_TTL_SECONDS = 2
 _micro_cache: Dict[str, Dict[str, Any]] = {}
 
-CB_WINDOW_SECONDS = settings.PROXY_CIRCUIT_WINDOW_SECONDS
-CB_THRESHOLD = settings.PROXY_CIRCUIT_THRESHOLD
-CB_COOLDOWN_SECONDS = settings.PROXY_CIRCUIT_COOLDOWN_SECONDS
-_cb_failures: deque = deque()
-_cb_open_until: float = 0.0
-_cb_lock = threading.Lock()
+# Viewport span (degrees) -> bounds class; each class gets its own breaker
+BOUNDS_CLASSES = ((0.01, "street"), (0.1, "city"))
+CB_TRANSITION_HISTORY = 50
+# Latency samples kept per breaker key, and how many are needed before hedging
+HEDGE_LATENCY_SAMPLES = 200
+HEDGE_MIN_SAMPLES = 20
+HEDGE_BUDGET_WINDOW_SECONDS = 10
+# Don't hedge when less than this is left of the call's time budget
+HEDGE_MIN_TIMEOUT_SECONDS = 0.25
 
 
 class ProxyConfigurationError(Exception):
@@ -29,10 +34,14 @@ class ProxyCircuitOpen(Exception):
 
 
 class ProxyResponse:
-    def __init__(self, status_code: int, headers: Dict[str, Any], text: str):
+    def __init__(
+        self, status_code: int, headers: Dict[str, Any], text: str, elapsed: float = 0.0, from_cache: bool = False
+    ):
         self.status_code = status_code
         self.headers = headers
         self._text = text
+        self.elapsed = elapsed
+        self.from_cache = from_cache
 
     @property
     def text(self) -> str:
@@ -69,7 +78,8 @@ def _microcache_get(cmd: str, params: Dict[str, Any]) -> Optional[ProxyResponse]
         _micro_cache.pop(key, None)
         return None
     logger.info("Upstream proxy microcache hit: cmd=%s", cmd)
-    return entry["response"]
+    cached = entry["response"]
+    return ProxyResponse(cached.status_code, cached.headers, cached.text, from_cache=True)
 
 
 def _microcache_set(cmd: str, params: Dict[str, Any], response: ProxyResponse) -> None:
@@ -80,46 +90,408 @@ def _microcache_set(cmd: str, params: Dict[str, Any], response: ProxyResponse) -
     }
 
 
-def _prune_failures(now: float) -> None:
-    while _cb_failures and now - _cb_failures[0] > CB_WINDOW_SECONDS:
-        _cb_failures.popleft()
+class CircuitBreaker:
+    """Closed / open / half-open breaker for one upstream command and bounds class.
 
+    Closed: call outcomes are kept for ``window_seconds``; the breaker opens
+    once there are ``threshold`` failures making up at least ``failure_rate``
+    of the calls, so a busy key is not tripped by a handful of errors. Calls
+    slower than ``slow_call_seconds`` count as failures.
 
-def ensure_circuit_allows() -> None:
-    """Raise if the circuit is open (too many recent failures)."""
-    now = time.time()
-    with _cb_lock:
-        if now < _cb_open_until:
-            raise ProxyCircuitOpen("proxy circuit open")
-        _prune_failures(now)
+    Open: calls fail fast until the cooldown passes, then a single probe is
+    let through (half-open) while everyone else keeps failing fast. A
+    successful probe closes the breaker; a failed one reopens it with the
+    cooldown doubled, up to ``max_cooldown_seconds``.
+    """
 
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        key: str,
+        threshold: int,
+        window_seconds: float,
+        cooldown_seconds: float,
+        max_cooldown_seconds: float,
+        failure_rate: float,
+        slow_call_seconds: float,
+        probe_timeout_seconds: float,
+    ):
+        self.key = key
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.failure_rate = failure_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.probe_timeout_seconds = probe_timeout_seconds
+        self.state = self.CLOSED
+        self._calls: deque = deque()  # (timestamp, failed)
+        self._failures = 0
+        self._open_until = 0.0
+        self._current_cooldown = cooldown_seconds
+        self._probe_started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def _prune(self, now: float) -> None:
+        while self._calls and now - self._calls[0][0] > self.window_seconds:
+            _, failed = self._calls.popleft()
+            self._failures -= failed
+
+    def _transition(self, state: str, reason: str) -> None:
+        previous, self.state = self.state, state
+        _transitions.append({
+            "key": self.key,
+            "from": previous,
+            "to": state,
+            "reason": reason,
+            "at": time.time(),
+        })
+        log = logger.warning if state == self.OPEN else logger.info
+        log("Proxy circuit %s: %s -> %s (%s)", self.key, previous, state, reason)
+
+    def _open(self, now: float, reason: str) -> None:
+        self._open_until = now + self._current_cooldown
+        self._probe_started = None
+        self._transition(self.OPEN, f"{reason}; cooling down for {self._current_cooldown}s")
+
+    def allow(self) -> None:
+        """Raise ProxyCircuitOpen unless this call may go to the upstream"""
+        now = time.time()
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            if self.state == self.OPEN:
+                if now < self._open_until:
+                    raise ProxyCircuitOpen(f"proxy circuit open for {self.key}")
+                self._transition(self.HALF_OPEN, "cooldown elapsed")
+            elif self._probe_started is not None and now - self._probe_started < self.probe_timeout_seconds:
+                raise ProxyCircuitOpen(f"proxy circuit half-open for {self.key}; probe in flight")
+            # A probe that never reported back (e.g. its caller died) is replaced after the probe timeout
+            self._probe_started = now
+
+    def record(self, failed: bool, reason: str = "", elapsed: Optional[float] = None) -> None:
+        if not failed and elapsed is not None and elapsed >= self.slow_call_seconds:
+            failed, reason = True, f"slow call ({elapsed:.1f}s)"
+        now = time.time()
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                if failed:
+                    self._current_cooldown = min(self._current_cooldown * 2, self.max_cooldown_seconds)
+                    self._open(now, f"probe failed: {reason}")
+                else:
+                    self._calls.clear()
+                    self._failures = 0
+                    self._current_cooldown = self.cooldown_seconds
+                    self._probe_started = None
+                    self._transition(self.CLOSED, "probe succeeded")
+                return
+            if self.state == self.OPEN:
+                # Outcome of a call that started before the breaker opened
+                return
+            self._prune(now)
+            self._calls.append((now, failed))
+            self._failures += failed
+            if (
+                failed
+                and self._failures >= self.threshold
+                and self._failures >= self.failure_rate * len(self._calls)
+            ):
+                self._open(now, f"{self._failures}/{len(self._calls)} calls failed, last: {reason}")
 
-def record_proxy_failure(reason: str = "") -> None:
-    """Record a proxy failure and open the circuit if threshold exceeded."""
-    global _cb_open_until
-    now = time.time()
-    with _cb_lock:
-        _prune_failures(now)
-        _cb_failures.append(now)
-        if len(_cb_failures) >= CB_THRESHOLD:
-            _cb_open_until = now + CB_COOLDOWN_SECONDS
-            logger.warning(
-                "Proxy circuit opened after %s failures (reason: %s); cooling down for %ss",
-                len(_cb_failures),
-                reason,
-                CB_COOLDOWN_SECONDS,
+    @property
+    def degraded(self) -> bool:
+        """Not closed, or at least halfway to tripping"""
+        return self.state != self.CLOSED or self._failures * 2 >= self.threshold
+
+    def release(self) -> None:
+        """Forget a call without judging the upstream, e.g. one cut short by its request's deadline"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._probe_started = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            self._prune(now)
+            return {
+                "state": self.state,
+                "calls_in_window": len(self._calls),
+                "failures_in_window": self._failures,
+                "cooldown_seconds": self._current_cooldown,
+                "open_for_seconds": round(max(0.0, self._open_until - now), 1) if self.state == self.OPEN else 0.0,
+            }
+
+
+class RetryBudget:
+    """Process-wide cap on extra upstream requests (retries, hedges).
+
+    Over the last ``window_seconds``, extra requests may not exceed ``ratio``
+    times the first attempts plus ``min_per_second`` per second, so during an
+    outage they add at most ``ratio`` extra load instead of multiplying it.
+    """
+
+    def __init__(self, ratio: float, min_per_second: float, window_seconds: float):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.window_seconds = window_seconds
+        self._attempts: deque = deque()
+        self._retries: deque = deque()
+        self._lock = threading.Lock()
+        self.rejected = 0
+
+    def _prune(self, now: float) -> None:
+        for timestamps in (self._attempts, self._retries):
+            while timestamps and now - timestamps[0] > self.window_seconds:
+                timestamps.popleft()
+
+    def record_attempt(self) -> None:
+        with self._lock:
+            self._attempts.append(time.monotonic())
+
+    def try_retry(self) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            self._prune(now)
+            allowed = self.ratio * len(self._attempts) + self.min_per_second * self.window_seconds
+            if len(self._retries) >= allowed:
+                self.rejected += 1
+                return False
+            self._retries.append(now)
+            return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._prune(time.monotonic())
+            return {
+                "ratio": self.ratio,
+                "window_seconds": self.window_seconds,
+                "attempts_in_window": len(self._attempts),
+                "retries_in_window": len(self._retries),
+                "rejected": self.rejected,
+            }
+
+
+def _usable(response: Any) -> bool:
+    """A response the zone fetch would accept: no error status and a JSON body"""
+    content_type = (response.headers.get("content-type") or "").lower()
+    return response.status_code < 400 and ("application/json" in content_type or "text/json" in content_type)
+
+
+class RequestHedger:
+    """Sends a second identical upstream request when the first is slow.
+
+    Latencies are tracked per breaker key; once a key has enough samples, a
+    call still running after the key's ``percentile`` latency gets a hedge
+    and the first usable response wins (an error status or non-JSON body
+    from one leg waits for the other). Hedges are limited by
+    ``budget`` and by free threads, and only get what is left of the call's
+    timeout. The losing request is cancelled if it has not started; one
+    already running is left to finish (a blocking ``requests`` call cannot
+    be cancelled) and only feeds the latency samples.
+    """
+
+    def __init__(self, percentile: float, budget: RetryBudget, max_workers: int):
+        self.percentile = percentile
+        self.budget = budget
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upstream-hedge")
+        self._latencies: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _observe(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._latencies.get(key)
+            if samples is None:
+                samples = self._latencies[key] = deque(maxlen=HEDGE_LATENCY_SAMPLES)
+            samples.append(seconds)
+
+    def hedge_delay(self, key: str) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._latencies.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(len(samples) * self.percentile))]
+
+    def timed(self, key: str, send: Callable[[float], Any], timeout: float) -> Any:
+        """Run ``send(timeout)`` and record its latency (responses below 500 only; fast errors would skew it)"""
+        started = time.perf_counter()
+        result = send(timeout)
+        if result.status_code < 500:
+            self._observe(key, time.perf_counter() - started)
+        return result
+
+    def _submit(self, key: str, send: Callable[[float], Any], timeout: float) -> Future:
+        with self._lock:
+            self._in_flight += 1
+        future = self._executor.submit(self.timed, key, send, timeout)
+        future.add_done_callback(self._done)
+        return future
+
+    def _done(self, future: Future) -> None:
+        with self._lock:
+            self._in_flight -= 1
+
+    def call(self, key: str, send: Callable[[float], Any], timeout: float) -> Any:
+        """Run ``send(timeout)``, hedged once it outlives the key's hedge delay.
+
+        A hedged call returns within ``timeout`` (or the request's deadline,
+        if sooner): the hedge is sent with what is left of it.
+        """
+        self.budget.record_attempt()
+        started = time.monotonic()
+        ends_at = started + timeout
+        deadline = request_deadline.get()
+        if deadline is not None:
+            ends_at = min(ends_at, deadline)
+        delay = self.hedge_delay(key)
+        with self._lock:
+            # Room for the call and its hedge, or run it plainly on the caller's thread
+            has_room = self._in_flight + 2 <= self.max_workers
+        if delay is None or started + delay + HEDGE_MIN_TIMEOUT_SECONDS >= ends_at or not has_room:
+            return self.timed(key, send, timeout)
+
+        primary = self._submit(key, send, timeout)
+        if wait([primary], timeout=delay).done:
+            return primary.result()
+        hedge_timeout = ends_at - time.monotonic()
+        if hedge_timeout < HEDGE_MIN_TIMEOUT_SECONDS or not self.budget.try_retry():
+            return primary.result()
+
+        with self._lock:
+            self.hedged += 1
+        hedge = self._submit(key, send, hedge_timeout)
+        logger.info(
+            "Hedging upstream call for %s after %.0f ms (%.0f ms left)", key, delay * 1000, hedge_timeout * 1000
+        )
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        unusable: Any = None
+        try:
+            while pending:
+                done, pending = wait(
+                    pending, timeout=max(ends_at - time.monotonic(), 0), return_when=FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for future in done:
+                    if future.exception() is not None:
+                        error = future.exception()
+                    elif not _usable(future.result()):
+                        unusable = future.result()
+                    else:
+                        if future is hedge:
+                            with self._lock:
+                                self.hedge_wins += 1
+                        return future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+        # Neither leg succeeded: hand back a real response so the caller can classify it
+        if unusable is not None:
+            return unusable
+        raise error or requests.Timeout(f"No upstream response for {key} within {ends_at - started:.2f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            keys = list(self._latencies)
+            in_flight = self._in_flight
+            hedged = self.hedged
+            hedge_wins = self.hedge_wins
+        return {
+            "enabled": settings.UPSTREAM_HEDGE_ENABLED,
+            "percentile": self.percentile,
+            "in_flight": in_flight,
+            "hedged": hedged,
+            "hedge_wins": hedge_wins,
+            "budget": self.budget.stats(),
+            "hedge_delay_ms": {
+                key: round(delay * 1000, 1) if delay is not None else None
+                for key, delay in ((key, self.hedge_delay(key)) for key in keys)
+            },
+        }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+_transitions: deque = deque(maxlen=CB_TRANSITION_HISTORY)
+
+
+def _bounds_class(params: Dict[str, Any]) -> Optional[str]:
+    try:
+        span = max(
+            abs(float(params["right_long"]) - float(params["left_long"])),
+            abs(float(params["top_lat"]) - float(params["bottom_lat"])),
+        )
+    except (KeyError, TypeError, ValueError):
+        return None
+    for limit, name in BOUNDS_CLASSES:
+        if span <= limit:
+            return name
+    return "region"
+
+
+def circuit_key(cmd: str, params: Dict[str, Any]) -> str:
+    """Breaker key: the command, plus the viewport size class for bounded queries"""
+    bounds_class = _bounds_class(params)
+    return f"{cmd}:{bounds_class}" if bounds_class else cmd
+
+
+def get_circuit(cmd: str, params: Dict[str, Any]) -> CircuitBreaker:
+    key = circuit_key(cmd, params)
+    with _breakers_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = _breakers[key] = CircuitBreaker(
+                key,
+                threshold=settings.PROXY_CIRCUIT_THRESHOLD,
+                window_seconds=settings.PROXY_CIRCUIT_WINDOW_SECONDS,
+                cooldown_seconds=settings.PROXY_CIRCUIT_COOLDOWN_SECONDS,
+                max_cooldown_seconds=settings.PROXY_CIRCUIT_MAX_COOLDOWN_SECONDS,
+                failure_rate=settings.PROXY_CIRCUIT_FAILURE_RATE,
+                slow_call_seconds=settings.PROXY_CIRCUIT_SLOW_CALL_SECONDS,
+                probe_timeout_seconds=settings.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS,
             )
+        return breaker
+
 
+def record_proxy_failure(cmd: str, params: Dict[str, Any], reason: str = "") -> None:
+    """Record one failed upstream call against its breaker"""
+    get_circuit(cmd, params).record(failed=True, reason=reason)
 
-def record_proxy_success() -> None:
-    """Reset the circuit on success."""
-    global _cb_open_until
-    with _cb_lock:
-        _cb_failures.clear()
-        _cb_open_until = 0.0
 
+def record_proxy_success(cmd: str, params: Dict[str, Any], elapsed: Optional[float] = None) -> None:
+    """Record one successful upstream call; a slow one still counts as a failure"""
+    get_circuit(cmd, params).record(failed=False, elapsed=elapsed)
 
-def call_upstream(cmd: str, params: Dict[str, Any], timeout: Optional[int] = None) -> ProxyResponse:
+
+def release_proxy_call(cmd: str, params: Dict[str, Any]) -> None:
+    """Record a call whose outcome says nothing about upstream health (frees a half-open probe slot)"""
+    get_circuit(cmd, params).release()
+
+
+def circuit_stats() -> Dict[str, Any]:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {
+        "breakers": {breaker.key: breaker.stats() for breaker in breakers},
+        "transitions": list(_transitions),
+    }
+
+
+hedger = RequestHedger(
+    settings.UPSTREAM_HEDGE_PERCENTILE,
+    RetryBudget(settings.UPSTREAM_HEDGE_BUDGET_RATIO, 0, HEDGE_BUDGET_WINDOW_SECONDS),
+    settings.UPSTREAM_HEDGE_MAX_WORKERS,
+)
+
+
+def call_upstream(cmd: str, params: Dict[str, Any], timeout: Optional[float] = None) -> ProxyResponse:
     """
     Call the AWS Lambda proxy instead of the upstream API directly.
 
@@ -150,7 +522,9 @@ def call_upstream(cmd: str, params: Dict[str, Any], timeout: Optional[int] = Non
     if cached:
         return cached
 
-    ensure_circuit_allows()
+    # Callers report the outcome with record_proxy_success / record_proxy_failure
+    breaker = get_circuit(cmd, params)
+    breaker.allow()
 
     # Log exactly what we're sending to Lambda (safe version)
     logger.info(
@@ -160,12 +534,16 @@ def call_upstream(cmd: str, params: Dict[str, Any], timeout: Optional[int] = Non
         params,
         bool(token),
     )
-    resp = requests.get(
-        proxy_url,
-        params=query,
-        headers=headers,
-        timeout=timeout or settings.EXTERNAL_API_TIMEOUT,
-    )
+    request_timeout = timeout or settings.EXTERNAL_API_TIMEOUT
+
+    def send(send_timeout: float) -> requests.Response:
+        return requests.get(proxy_url, params=query, headers=headers, timeout=send_timeout)
+
+    started = time.perf_counter()
+    if settings.UPSTREAM_HEDGE_ENABLED and not breaker.degraded:
+        resp = hedger.call(breaker.key, send, request_timeout)
+    else:
+        resp = hedger.timed(breaker.key, send, request_timeout)
 
     normalized_headers = {k.lower(): v for k, v in resp.headers.items()}
     content_type = normalized_headers.get("content-type", "")
@@ -173,6 +551,7 @@ def call_upstream(cmd: str, params: Dict[str, Any], timeout: Optional[int] = Non
         status_code=resp.status_code,
         headers=normalized_headers,
         text=resp.text,
+        elapsed=time.perf_counter() - started,
     )
     cacheable = resp.status_code == 200 and "json" in content_type.lower()
     if cacheable:
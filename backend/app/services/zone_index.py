@@ -0,0 +1,36 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from app.schemas.zones import ExternalAPIResponse
+from app.services.get_description import clean_description
+
+
+@dataclass
+class ZoneIndexEntry:
+    code: str
+    name: str
+    coordinates: List[List[float]] = field(default_factory=list)  # List of [lat, lng] pairs
+    first_coordinate: Optional[List[float]] = None
+
+
+def build_zone_index(zones_response: ExternalAPIResponse) -> Dict[str, ZoneIndexEntry]:
+    """Build a zone code -> geometry/description index for one snapshot.
+
+    Mirrors the linear scans it replaces: positions of zones sharing a code are
+    concatenated (like ``filter_by_zone``), while the name and first coordinate
+    come from the first zone carrying that code.
+    """
+    index: Dict[str, ZoneIndexEntry] = {}
+    for zone in zones_response.zones:
+        if zone.code is None:
+            continue
+        entry = index.get(zone.code)
+        if entry is None:
+            entry = ZoneIndexEntry(
+                code=zone.code,
+                name=clean_description(zone.description),
+                first_coordinate=[zone.positions[0].lat, zone.positions[0].lng] if zone.positions else None,
+            )
+            index[zone.code] = entry
+        entry.coordinates.extend([pos.lat, pos.lng] for pos in zone.positions)
+    return index
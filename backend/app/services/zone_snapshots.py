@@ -3,6 +3,7 @@ from typing import Any, Dict, Optional, Tuple
 
 from sqlalchemy.orm import Session
 
+from app.core.database import upsert_insert
 from app.core.logging import logger
 from app.models.zone_snapshot import ZoneSnapshot
 
@@ -28,18 +29,14 @@ def upsert_snapshot(
     """Store or update the latest snapshot for a bounds key"""
     timestamp = fetched_at or datetime.utcnow()
     try:
-        snapshot = (
-            db.query(ZoneSnapshot)
-            .filter(ZoneSnapshot.bounds_key == bounds_key)
-            .one_or_none()
+        # Single ON CONFLICT statement: no read first, so it is safe on read-routed sessions too
+        stmt = upsert_insert(db, ZoneSnapshot).values(bounds_key=bounds_key, data=data, fetched_at=timestamp)
+        db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["bounds_key"],
+                set_={"data": stmt.excluded.data, "fetched_at": stmt.excluded.fetched_at},
+            )
         )
-
-        if snapshot:
-            snapshot.data = data
-            snapshot.fetched_at = timestamp
-        else:
-            db.add(ZoneSnapshot(bounds_key=bounds_key, data=data, fetched_at=timestamp))
-
         db.commit()
     except Exception as exc:
         db.rollback()
@@ -1,5 +1,6 @@
 from dataclasses import dataclass
-from typing import Optional
+from functools import cached_property
+from typing import Dict, Optional
 
 from fastapi import HTTPException
 from sqlalchemy.orm import Session
@@ -9,9 +10,11 @@ from app.schemas.zones import ExternalAPIResponse
 from app.services.search_zones import (
     ZoneFetchResult,
     UpstreamBlocked,
+    UpstreamDeadlineExceeded,
     UpstreamFailed,
     search_zones,
 )
+from app.services.zone_index import ZoneIndexEntry, build_zone_index
 from app.services.zone_snapshots import get_snapshot, make_bounds_key, upsert_snapshot
 
 
@@ -24,6 +27,11 @@ class ZoneDataResult:
     fetched_at: Optional[str] = None
     upstream_status: Optional[int] = None
 
+    @cached_property
+    def zone_index(self) -> Dict[str, ZoneIndexEntry]:
+        """Zone code index for this snapshot, built once on first lookup"""
+        return build_zone_index(self.data)
+
 
 def _parse_external_response(payload: dict, bounds_key: str) -> ExternalAPIResponse:
     try:
@@ -117,12 +125,17 @@ def fetch_zones_with_snapshot(
             return ZoneDataResult(
                 data=response_model,
                 stale=True,
-                stale_reason="upstream_error",
+                stale_reason="deadline_exceeded" if isinstance(exc, UpstreamDeadlineExceeded) else "upstream_error",
                 bounds_key=bounds_key,
                 fetched_at=cached_fetched_at,
                 upstream_status=getattr(exc, "status", None),
             )
 
+        if isinstance(exc, UpstreamDeadlineExceeded):
+            raise HTTPException(
+                status_code=504,
+                detail={"error": "upstream_deadline_exceeded", "reason": exc.reason},
+            )
         raise HTTPException(
             status_code=503,
             detail={"error": "upstream_failed", "reason": str(exc)},
@@ -0,0 +1,28 @@
+"""Query ranges for the rollup-backed analytics endpoints, which store naive UTC."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers.analytics import _analytics_range
+
+
+def test_offset_aware_bounds_are_converted_to_naive_utc():
+    plus_two = timezone(timedelta(hours=2))
+    start, end = _analytics_range(
+        datetime(2026, 10, 1, 12, 0, tzinfo=plus_two), datetime(2026, 10, 2, 0, 30, tzinfo=timezone.utc)
+    )
+    assert (start, end) == (datetime(2026, 10, 1, 10, 0), datetime(2026, 10, 2, 0, 30))
+
+
+def test_open_range_ends_now_in_utc():
+    start, end = _analytics_range(datetime.utcnow() - timedelta(hours=1), None)
+    assert end.tzinfo is None
+    assert abs(end - datetime.utcnow()) < timedelta(seconds=5)
+
+
+@pytest.mark.parametrize("days", [0, -1, 367])
+def test_empty_or_oversized_ranges_are_rejected(days):
+    start = datetime(2025, 1, 1)
+    with pytest.raises(HTTPException):
+        _analytics_range(start, start + timedelta(days=days))
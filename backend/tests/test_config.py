@@ -0,0 +1,32 @@
+"""Startup validation of settings."""
+import pytest
+
+from app.core.config import Settings
+
+
+def settings_with(**values) -> Settings:
+    settings = Settings()
+    for name, value in values.items():
+        setattr(settings, name, value)
+    return settings
+
+
+@pytest.mark.parametrize("mode", ["OFF", "NORMAL", "FULL", "EXTRA"])
+def test_sqlite_synchronous_modes_are_accepted(mode):
+    settings_with(SQLITE_SYNCHRONOUS=mode).validate()
+
+
+@pytest.mark.parametrize("mode", ["", "FAST", "NORMAL; DROP TABLE users", "1"])
+def test_other_sqlite_synchronous_values_are_rejected(mode):
+    with pytest.raises(ValueError, match="SQLITE_SYNCHRONOUS"):
+        settings_with(SQLITE_SYNCHRONOUS=mode).validate()
+
+
+def test_upstream_timeouts_must_be_ordered():
+    settings_with(
+        PROXY_CIRCUIT_SLOW_CALL_SECONDS=3, UPSTREAM_ATTEMPT_TIMEOUT_SECONDS=4, UPSTREAM_DEADLINE_SECONDS=8
+    ).validate()
+    with pytest.raises(ValueError, match="UPSTREAM_ATTEMPT_TIMEOUT_SECONDS"):
+        settings_with(
+            PROXY_CIRCUIT_SLOW_CALL_SECONDS=5, UPSTREAM_ATTEMPT_TIMEOUT_SECONDS=4, UPSTREAM_DEADLINE_SECONDS=8
+        ).validate()
@@ -0,0 +1,27 @@
+"""Request deadlines taken from the client's timeout header."""
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.core.deadlines import deadline_from_header
+
+
+@pytest.fixture(autouse=True)
+def deadline_settings(monkeypatch):
+    monkeypatch.setattr(settings, "UPSTREAM_DEADLINE_SECONDS", 8)
+    monkeypatch.setattr(settings, "UPSTREAM_DEADLINE_MAX_SECONDS", 20)
+
+
+def budget(header):
+    return deadline_from_header(header) - time.monotonic()
+
+
+@pytest.mark.parametrize("header, seconds", [("2500", 2.5), ("-10", 0.0), ("60000", 20), ("1e9", 20)])
+def test_client_budget_is_clamped(header, seconds):
+    assert budget(header) == pytest.approx(seconds, abs=0.05)
+
+
+@pytest.mark.parametrize("header", [None, "", "soon", "nan", "NaN", "inf", "-inf"])
+def test_missing_malformed_or_non_finite_budget_uses_the_default(header):
+    assert budget(header) == pytest.approx(8, abs=0.05)
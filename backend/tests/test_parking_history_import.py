@@ -0,0 +1,66 @@
+"""Streaming parking history import into a throwaway SQLite database."""
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from app import models  # noqa: F401  registers every model on Base.metadata
+from app.models.base import Base
+from app.models.parking_history import ParkingHistory
+from app.models.user import User
+from app.services.parking_history_transfer import import_parking_history
+
+USER_ID = 1
+
+
+async def _chunks(*records):
+    for record in records:
+        yield (json.dumps(record) + "\n").encode()
+
+
+def _import(tmp_path, *records):
+    async def run():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'import.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            now = datetime(2026, 10, 1)
+            await conn.execute(insert(User), [{
+                "id": USER_ID, "email": "u@example.com", "username": "u", "hashed_password": "x",
+                "created_at": now, "updated_at": now,
+            }])
+        async with AsyncSession(engine) as db:
+            result = await import_parking_history(db, USER_ID, _chunks(*records), "ndjson")
+            rows = (await db.execute(select(ParkingHistory).order_by(ParkingHistory.id))).scalars().all()
+        await engine.dispose()
+        return result, rows
+
+    return asyncio.run(run())
+
+
+def test_aware_timestamps_are_stored_as_naive_utc(tmp_path):
+    result, rows = _import(
+        tmp_path,
+        {"zone_code": "A1", "start_time": "2026-10-01T08:00:00Z", "end_time": "2026-10-01T09:30:00Z"},
+        {"zone_code": "A2", "start_time": "2026-10-01T10:00:00+02:00", "end_time": "2026-10-01T10:45:00+02:00"},
+    )
+
+    assert result == {"imported": 2, "rejected": 0, "errors": []}
+    assert [(row.start_time, row.end_time, row.duration_minutes) for row in rows] == [
+        (datetime(2026, 10, 1, 8, 0), datetime(2026, 10, 1, 9, 30), 90),
+        (datetime(2026, 10, 1, 8, 0), datetime(2026, 10, 1, 8, 45), 45),
+    ]
+
+
+@pytest.mark.parametrize("end_time", ["2026-10-01T07:00:00Z", "2026-10-01T07:59:00"])
+def test_mixed_offsets_are_compared_in_utc(tmp_path, end_time):
+    result, rows = _import(
+        tmp_path,
+        {"zone_code": "A1", "start_time": "2026-10-01T10:00:00+02:00", "end_time": end_time},
+    )
+
+    assert rows == []
+    assert result["rejected"] == 1
+    assert "end_time is before start_time" in result["errors"][0]["error"]
@@ -0,0 +1,140 @@
+"""Query-plan regression tests for the hot per-user queries.
+
+A synthetic dataset is seeded into a throwaway SQLite database built from
+the models, ``ANALYZE`` gives the planner realistic statistics, and every
+hot query is checked with ``EXPLAIN QUERY PLAN`` to make sure it searches
+the intended index instead of scanning the table.
+"""
+import random
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text, tuple_
+
+from app import models  # noqa: F401  registers every model on Base.metadata
+from app.models.base import Base
+from app.models.favorite_zone import FavoriteZone
+from app.models.parking_history import ParkingHistory
+from app.models.payment import Payment, StripeWebhookEvent
+from app.models.user import User
+
+USERS = 200
+SESSIONS_PER_USER = 100
+FAVORITES_PER_USER = 10
+PAYMENTS_PER_USER = 50
+USER_ID = 42
+
+
+@pytest.fixture(scope="module")
+def engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}")
+    Base.metadata.create_all(engine)
+    rng = random.Random(36)
+    now = datetime(2026, 10, 1)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [
+            {"id": i, "email": f"u{i}@example.com", "username": f"u{i}", "hashed_password": "x",
+             "created_at": now, "updated_at": now}
+            for i in range(1, USERS + 1)
+        ])
+        conn.execute(insert(ParkingHistory), [
+            {"user_id": user_id, "zone_code": f"Z{rng.randrange(300)}",
+             "start_time": now - timedelta(hours=rng.randrange(24 * 365)),
+             "status": rng.choice(("completed", "completed", "completed", "cancelled", "active")),
+             "created_at": now, "updated_at": now}
+            for user_id in range(1, USERS + 1) for _ in range(SESSIONS_PER_USER)
+        ])
+        conn.execute(insert(FavoriteZone), [
+            {"user_id": user_id, "zone_code": f"Z{n}", "display_order": n, "created_at": now, "updated_at": now}
+            for user_id in range(1, USERS + 1) for n in range(FAVORITES_PER_USER)
+        ])
+        conn.execute(insert(Payment), [
+            {"user_id": user_id, "amount": 4.0, "payment_method": "stripe", "status": "completed",
+             "stripe_payment_intent_id": f"pi_{user_id}_{n}",
+             "created_at": now - timedelta(hours=rng.randrange(24 * 365)), "updated_at": now}
+            for user_id in range(1, USERS + 1) for n in range(PAYMENTS_PER_USER)
+        ])
+        conn.execute(insert(StripeWebhookEvent), [
+            {"id": f"evt_{n}", "type": "payment_intent.succeeded", "payload": "{}", "attempts": 1,
+             "status": "pending" if n % 100 == 0 else "processed", "stripe_created": n,
+             "received_at": now + timedelta(seconds=n)}
+            for n in range(10000)
+        ])
+        conn.execute(text("ANALYZE"))
+    yield engine
+    engine.dispose()
+
+
+def _plan(engine, query) -> str:
+    sql = str(query.compile(engine, compile_kwargs={"literal_binds": True}))
+    with engine.connect() as conn:
+        rows = conn.execute(text(f"EXPLAIN QUERY PLAN {sql}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+def _newest_first(query, sort_column, id_column, limit=50):
+    """The shape keyset_page gives a page after the first one"""
+    return (
+        query.where(tuple_(sort_column, id_column) < (datetime(2026, 6, 1), 10**9))
+        .order_by(sort_column.desc(), id_column.desc())
+        .limit(limit + 1)
+    )
+
+
+HOT_QUERIES = {
+    "parking history page": (
+        lambda: _newest_first(
+            select(ParkingHistory).where(ParkingHistory.user_id == USER_ID),
+            ParkingHistory.start_time, ParkingHistory.id,
+        ),
+        "parking_history", "ix_parking_history_user_start",
+    ),
+    "parking history page by status": (
+        lambda: _newest_first(
+            select(ParkingHistory).where(ParkingHistory.user_id == USER_ID, ParkingHistory.status == "completed"),
+            ParkingHistory.start_time, ParkingHistory.id,
+        ),
+        "parking_history", "ix_parking_history_user_status_start",
+    ),
+    "active sessions": (
+        lambda: select(ParkingHistory).where(ParkingHistory.user_id == USER_ID, ParkingHistory.status == "active"),
+        "parking_history", "ix_parking_history_user_status_start",
+    ),
+    "parking stats": (
+        lambda: select(func.count(ParkingHistory.id), func.sum(ParkingHistory.duration_minutes)).where(
+            ParkingHistory.user_id == USER_ID, ParkingHistory.status == "completed"
+        ),
+        "parking_history", "ix_parking_history_user_status_start",
+    ),
+    "favorites list": (
+        lambda: select(FavoriteZone).where(FavoriteZone.user_id == USER_ID).order_by(FavoriteZone.display_order),
+        "favorite_zones", "ix_favorite_zones_user_order",
+    ),
+    "favorite duplicate check": (
+        lambda: select(FavoriteZone.id).where(FavoriteZone.user_id == USER_ID, FavoriteZone.zone_code == "Z3"),
+        "favorite_zones", "uq_favorite_zones_user_zone",
+    ),
+    "payments history page": (
+        lambda: _newest_first(select(Payment).where(Payment.user_id == USER_ID), Payment.created_at, Payment.id),
+        "payments", "ix_payments_user_created",
+    ),
+    "webhook payment lookup": (
+        lambda: select(Payment).where(Payment.stripe_payment_intent_id.in_(["pi_42_1", "pi_7_3"])),
+        "payments", "uq_payments_stripe_payment_intent_id",
+    ),
+    "pending webhook events": (
+        lambda: select(StripeWebhookEvent)
+        .where(StripeWebhookEvent.status == "pending")
+        .order_by(StripeWebhookEvent.stripe_created, StripeWebhookEvent.received_at)
+        .limit(100),
+        "stripe_webhook_events", "ix_stripe_webhook_events_status_received",
+    ),
+}
+
+
+@pytest.mark.parametrize("name", list(HOT_QUERIES))
+def test_hot_query_uses_index(engine, name):
+    build, table, index = HOT_QUERIES[name]
+    plan = _plan(engine, build())
+    assert f"SEARCH {table} USING INDEX {index}" in plan or f"SEARCH {table} USING COVERING INDEX {index}" in plan, plan
+    assert f"SCAN {table}" not in plan, plan
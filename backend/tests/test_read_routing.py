@@ -0,0 +1,116 @@
+"""Replica routing and read-your-writes pinning with two local SQLite databases."""
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import insert, select, update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app import models  # noqa: F401  registers every model on Base.metadata
+from app.core import database, read_your_writes
+from app.core.database import AsyncReadSession, WriteAsyncSession
+from app.core.shared import SimpleCache
+from app.models.base import Base
+from app.models.user import User
+
+NOW = datetime(2026, 10, 1)
+
+
+@pytest.fixture
+def databases(tmp_path, monkeypatch):
+    """Primary and replica hold the same users under different names, so a read shows where it went"""
+    primary = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'primary.db'}")
+    replica = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'replica.db'}")
+
+    async def seed():
+        for engine, name in ((primary, "primary"), (replica, "replica")):
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+                await conn.execute(insert(User), [
+                    {"id": user_id, "email": f"u{user_id}@example.com", "username": f"{name}-{user_id}",
+                     "hashed_password": "x", "created_at": NOW, "updated_at": NOW}
+                    for user_id in (1, 2)
+                ])
+
+    asyncio.run(seed())
+    monkeypatch.setattr(database, "async_engine", primary)
+    monkeypatch.setattr(database, "async_replica_engines", [replica])
+    monkeypatch.setattr(read_your_writes, "replica_engines", [replica.sync_engine])
+    monkeypatch.setattr(read_your_writes, "_recent_writers", SimpleCache(max_entries=100))
+    monkeypatch.setattr(read_your_writes, "_redis", None)
+    yield (
+        async_sessionmaker(primary, class_=WriteAsyncSession, expire_on_commit=False),
+        async_sessionmaker(class_=AsyncSession, sync_session_class=AsyncReadSession, expire_on_commit=False),
+    )
+    asyncio.run(primary.dispose())
+    asyncio.run(replica.dispose())
+
+
+async def read_name(read_sessions, user_id: int) -> str:
+    async with read_sessions() as db:
+        return (await db.execute(select(User.username).where(User.id == user_id))).scalar_one()
+
+
+def run_requests(*requests):
+    """Run each request coroutine function as its own task, i.e. with its own context"""
+
+    async def main():
+        return [await asyncio.create_task(request()) for request in requests]
+
+    return asyncio.run(main())
+
+
+def test_write_then_read_in_one_request_hits_the_primary(databases):
+    write_sessions, read_sessions = databases
+
+    async def writer():
+        await read_your_writes.track_request_user(1)
+        before = await read_name(read_sessions, 1)
+        async with write_sessions() as db:
+            await db.execute(update(User).where(User.id == 1).values(full_name="Updated"))
+            await db.commit()
+        return before, await read_name(read_sessions, 1)
+
+    async def unrelated():
+        await read_your_writes.track_request_user(2)
+        return await read_name(read_sessions, 2)
+
+    async def same_user_next_request():
+        await read_your_writes.track_request_user(1)
+        return await read_name(read_sessions, 1)
+
+    (before, after), other, later = run_requests(writer, unrelated, same_user_next_request)
+
+    assert before == "replica-1"
+    assert after == "primary-1"
+    assert other == "replica-2"
+    assert later == "primary-1"
+
+
+def test_read_only_or_rolled_back_requests_stay_on_the_replica(databases):
+    write_sessions, read_sessions = databases
+
+    async def reader():
+        await read_your_writes.track_request_user(1)
+        async with write_sessions() as db:
+            await db.execute(select(User))
+            await db.commit()
+            await db.execute(update(User).where(User.id == 1).values(full_name="Discarded"))
+            await db.rollback()
+        return await read_name(read_sessions, 1)
+
+    assert run_requests(reader) == ["replica-1"]
+
+
+def test_writes_in_a_read_session_pin_it_to_the_primary(databases):
+    _, read_sessions = databases
+
+    async def request():
+        async with read_sessions() as db:
+            first = (await db.execute(select(User.username).where(User.id == 2))).scalar_one()
+            await db.execute(update(User).where(User.id == 2).values(full_name="Pinned"))
+            after = (await db.execute(select(User.username).where(User.id == 2))).scalar_one()
+            await db.rollback()
+        return first, after
+
+    assert run_requests(request) == [("replica-2", "primary-2")]
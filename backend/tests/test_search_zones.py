@@ -0,0 +1,58 @@
+"""Upstream retries, deadlines and breaker accounting in fetch_zones_from_upstream."""
+import time
+
+import pytest
+import requests
+
+from app.core.config import settings
+from app.services import search_zones, upstream_proxy
+from app.services.search_zones import UpstreamDeadlineExceeded, fetch_zones_from_upstream
+
+PAYLOAD = {"cmd": "get_zones"}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A proxy whose every request times out; yields the timeouts it was called with"""
+    timeouts = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        timeouts.append(timeout)
+        raise requests.Timeout("read timed out")
+
+    monkeypatch.setattr(settings, "UPSTREAM_PROXY_URL", "http://proxy.invalid")
+    monkeypatch.setattr(settings, "UPSTREAM_PROXY_TOKEN", "token")
+    monkeypatch.setattr(settings, "UPSTREAM_HEDGE_ENABLED", False)
+    monkeypatch.setattr(upstream_proxy, "_breakers", {})
+    monkeypatch.setattr(upstream_proxy.requests, "get", get)
+    monkeypatch.setattr(search_zones, "_backoff_seconds", lambda attempt: 0.0)
+    return timeouts
+
+
+def breaker_stats():
+    return upstream_proxy.circuit_stats()["breakers"][upstream_proxy.circuit_key("get_zones", PAYLOAD)]
+
+
+def test_full_length_timeouts_open_the_breaker(upstream):
+    # Default deadline: every attempt gets the full per-attempt timeout and times out
+    for _ in range(settings.PROXY_CIRCUIT_THRESHOLD):
+        with pytest.raises((requests.Timeout, search_zones.UpstreamFailed)):
+            fetch_zones_from_upstream(PAYLOAD)
+
+    assert set(upstream) == {settings.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS}
+    assert breaker_stats()["state"] == "open"
+    sent = len(upstream)
+    with pytest.raises(search_zones.UpstreamFailed):
+        fetch_zones_from_upstream(PAYLOAD)
+    assert len(upstream) == sent
+
+
+def test_timeouts_cut_short_by_the_deadline_are_not_failures(upstream):
+    for _ in range(settings.PROXY_CIRCUIT_THRESHOLD):
+        with pytest.raises((requests.Timeout, UpstreamDeadlineExceeded)):
+            fetch_zones_from_upstream(PAYLOAD, max_attempts=1, deadline=time.monotonic() + 1)
+
+    assert all(timeout < settings.UPSTREAM_ATTEMPT_TIMEOUT_SECONDS for timeout in upstream)
+    stats = breaker_stats()
+    assert stats["state"] == "closed"
+    assert stats["failures_in_window"] == 0
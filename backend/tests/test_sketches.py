@@ -0,0 +1,95 @@
+"""HyperLogLog, Count-Min and TopK sketches, including merging per-worker state."""
+import random
+
+import pytest
+
+from app.services.sketches import CountMinSketch, HyperLogLog, TopK
+
+
+def zipf_stream(items: int, length: int, seed: int):
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, items + 1)]
+    return rng.choices([f"zone-{n}" for n in range(items)], weights=weights, k=length)
+
+
+def test_hyperloglog_estimate_and_merge():
+    left, right = HyperLogLog(), HyperLogLog()
+    for n in range(30_000):
+        left.add(f"user-{n}")
+    for n in range(20_000, 50_000):
+        right.add(f"user-{n}")
+
+    assert left.count() == pytest.approx(30_000, rel=0.03)
+    restored = HyperLogLog.from_bytes(left.to_bytes())
+    restored.merge(right)
+    assert restored.count() == pytest.approx(50_000, rel=0.03)
+
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(precision=10))
+
+
+def test_count_min_never_undercounts():
+    sketch = CountMinSketch(width=256, depth=4)
+    exact = {}
+    for item in zipf_stream(2_000, 20_000, seed=1):
+        sketch.add(item)
+        exact[item] = exact.get(item, 0) + 1
+
+    total = sum(exact.values())
+    for item, count in exact.items():
+        assert count <= sketch.estimate(item) <= count + total * 0.05
+
+
+def test_count_min_merge_equals_one_sketch_of_both_streams():
+    first, second = zipf_stream(500, 5_000, seed=2), zipf_stream(500, 5_000, seed=3)
+    combined, left, right = CountMinSketch(), CountMinSketch(), CountMinSketch()
+    for item in first:
+        combined.add(item)
+        left.add(item)
+    for item in second:
+        combined.add(item)
+        right.add(item)
+
+    merged = CountMinSketch.from_bytes(left.to_bytes())
+    merged.merge(CountMinSketch.from_bytes(right.to_bytes()))
+    assert merged.tables == combined.tables
+
+    with pytest.raises(ValueError):
+        merged.merge(CountMinSketch(width=128))
+    with pytest.raises(ValueError):
+        CountMinSketch.from_bytes(left.to_bytes()[:-8])
+
+
+def test_topk_tracks_heavy_hitters():
+    sketch, top = CountMinSketch(), TopK(k=5)
+    stream = zipf_stream(1_000, 50_000, seed=4)
+    for item in stream:
+        top.offer(item, sketch.add(item))
+
+    exact = {}
+    for item in stream:
+        exact[item] = exact.get(item, 0) + 1
+    heaviest = sorted(exact, key=exact.get, reverse=True)[:3]
+    assert [item for item, _ in top.top(3)] == heaviest
+    assert len(top._heap) <= 2 * top.k + 1
+
+
+def test_topk_rebuilt_from_merged_worker_sketches():
+    workers = [CountMinSketch() for _ in range(3)]
+    seen = set()
+    for seed, sketch in enumerate(workers):
+        for item in zipf_stream(200, 5_000, seed=10 + seed):
+            sketch.add(item)
+            seen.add(item)
+    merged = workers[0]
+    for sketch in workers[1:]:
+        merged.merge(sketch)
+
+    top = TopK.from_sketch(merged, seen, k=3)
+    assert [item for item, _ in top.top(3)] == ["zone-0", "zone-1", "zone-2"]
+
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_topk_rejects_empty_capacity(k):
+    with pytest.raises(ValueError):
+        TopK(k=k)
@@ -0,0 +1,122 @@
+"""Stripe SDK timeout, retries and idempotency keys against a local stub HTTP server."""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import stripe
+
+from app.core.config import settings
+from app.services.stripe_client import StripeClient, configure_stripe
+
+INTENT = {
+    "id": "pi_stub",
+    "object": "payment_intent",
+    "amount": 400,
+    "currency": "usd",
+    "client_secret": "pi_stub_secret",
+}
+
+
+class StubStripe:
+    """Answers POST /v1/payment_intents per ``behaviour(attempt)``: 'ok', 'error' or 'slow'"""
+
+    def __init__(self, behaviour):
+        self.behaviour = behaviour
+        self.requests = []
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0)).decode()
+                stub.requests.append({"path": self.path, "headers": dict(self.headers), "body": body})
+                outcome = stub.behaviour(len(stub.requests))
+                if outcome == "slow":
+                    time.sleep(1)
+                status, payload = (200, INTENT) if outcome == "ok" else (
+                    500, {"error": {"type": "api_error", "message": "stub failure"}}
+                )
+                data = json.dumps(payload).encode()
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    if status != 200:
+                        self.send_header("Stripe-Should-Retry", "true")
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client timed out and hung up
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub_stripe(monkeypatch):
+    servers = []
+
+    def start(behaviour, retries=2, timeout=5.0):
+        stub = StubStripe(behaviour)
+        servers.append(stub)
+        monkeypatch.setattr(settings, "STRIPE_SECRET_KEY", "sk_test_stub")
+        monkeypatch.setattr(settings, "STRIPE_API_BASE", stub.url)
+        monkeypatch.setattr(settings, "STRIPE_MAX_NETWORK_RETRIES", retries)
+        monkeypatch.setattr(settings, "STRIPE_TIMEOUT_SECONDS", timeout)
+        configure_stripe()
+        return stub
+
+    api_base = stripe.api_base
+    yield start
+    for stub in servers:
+        stub.close()
+    monkeypatch.undo()
+    configure_stripe()
+    stripe.api_base = api_base
+
+
+def create_intent(key="payment-intent:1:abc"):
+    client = StripeClient(max_concurrency=2, max_pending=2)
+    try:
+        return asyncio.run(client.create_payment_intent(key, amount=400, currency="usd"))
+    finally:
+        client.shutdown()
+
+
+def test_retries_reuse_the_idempotency_key(stub_stripe):
+    stub = stub_stripe(lambda attempt: "ok" if attempt == 3 else "error", retries=2)
+
+    intent = create_intent("payment-intent:1:abc")
+
+    assert intent.id == "pi_stub"
+    assert len(stub.requests) == 3
+    assert {request["headers"]["Idempotency-Key"] for request in stub.requests} == {"payment-intent:1:abc"}
+    assert all(request["path"] == "/v1/payment_intents" for request in stub.requests)
+
+
+def test_gives_up_after_the_configured_retries(stub_stripe):
+    stub = stub_stripe(lambda attempt: "error", retries=1)
+
+    with pytest.raises(stripe.error.APIError):
+        create_intent()
+    assert len(stub.requests) == 2
+
+
+def test_slow_response_times_out(stub_stripe):
+    stub = stub_stripe(lambda attempt: "slow", retries=0, timeout=0.2)
+
+    started = time.monotonic()
+    with pytest.raises(stripe.error.APIConnectionError):
+        create_intent()
+    assert time.monotonic() - started < 0.9
+    assert len(stub.requests) == 1
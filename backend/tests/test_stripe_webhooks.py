@@ -0,0 +1,166 @@
+"""Webhook recording and the background worker, fed by a local fake event source."""
+import asyncio
+import itertools
+from datetime import datetime
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from app import models  # noqa: F401  registers every model on Base.metadata
+from app.models.base import Base
+from app.models.payment import Payment, PaymentMonthlyTotal, StripeWebhookEvent
+from app.models.user import User
+from app.services import stripe_webhooks
+from app.services.stripe_webhooks import StripeWebhookWorker, record_event
+
+NOW = datetime(2026, 10, 1)
+_created = itertools.count(1_760_000_000)
+
+
+def fake_event(event_id: str, intent_id: str, type_: str = "payment_intent.succeeded") -> dict:
+    """A Stripe event as the webhook route hands it over after signature checks"""
+    return {
+        "id": event_id,
+        "type": type_,
+        "created": next(_created),
+        "data": {"object": {"id": intent_id, "latest_charge": f"ch_{intent_id}"}},
+    }
+
+
+def run(tmp_path, scenario, max_attempts: int = 3):
+    """Run ``scenario(sessions, worker)`` against a throwaway database with two pending payments"""
+
+    async def main():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'webhooks.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+            await conn.execute(insert(User), [{
+                "id": 1, "email": "u@example.com", "username": "u", "hashed_password": "x",
+                "created_at": NOW, "updated_at": NOW,
+            }])
+            await conn.execute(insert(Payment), [
+                {"user_id": 1, "amount": amount, "payment_method": "stripe", "status": "pending",
+                 "stripe_payment_intent_id": intent_id, "created_at": NOW, "updated_at": NOW}
+                for intent_id, amount in (("pi_1", 4.0), ("pi_2", 6.0))
+            ])
+        sessions = async_sessionmaker(engine, expire_on_commit=False)
+        worker = StripeWebhookWorker(sessions, batch_size=10, poll_seconds=1, max_attempts=max_attempts)
+        try:
+            return await scenario(sessions, worker)
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+async def snapshot(sessions):
+    async with sessions() as db:
+        payments = {
+            payment.stripe_payment_intent_id: payment.status
+            for payment in (await db.execute(select(Payment))).scalars()
+        }
+        totals = [
+            (total.month, total.total_amount, total.transaction_count)
+            for total in (await db.execute(select(PaymentMonthlyTotal))).scalars()
+        ]
+        events = {
+            event.id: (event.status, event.attempts, event.last_error)
+            for event in (await db.execute(select(StripeWebhookEvent))).scalars()
+        }
+    return payments, totals, events
+
+
+def test_redelivered_event_is_recorded_and_applied_once(tmp_path):
+    async def scenario(sessions, worker):
+        event = fake_event("evt_1", "pi_1")
+        async with sessions() as db:
+            first = await record_event(db, event)
+            again = await record_event(db, event)
+        applied = await worker.process_pending()
+        async with sessions() as db:
+            late = await record_event(db, event)
+        return first, again, late, applied, await worker.process_pending(), await snapshot(sessions)
+
+    first, again, late, applied, applied_later, (payments, totals, events) = run(tmp_path, scenario)
+
+    assert (first, again, late) == (True, False, False)
+    assert (applied, applied_later) == (1, 0)
+    assert payments == {"pi_1": "completed", "pi_2": "pending"}
+    assert totals == [("2026-10", 4.0, 1)]
+    assert events["evt_1"][:2] == ("processed", 1)
+
+
+def test_second_succeeded_event_for_an_intent_is_not_counted_twice(tmp_path):
+    async def scenario(sessions, worker):
+        async with sessions() as db:
+            await record_event(db, fake_event("evt_1", "pi_1"))
+            await record_event(db, fake_event("evt_2", "pi_1"))
+        await worker.process_pending()
+        return await snapshot(sessions)
+
+    payments, totals, events = run(tmp_path, scenario)
+
+    assert totals == [("2026-10", 4.0, 1)]
+    assert {status for status, _, _ in events.values()} == {"processed"}
+
+
+def test_claimed_event_is_skipped_by_a_concurrent_worker(tmp_path):
+    async def scenario(sessions, worker):
+        async with sessions() as db:
+            await record_event(db, fake_event("evt_1", "pi_1"))
+        # Another worker loaded the same pending batch before this one committed
+        async with sessions() as db:
+            stale = await worker._pending(db)
+        assert await worker.process_pending() == 1
+        async with sessions() as db:
+            applied = await stripe_webhooks._apply(db, stale)
+            await db.commit()
+        return applied, await snapshot(sessions)
+
+    applied, (payments, totals, events) = run(tmp_path, scenario)
+
+    assert applied == 0
+    assert totals == [("2026-10", 4.0, 1)]
+    assert events["evt_1"][:2] == ("processed", 1)
+
+
+def test_failing_event_is_retried_alone_then_marked_failed(tmp_path, monkeypatch):
+    apply_success = stripe_webhooks._apply_success
+
+    async def flaky_apply_success(db, payment, intent):
+        if intent["id"] == "pi_2":
+            raise RuntimeError("boom")
+        await apply_success(db, payment, intent)
+
+    monkeypatch.setattr(stripe_webhooks, "_apply_success", flaky_apply_success)
+
+    async def scenario(sessions, worker):
+        async with sessions() as db:
+            await record_event(db, fake_event("evt_bad", "pi_2"))
+            await record_event(db, fake_event("evt_good", "pi_1"))
+        rounds = []
+        for _ in range(3):
+            await worker.process_pending()
+            rounds.append((await snapshot(sessions))[2]["evt_bad"])
+        return rounds, await snapshot(sessions)
+
+    rounds, (payments, totals, events) = run(tmp_path, scenario, max_attempts=3)
+
+    # The batch fails as a whole, then the good event goes through on its own
+    assert events["evt_good"][:2] == ("processed", 1)
+    assert payments == {"pi_1": "completed", "pi_2": "pending"}
+    assert totals == [("2026-10", 4.0, 1)]
+    assert rounds == [("pending", 1, "boom"), ("pending", 2, "boom"), ("failed", 3, "boom")]
+
+
+def test_payment_failed_event_marks_the_payment(tmp_path):
+    async def scenario(sessions, worker):
+        async with sessions() as db:
+            await record_event(db, fake_event("evt_1", "pi_2", "payment_intent.payment_failed"))
+        await worker.process_pending()
+        return await snapshot(sessions)
+
+    payments, totals, events = run(tmp_path, scenario)
+
+    assert payments["pi_2"] == "failed"
+    assert totals == []
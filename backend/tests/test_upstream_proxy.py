@@ -0,0 +1,224 @@
+"""Circuit breaker state machine and request hedging for upstream proxy calls."""
+import threading
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.services import upstream_proxy
+from app.services.upstream_proxy import CircuitBreaker, ProxyCircuitOpen, RequestHedger, RetryBudget
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_000_000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(upstream_proxy.time, "time", clock)
+    return clock
+
+
+def make_breaker(**overrides) -> CircuitBreaker:
+    options = dict(
+        threshold=3,
+        window_seconds=30,
+        cooldown_seconds=10,
+        max_cooldown_seconds=25,
+        failure_rate=0.5,
+        slow_call_seconds=2,
+        probe_timeout_seconds=4,
+    )
+    options.update(overrides)
+    return CircuitBreaker("test", **options)
+
+
+def test_opens_after_threshold_failures_at_the_failure_rate(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        breaker.record(failed=False)
+    breaker.record(failed=True, reason="boom")
+    breaker.record(failed=True, reason="boom")
+    breaker.record(failed=True, reason="boom")
+    # 3 failures out of 7 calls is below the 50% failure rate
+    assert breaker.state == CircuitBreaker.CLOSED
+
+    breaker.record(failed=True, reason="boom")
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(ProxyCircuitOpen):
+        breaker.allow()
+
+
+def test_failures_outside_the_window_are_forgotten(clock):
+    breaker = make_breaker()
+    breaker.record(failed=True)
+    breaker.record(failed=True)
+    clock.now += 31
+    breaker.record(failed=True)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["failures_in_window"] == 1
+
+
+def test_slow_successes_count_as_failures(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(failed=False, elapsed=2.5)
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_half_open_probe_success_closes(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(failed=True)
+    clock.now += 9
+    with pytest.raises(ProxyCircuitOpen):
+        breaker.allow()
+
+    clock.now += 1
+    breaker.allow()  # the probe
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    with pytest.raises(ProxyCircuitOpen):
+        breaker.allow()  # everyone else while the probe is in flight
+
+    breaker.record(failed=False, elapsed=0.1)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["calls_in_window"] == 0
+    breaker.allow()
+
+
+def test_failed_probe_reopens_with_doubled_cooldown(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(failed=True)
+    for expected_cooldown in (20, 25):
+        clock.now += breaker.stats()["open_for_seconds"]
+        breaker.allow()
+        breaker.record(failed=True, reason="still down")
+        assert breaker.state == CircuitBreaker.OPEN
+        assert breaker.stats()["cooldown_seconds"] == expected_cooldown
+
+    clock.now += 25
+    breaker.allow()
+    breaker.record(failed=False)
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.stats()["cooldown_seconds"] == 10
+
+
+def test_released_or_lost_probe_lets_another_through(clock):
+    breaker = make_breaker()
+    for _ in range(3):
+        breaker.record(failed=True)
+    clock.now += 10
+    breaker.allow()
+    breaker.release()
+    breaker.allow()  # the released slot goes to the next caller
+
+    clock.now += 4  # that probe never reports back within the probe timeout
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+class Response:
+    def __init__(self, status_code: int = 200, content_type: str = "application/json", text: str = "{}"):
+        self.status_code = status_code
+        self.headers = {"content-type": content_type}
+        self.text = text
+
+
+class Upstream:
+    """Fake ``send``: each call takes the next (delay, response) script entry"""
+
+    def __init__(self, *script):
+        self.script = list(script)
+        self.timeouts = []
+        self._lock = threading.Lock()
+        self.released = threading.Event()
+
+    def __call__(self, timeout: float):
+        with self._lock:
+            self.timeouts.append(timeout)
+            delay, response = self.script.pop(0)
+        # A slow leg returns early once the test is over
+        self.released.wait(delay)
+        return response
+
+
+@pytest.fixture
+def hedger():
+    hedger = RequestHedger(0.95, RetryBudget(1.0, 0, 10), max_workers=8)
+    for _ in range(upstream_proxy.HEDGE_MIN_SAMPLES):
+        hedger._observe("key", 0.05)
+    return hedger
+
+
+def test_slow_call_is_hedged_after_the_delay_with_the_remaining_timeout(hedger):
+    upstream = Upstream((5, Response(text="primary")), (0, Response(text="hedge")))
+    started = time.monotonic()
+    result = hedger.call("key", upstream, timeout=2.0)
+    upstream.released.set()
+
+    assert result.text == "hedge"
+    assert time.monotonic() - started < 1
+    assert upstream.timeouts[0] == 2.0
+    assert 1.5 < upstream.timeouts[1] < 2.0
+    assert hedger.stats()["hedged"] == 1
+    assert hedger.stats()["hedge_wins"] == 1
+
+
+def test_fast_error_does_not_beat_a_good_response_in_flight(hedger):
+    upstream = Upstream((0.3, Response(text="primary")), (0, Response(503, "text/html", "busy")))
+    result = hedger.call("key", upstream, timeout=2.0)
+
+    assert result.text == "primary"
+    assert hedger.stats()["hedge_wins"] == 0
+
+
+def test_unusable_response_is_returned_when_no_leg_succeeds(hedger):
+    upstream = Upstream((0.2, Response(502, "text/html", "bad gateway")), (0, Response(503, "text/html", "busy")))
+    result = hedger.call("key", upstream, timeout=2.0)
+
+    assert result.status_code in (502, 503)
+
+
+def test_no_hedge_once_the_budget_is_spent(hedger):
+    hedger.budget = RetryBudget(0, 0, 10)
+    upstream = Upstream((0.2, Response(text="primary")))
+    result = hedger.call("key", upstream, timeout=2.0)
+
+    assert result.text == "primary"
+    assert upstream.timeouts == [2.0]
+    assert hedger.stats()["hedged"] == 0
+    assert hedger.budget.stats()["rejected"] == 1
+
+
+def test_degraded_breaker_skips_hedging(monkeypatch, hedger):
+    calls = []
+
+    def get(url, params=None, headers=None, timeout=None):
+        calls.append(timeout)
+        return Response()
+
+    def hedged_call(*args, **kwargs):
+        raise AssertionError("hedged while the breaker is degraded")
+
+    monkeypatch.setattr(settings, "UPSTREAM_PROXY_URL", "http://proxy.invalid")
+    monkeypatch.setattr(settings, "UPSTREAM_PROXY_TOKEN", "token")
+    monkeypatch.setattr(settings, "UPSTREAM_HEDGE_ENABLED", True)
+    monkeypatch.setattr(upstream_proxy, "_breakers", {})
+    monkeypatch.setattr(upstream_proxy, "_micro_cache", {})
+    monkeypatch.setattr(upstream_proxy.requests, "get", get)
+    monkeypatch.setattr(hedger, "call", hedged_call)
+    monkeypatch.setattr(upstream_proxy, "hedger", hedger)
+
+    for _ in range((settings.PROXY_CIRCUIT_THRESHOLD + 1) // 2):
+        upstream_proxy.record_proxy_failure("get_zones", {}, "boom")
+    assert upstream_proxy.get_circuit("get_zones", {}).degraded
+
+    response = upstream_proxy.call_upstream("get_zones", {}, timeout=2.0)
+    assert response.status_code == 200
+    assert calls == [2.0]
@@ -0,0 +1,95 @@
+"""Batch viewport lookups: shared fetches for nested viewports and the locked zone cache."""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+from app.routers import zones
+from app.schemas.zones import Bounds, BoundsBatchRequest, ExternalAPIResponse
+from app.services.zones_service import ZoneDataResult
+
+CITY = Bounds(left_long=-121.80, right_long=-121.70, top_lat=38.58, bottom_lat=38.52)
+NORTH = Bounds(left_long=-121.76, right_long=-121.74, top_lat=38.57, bottom_lat=38.55)
+SOUTH = Bounds(left_long=-121.76, right_long=-121.74, top_lat=38.535, bottom_lat=38.525)
+ELSEWHERE = Bounds(left_long=-121.60, right_long=-121.50, top_lat=38.58, bottom_lat=38.52)
+
+
+def zone(code, lng, lat):
+    square = [(lat, lng), (lat + 0.001, lng), (lat + 0.001, lng + 0.001), (lat, lng + 0.001)]
+    return {"code": code, "description": f"{code} lot", "positions": [{"lat": a, "lng": b} for a, b in square]}
+
+
+ZONES = [zone("N1", -121.75, 38.56), zone("S1", -121.75, 38.53), zone("E1", -121.72, 38.55)]
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """Count upstream fetches per bounds; ``failing`` lists left longitudes that answer 503"""
+    calls, failing = [], set()
+
+    def fetch(left_long, right_long, top_lat, bottom_lat, db):
+        calls.append((left_long, right_long, top_lat, bottom_lat))
+        if left_long in failing:
+            raise HTTPException(status_code=503, detail={"error": "upstream_down"})
+        return ZoneDataResult(data=ExternalAPIResponse(zones=ZONES), bounds_key="key")
+
+    monkeypatch.setattr(zones, "fetch_zones_with_snapshot", fetch)
+    monkeypatch.setattr(zones, "ReadSessionLocal", lambda: type("Db", (), {"close": lambda self: None})())
+    monkeypatch.setattr(zones, "zone_cache", {})
+    monkeypatch.setattr(zones, "cache_timestamps", {})
+    return calls, failing
+
+
+def batch(*bounds):
+    # Skip the rate limiter, which needs a real request
+    return zones.get_data_batch.__wrapped__(None, BoundsBatchRequest(bounds=list(bounds)))
+
+
+def test_nested_viewports_share_the_outer_fetch(upstream):
+    calls, _ = upstream
+
+    response = batch(NORTH, CITY, SOUTH, NORTH)
+
+    assert len(calls) == 1
+    north, city, south, _ = response.keys
+    assert set(response.results) == {north, city, south}
+    assert set(response.results[city].parkingSpots) == {"N1 lot", "S1 lot", "E1 lot"}
+    assert set(response.results[north].parkingSpots) == {"N1 lot"}
+    assert set(response.results[south].parkingSpots) == {"S1 lot"}
+
+
+def test_disjoint_viewports_fetch_separately_and_fail_alone(upstream):
+    calls, failing = upstream
+    failing.add(ELSEWHERE.left_long)
+
+    response = batch(CITY, NORTH, ELSEWHERE)
+
+    city, north, elsewhere = response.keys
+    assert len(calls) == 2
+    assert set(response.results) == {city, north}
+    assert response.errors == {elsewhere: {"status_code": 503, "error": "upstream_down"}}
+
+
+def test_failed_outer_fetch_fails_the_nested_viewports(upstream):
+    _, failing = upstream
+    failing.add(CITY.left_long)
+
+    response = batch(CITY, SOUTH)
+
+    assert response.results == {}
+    assert set(response.errors) == set(response.keys)
+
+
+def test_concurrent_lookups_keep_the_cache_consistent(upstream):
+    viewports = [
+        Bounds(left_long=-121.0 - n / 100, right_long=-120.0, top_lat=39.0, bottom_lat=38.0) for n in range(40)
+    ]
+
+    def lookup(bounds):
+        return zones.get_cached_zones_data(bounds.left_long, bounds.right_long, bounds.top_lat, bounds.bottom_lat, None)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lookup, viewports * 5))
+
+    assert len(zones.zone_cache) <= 11
+    assert zones.zone_cache.keys() == zones.cache_timestamps.keys()